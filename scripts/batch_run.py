@@ -3,12 +3,18 @@ from src.agent.evacuee import Behaviour
 from src.model.model import EvacuationModel
 from shapely import Point
 from datetime import datetime
+import argparse
 import time
 import os
 import csv
 import concurrent.futures
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Run the model repeatedly for each value of a parameter")
+    # create_cumulative_plot.py and create_flow_rate_plot.py need the agent trajectories, so they are written by default
+    parser.add_argument("--metrics-only", action="store_true")
+    args = parser.parse_args()
+
     n_runs = 50
 
     data_file_prefix = "football"
@@ -20,6 +26,10 @@ if __name__ == "__main__":
         st_james = Point(424192, 564602)
         return st_james if city == "football" else monument
 
+    def _get_city_bundle_path(city: str) -> str | None:
+        path = f"data/{city}/city.pickle"
+        return path if os.path.exists(path) else None
+
     # fixed parameters
     num_agents = 4000
     bomb_location = _get_bomb_location(data_file_prefix)
@@ -82,6 +92,7 @@ if __name__ == "__main__":
             city=data_file_prefix,
             domain_path=f"data/{data_file_prefix}/domain.gpkg",
             agent_data_path=f"data/{data_file_prefix}/agent_data.csv",
+            city_bundle_path=_get_city_bundle_path(data_file_prefix),
             num_agents=num_agents,
             bomb_location=bomb_location,
             evacuation_zone_radius=evacuation_zone_radius,
@@ -95,7 +106,10 @@ if __name__ == "__main__":
             evacuate_on_foot=True,
             sensor_locations=[],
             agent_behaviour=agent_behaviour,
-            curiosity_radius_m = variable_value
+            curiosity_radius_m = variable_value,
+            metrics_only=args.metrics_only,
+            # every run in the batch has the same road network, so it is stored once for the batch
+            graph_output_path=batch_output_path + "/graphs",
         ).run(150)
 
         end_time = time.time()
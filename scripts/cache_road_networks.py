@@ -0,0 +1,47 @@
+import argparse
+import geopandas as gpd
+import os
+
+from src.space.graph_store import GRAPH_STORE_PATH, GraphStore
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        "Download the road networks for each city into the local graph store"
+    )
+    parser.add_argument(
+        "--city",
+        type=str,
+        action="append",
+        help="City to cache (may be repeated).  Defaults to every city in data/",
+    )
+    parser.add_argument("--store", type=str, default=GRAPH_STORE_PATH)
+    return parser
+
+
+def cache_road_networks(city: str, store: GraphStore) -> None:
+    df = gpd.read_file(f"data/{city}/domain.gpkg").set_crs(
+        "EPSG:4326", allow_override=True
+    )
+    domain = df.geometry[0]
+
+    for network_type in ["walk", "drive_service"]:
+        key = GraphStore.key(domain, network_type, False)
+        if os.path.exists(store.file_path(key)):
+            print(f"{city} {network_type}: already stored ({key})")
+        else:
+            store.load(domain, network_type)
+            print(f"{city} {network_type}: downloaded ({key})")
+
+
+if __name__ == "__main__":
+    args = make_parser().parse_args()
+    cities = args.city or sorted(
+        city
+        for city in os.listdir("data")
+        if os.path.exists(f"data/{city}/domain.gpkg")
+    )
+    store = GraphStore(args.store)
+
+    for city in cities:
+        cache_road_networks(city, store)
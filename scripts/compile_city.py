@@ -0,0 +1,28 @@
+import argparse
+import geopandas as gpd
+
+from src.space.city_bundle import CityBundle
+from src.space.graph_store import GRAPH_STORE_PATH, GraphStore
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        "Compile the buildings, roads and building entrances for a city into a single file"
+    )
+    parser.add_argument("--city", type=str, required=True)
+    parser.add_argument("--store", type=str, default=GRAPH_STORE_PATH)
+    return parser
+
+
+def compile_city(city: str, store: GraphStore) -> str:
+    df = gpd.read_file(f"data/{city}/domain.gpkg").set_crs(
+        "EPSG:4326", allow_override=True
+    )
+    output_path = f"data/{city}/city.pickle"
+    CityBundle.compile(df.geometry[0], store).save(output_path)
+    return output_path
+
+
+if __name__ == "__main__":
+    args = make_parser().parse_args()
+    print(f"Compiled {compile_city(args.city, GraphStore(args.store))}")
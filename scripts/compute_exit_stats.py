@@ -1,24 +1,25 @@
 import pandas as pd
 import geopandas as gpd
-from shapely.wkt import loads
 from shapely.geometry import Point
 from scipy.spatial import cKDTree
 import numpy as np
 import networkx as nx
 import osmnx as ox
 
+from scripts.load_data_from_file import load_agent_data, load_graph
+
 # ---------------- CONFIGURATION ---------------- #
-agent_file = "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0.agent.csv"
 gpkg_file = "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0.gpkg"
-gml_file = "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0.gml"
+output_path = "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0"
 
 crs_epsg = "EPSG:27700"
 # ------------------------------------------------ #
 
 # Load agent data
-agent_df = pd.read_csv(agent_file)
-agent_df["geometry"] = agent_df["location"].apply(loads)
-agent_gdf = gpd.GeoDataFrame(agent_df, geometry="geometry", crs=crs_epsg)
+agent_df = load_agent_data(output_path).reset_index()
+agent_gdf = gpd.GeoDataFrame(
+    agent_df, geometry=gpd.points_from_xy(agent_df["x"], agent_df["y"]), crs=crs_epsg
+)
 
 
 # Identify the first timestep where each agent becomes evacuated
@@ -32,7 +33,7 @@ evac_events = (
 # Load evacuation zone and road edges
 evac_zone = gpd.read_file(gpkg_file, layer="evacuation_zone", crs=crs_epsg)
 # Load road network and simplify
-G = nx.read_gml(gml_file)
+G = load_graph(output_path)
 G = nx.MultiDiGraph(G)  # ensure correct type
 nodes, edges = ox.graph_to_gdfs(G, nodes=True, edges=True)
 nodes = nodes.to_crs(crs_epsg)
@@ -2,22 +2,23 @@ import pandas as pd
 import geopandas as gpd
 import networkx as nx
 import osmnx as ox
-from shapely.wkt import loads
 from shapely.geometry import Point
 from scipy.spatial import cKDTree
 import numpy as np
 
+from scripts.load_data_from_file import load_agent_data, load_graph
+
 # ---------------- CONFIGURATION ---------------- #
-agent_file = "outputs/newcastle-md/20250412234447/20250412234447.agent.csv"
 gpkg_file = "outputs/newcastle-md/20250412234447/20250412234447.gpkg"
-gml_file = "outputs/newcastle-md/20250412234447/20250412234447.gml"
+output_path = "outputs/newcastle-md/20250412234447/20250412234447"
 crs_epsg = "EPSG:27700"
 # ------------------------------------------------ #
 
 # Load data
-agent_df = pd.read_csv(agent_file)
-agent_df["geometry"] = agent_df["location"].apply(loads)
-agent_gdf = gpd.GeoDataFrame(agent_df, geometry="geometry", crs=crs_epsg)
+agent_df = load_agent_data(output_path).reset_index()
+agent_gdf = gpd.GeoDataFrame(
+    agent_df, geometry=gpd.points_from_xy(agent_df["x"], agent_df["y"]), crs=crs_epsg
+)
 agent_start = agent_gdf[agent_gdf["Step"] == 0]
 
 
@@ -28,9 +29,7 @@ agent_start = agent_start[agent_start.geometry.within(evac_polygon)]
 
 
 # Load road network and simplify
-G = nx.read_gml(gml_file)
-G = nx.MultiDiGraph(G)
-G = ox.simplify_graph(G)
+G = load_graph(output_path, simplify=True)
 nodes, edges = ox.graph_to_gdfs(G, nodes=True, edges=True)
 nodes = nodes.to_crs(crs_epsg)
 edges = edges.to_crs(crs_epsg)
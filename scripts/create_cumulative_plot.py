@@ -3,6 +3,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 
+from scripts.load_data_from_file import load_agent_data
+
 # ---------------- CONFIGURATION ---------------- #
 BATCH_PATH = "outputs/batch-20250411103815"
 METADATA_FILE = os.path.join(BATCH_PATH, "metadata.csv")
@@ -33,12 +35,16 @@ for label, (compliant_val, behaviour_val) in config_labels.items():
     ]
 
     for row in subset.itertuples():
-        agent_file = os.path.join(row.output_path, os.path.basename(row.output_path) + ".agent.csv")
-        model_file = os.path.join(row.output_path, os.path.basename(row.output_path) + ".model.csv")
-        if not (os.path.exists(agent_file) and os.path.exists(model_file)):
+        run_path = os.path.join(row.output_path, os.path.basename(row.output_path))
+        agent_file = run_path + ".agent"
+        model_file = run_path + ".model.csv"
+        if not (
+            (os.path.exists(agent_file) or os.path.exists(agent_file + ".csv"))
+            and os.path.exists(model_file)
+        ):
             continue
         try:
-            agent_df = pd.read_csv(agent_file)
+            agent_df = load_agent_data(run_path).reset_index()
             model_df = pd.read_csv(model_file)
             num_required = model_df["number_to_evacuate"].iloc[-1]
 
@@ -2,18 +2,19 @@ import pandas as pd
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from shapely.wkt import loads
 import os
 import contextily as ctx
 
+from scripts.load_data_from_file import load_agent_data
+
 # ---------------- CONFIGURATION ---------------- #
 agent_files = {
     "monument": {
-        "agent": "/home/michael/Downloads/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0, <Behaviour.FAMILIAR: 4>: 0.0}-run-49.agent.csv",
+        "output_path": "/home/michael/Downloads/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0, <Behaviour.FAMILIAR: 4>: 0.0}-run-49",
         "gpkg": "/home/michael/Downloads/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0, <Behaviour.FAMILIAR: 4>: 0.0}-run-49.gpkg"
     },
     "football": {
-        "agent": "outputs/batch-20250411102536/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0.0, <Behaviour.FAMILIAR: 4>: 0}-run-1/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0.0, <Behaviour.FAMILIAR: 4>: 0}-run-1.agent.csv",
+        "output_path": "outputs/batch-20250411102536/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0.0, <Behaviour.FAMILIAR: 4>: 0}-run-1/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0.0, <Behaviour.FAMILIAR: 4>: 0}-run-1",
         "gpkg": "outputs/batch-20250411102536/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0.0, <Behaviour.FAMILIAR: 4>: 0}-run-1/agent_behaviour-{<Behaviour.NON_COMPLIANT: 2>: 0, <Behaviour.COMPLIANT: 1>: 1.0, <Behaviour.CURIOUS: 3>: 0.0, <Behaviour.FAMILIAR: 4>: 0}-run-1.gpkg"
     }
 }
@@ -38,16 +39,20 @@ all_bounds = []
 data_cache = {}
 
 for city, files in agent_files.items():
-    agent_file = files["agent"]
+    output_path = files["output_path"]
     gpkg_file = files["gpkg"]
 
-    if not (os.path.exists(agent_file) and os.path.exists(gpkg_file)):
+    agent_exists = os.path.exists(output_path + ".agent") or os.path.exists(
+        output_path + ".agent.csv"
+    )
+    if not (agent_exists and os.path.exists(gpkg_file)):
         print(f"Missing files for {city}")
         continue
 
-    df = pd.read_csv(agent_file)
-    df["geometry"] = df["location"].apply(loads)
-    gdf_agents = gpd.GeoDataFrame(df, geometry="geometry", crs="EPSG:27700")
+    df = load_agent_data(output_path).reset_index()
+    gdf_agents = gpd.GeoDataFrame(
+        df, geometry=gpd.points_from_xy(df["x"], df["y"]), crs="EPSG:27700"
+    )
     evac_zone = gpd.read_file(gpkg_file, layer="evacuation_zone", crs="EPSG:27700")
     bounds = evac_zone.total_bounds  # xmin, ymin, xmax, ymax
 
@@ -354,8 +354,6 @@ def plot_density(output_path: str):
     )
 
     df = agent_df.query("Step == 0")
-    df["x"] = df.apply(lambda row: row.location.x, axis=1)
-    df["y"] = df.apply(lambda row: row.location.y, axis=1)
 
     evac_zone_df = gpd.GeoDataFrame(
         [{"geometry": Point(424860, 564443).buffer(x)} for x in [100, 200, 400]]
@@ -3,15 +3,16 @@ import geopandas as gpd
 import matplotlib.pyplot as plt
 from shapely.geometry import Point
 import contextily as ctx
-from shapely.wkt import loads
 from matplotlib.patches import Patch
 from matplotlib_scalebar.scalebar import ScaleBar
 
+from scripts.load_data_from_file import load_agent_data
+
 # === INPUT PATHS ===
-#agent_file = "outputs/newcastle-md/20250412234447/20250412234447.agent.csv"
+#output_path = "outputs/newcastle-md/20250412234447/20250412234447"
 #gpkg_file = "outputs/newcastle-md/20250412234447/20250412234447.gpkg"
 
-agent_file = "outputs/football/20250410185730/20250410185730.agent.csv"
+output_path = "outputs/football/20250410185730/20250410185730"
 gpkg_file = "outputs/football/20250613211514/20250613211514.gpkg"
 
 
@@ -25,11 +26,12 @@ zone_edge = "navy"
 
 
 # === Load agent positions ===
-df_agents = pd.read_csv(agent_file)
-
-
-df_agents["geometry"] = df_agents["location"].apply(loads)
-gdf_agents = gpd.GeoDataFrame(df_agents, geometry="geometry", crs="EPSG:27700")
+df_agents = load_agent_data(output_path).reset_index()
+gdf_agents = gpd.GeoDataFrame(
+    df_agents,
+    geometry=gpd.points_from_xy(df_agents["x"], df_agents["y"]),
+    crs="EPSG:27700",
+)
 gdf_step0 = gdf_agents[gdf_agents["Step"] == 0]
 
 # === Load evacuation zone from .gpkg ===
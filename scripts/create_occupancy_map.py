@@ -2,26 +2,24 @@ import pandas as pd
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import contextily as ctx
-from shapely.wkt import loads
 import osmnx as ox
-import networkx as nx
 from shapely.geometry import Point
 from shapely.ops import nearest_points
 from scipy.spatial import cKDTree
 from shapely.strtree import STRtree
 import numpy as np
 
+from scripts.load_data_from_file import load_agent_data, load_graph
+
 # ---------------- CONFIGURATION ---------------- #
 scenarios = {
     "Monument": {
-        "agent_file": "outputs/newcastle-md/20250412234447/20250412234447.agent.csv",
         "gpkg_file": "outputs/newcastle-md/20250412234447/20250412234447.gpkg",
-        "gml_file": "outputs/newcastle-md/20250412234447/20250412234447.gml"
+        "output_path": "outputs/newcastle-md/20250412234447/20250412234447"
     },
     "St James' Park": {
-        "agent_file": "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0.agent.csv",
         "gpkg_file": "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0.gpkg",
-        "gml_file": "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0.gml"
+        "output_path": "outputs/batch-20250617210608/mean_evacuation_delay_m-5-run-0/mean_evacuation_delay_m-5-run-0"
     }
 }
 time_steps = [0, 48, 96]  # e.g. 0 and 800s if 10s timestep
@@ -45,14 +43,15 @@ all_building_counts = []
 all_road_densities = []
 
 for scenario, files in scenarios.items():
-    agent_df = pd.read_csv(files["agent_file"])
-    agent_df["geometry"] = agent_df["location"].apply(loads)
-    agent_gdf = gpd.GeoDataFrame(agent_df, geometry="geometry", crs="EPSG:27700")
+    agent_df = load_agent_data(files["output_path"]).reset_index()
+    agent_gdf = gpd.GeoDataFrame(
+        agent_df,
+        geometry=gpd.points_from_xy(agent_df["x"], agent_df["y"]),
+        crs="EPSG:27700",
+    )
 
     buildings = gpd.read_file(files["gpkg_file"], layer="buildings", crs="EPSG:27700")
-    G = nx.read_gml(files["gml_file"])
-    G = nx.MultiDiGraph(G)
-    G = ox.simplify_graph(G)
+    G = load_graph(files["output_path"], simplify=True)
     edges = ox.graph_to_gdfs(G, nodes=False, edges=True)
 
     for t in time_steps:
@@ -89,19 +88,20 @@ panel_idx = 0
 
 for scenario, files in scenarios.items():
     # Load agent data
-    agent_df = pd.read_csv(files["agent_file"])
-    agent_df["geometry"] = agent_df["location"].apply(loads)
-    agent_gdf = gpd.GeoDataFrame(agent_df, geometry="geometry", crs="EPSG:27700")
+    agent_df = load_agent_data(files["output_path"]).reset_index()
+    agent_gdf = gpd.GeoDataFrame(
+        agent_df,
+        geometry=gpd.points_from_xy(agent_df["x"], agent_df["y"]),
+        crs="EPSG:27700",
+    )
 
     # Load buildings and evac zone
     buildings = gpd.read_file(files["gpkg_file"], layer="buildings", crs="EPSG:27700")
     evac_zone = gpd.read_file(files["gpkg_file"], layer="evacuation_zone", crs="EPSG:27700")
     bounds = evac_zone.total_bounds  # xmin, ymin, xmax, ymax
 
-    # Load road network from GML
-    G = nx.read_gml(files["gml_file"])
-    G = nx.MultiDiGraph(G)  # convert to directed multigraph
-    G = ox.simplify_graph(G)
+    # Load road network
+    G = load_graph(files["output_path"], simplify=True)
     edges = ox.graph_to_gdfs(G, nodes=False, edges=True)
 
     for t in time_steps:
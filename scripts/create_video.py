@@ -14,7 +14,11 @@ def create_video(output_path: str) -> None:
     metadata = dict(title="MesaEvac Simulation")
     writer = writer(fps=5, metadata=metadata)
 
-    evacuee_df = agent_df[agent_df["type"] == "evacuee"]
+    evacuee_df = agent_df
+    # the model data is indexed by step in its first column
+    model_df = model_df.set_index(model_df.columns[0])
+    # evacuees may only be recorded every few steps, or from a later step when appended to an earlier run
+    steps = evacuee_df.index.unique()
 
     f, ax = ox.plot_graph(
         graph,
@@ -27,12 +31,8 @@ def create_video(output_path: str) -> None:
     )
 
     with writer.saving(f, output_path + ".mp4", f.dpi):
-        evacuees_at_start = evacuee_df.loc[[0]]
-        evacuees = ax.scatter(
-            [point.x for point in evacuees_at_start.location],
-            [point.y for point in evacuees_at_start.location],
-            s=4,
-        )
+        evacuees_at_start = evacuee_df.loc[[steps[0]]]
+        evacuees = ax.scatter(evacuees_at_start.x, evacuees_at_start.y, s=4)
         evacuees.set_color(
             [
                 (
@@ -46,15 +46,11 @@ def create_video(output_path: str) -> None:
 
         evacuation_zone_drawn = False
 
-        for step in model_df.index:
+        for step in steps:
             evacuees_at_step = evacuee_df.loc[[step]]
+            model_at_step = model_df.loc[step]
             evacuees.set_offsets(
-                np.stack(
-                    [
-                        [point.x for point in evacuees_at_step.location],
-                        [point.y for point in evacuees_at_step.location],
-                    ]
-                ).T
+                np.stack([evacuees_at_step.x, evacuees_at_step.y]).T
             )
 
             evacuees.set_color(
@@ -72,7 +68,7 @@ def create_video(output_path: str) -> None:
                 ]
             )
 
-            if not evacuation_zone_drawn and model_df.iloc[step].evacuation_started:
+            if not evacuation_zone_drawn and model_at_step.evacuation_started:
                 evacuation_zone.plot(ax=ax, alpha=0.2)
                 # ax.scatter(exits.geometry.x, exits.geometry.y, color="#0f9900", s=10)
                 evacuation_zone_drawn = True
@@ -80,16 +76,16 @@ def create_video(output_path: str) -> None:
             if evacuation_zone_drawn:
                 ax.set_title(
                     "T={}min\n{}/{} Agents Evacuated ({:.0f}%)".format(
-                        model_df.iloc[step].time_elapsed,
-                        model_df.iloc[step].number_evacuated,
-                        model_df.iloc[step].number_to_evacuate,
-                        model_df.iloc[step].number_evacuated
-                        / model_df.iloc[step].number_to_evacuate
+                        model_at_step.time_elapsed,
+                        model_at_step.number_evacuated,
+                        model_at_step.number_to_evacuate,
+                        model_at_step.number_evacuated
+                        / model_at_step.number_to_evacuate
                         * 100,
                     )
                 )
             else:
-                ax.set_title("T={}".format(model_df.iloc[step].time_elapsed))
+                ax.set_title("T={}".format(model_at_step.time_elapsed))
 
             writer.grab_frame()
 
@@ -1,15 +1,68 @@
+import os
+import json
 import pandas as pd
 import geopandas as gpd
 from shapely import wkt
 import networkx as nx
 import osmnx as ox
 
+from src.model.trajectory import Trajectory
+from src.space.graph_store import GraphStore
+
+
+def load_agent_data(output_path: str) -> pd.DataFrame:
+    """
+    Load the evacuee trajectories, indexed by Step, with x, y and location columns.
+    Reads the columnar output where it exists, or the agent.csv written by earlier versions of the model.
+    """
+    if os.path.isdir(output_path + ".agent"):
+        agent_df = Trajectory(output_path + ".agent").to_dataframe()
+    else:
+        agent_df = pd.read_csv(output_path + ".agent.csv", index_col="Step")
+        agent_df["location"] = agent_df["location"].apply(wkt.loads)
+        agent_df = agent_df[agent_df["type"] == "evacuee"]
+        agent_df["x"] = [point.x for point in agent_df["location"]]
+        agent_df["y"] = [point.y for point in agent_df["location"]]
+        return agent_df
+
+    # runs may record only some of the fields
+    if "x" in agent_df.columns and "y" in agent_df.columns:
+        agent_df["location"] = gpd.points_from_xy(agent_df["x"], agent_df["y"])
+    return agent_df
+
+
+def load_graph(output_path: str, simplify: bool = False) -> nx.Graph:
+    """
+    Load the road network of a run from the graph store it references, or the .gml written by earlier versions of
+    the model.  The simplified graph is kept in the store as well, so it is only simplified once per city.
+    """
+    if not os.path.exists(output_path + ".graph.json"):
+        graph = nx.read_gml(output_path + ".gml")
+        return ox.simplify_graph(nx.MultiDiGraph(graph)) if simplify else graph
+
+    with open(output_path + ".graph.json") as f:
+        reference = json.load(f)
+    # the store is relative to the output files (an absolute path in earlier versions of the model)
+    store = GraphStore(
+        os.path.join(os.path.dirname(os.path.abspath(output_path)), reference["store"])
+    )
+    if not simplify:
+        return store.get_graph(reference["key"])
+
+    simplified_key = reference["key"] + ".simplified"
+    graph = store.get_graph(simplified_key)
+    if graph is None:
+        graph = ox.simplify_graph(
+            nx.MultiDiGraph(store.get_graph(reference["key"]))
+        )
+        store.put_graph(graph, simplified_key)
+    return graph
+
 
 def load_data_from_file(output_path: str) -> None:
-    agent_df = pd.read_csv(output_path + ".agent.csv", index_col="Step")
-    agent_df["location"] = agent_df["location"].apply(wkt.loads)
+    agent_df = load_agent_data(output_path)
     model_df = pd.read_csv(output_path + ".model.csv")
-    graph = nx.read_gml(output_path + ".gml")
+    graph = load_graph(output_path)
     nodes, _ = ox.convert.graph_to_gdfs(graph)
     gpkg = output_path + ".gpkg"
     evacuation_zone = gpd.read_file(gpkg, layer="evacuation_zone")
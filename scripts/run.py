@@ -30,11 +30,18 @@ def _get_bomb_location(city: str) -> Point:
     return st_james if city == "football" else monument
 
 
+def _get_city_bundle_path(city: str) -> str | None:
+    # use the precompiled city, if scripts/compile_city.py has been run
+    path = f"data/{city}/city.pickle"
+    return path if os.path.exists(path) else None
+
+
 def run_interactively(data_file_prefix: str, open_browser: bool) -> None:
     model_params = {
         "city": data_file_prefix,
         "domain_path": f"data/{data_file_prefix}/domain.gpkg",
         "agent_data_path": f"data/{data_file_prefix}/agent_data.csv",
+        "city_bundle_path": _get_city_bundle_path(data_file_prefix),
         "num_agents": mesa.visualization.Slider(
             "Number of evacuees", value=2000, min_value=0, max_value=5000, step=100
         ),
@@ -110,6 +117,7 @@ def run_and_generate_video(
         city=data_file_prefix,
         domain_path=f"data/{data_file_prefix}/domain.gpkg",
         agent_data_path=f"data/{data_file_prefix}/agent_data.csv",
+        city_bundle_path=_get_city_bundle_path(data_file_prefix),
         num_agents=num_agents,
         bomb_location=_get_bomb_location(data_file_prefix),
         evacuation_zone_radius=500,
@@ -1,7 +1,9 @@
 import mesa
 import mesa_geo as mg
 import pyproj.crs
-from shapely.geometry import Polygon
+import numpy as np
+import shapely
+from shapely.geometry import Point, Polygon
 import pyproj
 import uuid
 
@@ -21,11 +23,23 @@ class Building(mg.GeoAgent):
         super().__init__(unique_id=unique_id, model=model, geometry=geometry, crs=crs)
         self.entrance_pos_walk = None
         self.entrance_pos_drive = None
-        self.name = str(uuid.uuid4())
+        self.name = str(uuid.UUID(int=model.random.getrandbits(128), version=4))
 
     def entrance_pos(self, walk: bool) -> mesa.space.FloatCoordinate:
         return self.entrance_pos_walk if walk else self.entrance_pos_drive
 
+    def random_point(self, rng: np.random.Generator) -> Point:
+        """
+        Returns a point drawn uniformly from within the building
+        """
+        # A buffer is added so that a point can still be found if the polygon has no area
+        geometry = shapely.buffer(self.geometry, 0.000001)
+        min_x, min_y, max_x, max_y = geometry.bounds
+        while True:
+            x, y = rng.uniform(min_x, max_x), rng.uniform(min_y, max_y)
+            if shapely.contains_xy(geometry, x, y):
+                return Point(x, y)
+
 
 class Home(Building):
     type = "home"
@@ -1,18 +1,87 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 import mesa_geo as mg
+import numpy as np
+import shapely
 from shapely.geometry import Polygon, Point
 from geopandas import GeoDataFrame, GeoSeries
 
+if TYPE_CHECKING:
+    from src.space.road_network import RoadNetwork
+
 
 class EvacuationZone(mg.GeoAgent):
     type = "evacuation_zone"
     exits_walk: GeoDataFrame
     exits_drive: GeoDataFrame
     centre: Point
+    _nodes_inside: dict[int, tuple[RoadNetwork, np.ndarray]]
+    _curiosity_regions: dict[float, Polygon]
 
     def __init__(self, unique_id, model, crs, centre_point: Point, radius: int) -> None:
         geometry: Polygon = centre_point.buffer(radius)
         self.centre = centre_point
+        self._nodes_inside = {}
+        self._curiosity_regions = {}
         super().__init__(unique_id=unique_id, model=model, geometry=geometry, crs=crs)
+        # the zone is tested against many points every step, so build its spatial index once
+        shapely.prepare(self.geometry)
+
+    def contains_point(self, pos: tuple[float, float]) -> bool:
+        """
+        Returns True if the point (x, y) lies inside the evacuation zone
+        """
+        return bool(shapely.contains_xy(self.geometry, pos[0], pos[1]))
+
+    def contains_points(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean array, True for each point (x[i], y[i]) inside the evacuation zone
+        """
+        if len(x) == 0:
+            return np.zeros(0, dtype=bool)
+        return shapely.contains_xy(self.geometry, x, y)
+
+    def nodes_inside(self, roads: RoadNetwork) -> np.ndarray:
+        """
+        Returns a boolean array, indexed by node, True for each node of the road network inside the evacuation zone
+        """
+        cached = self._nodes_inside.get(id(roads))
+        if cached is None or cached[0] is not roads:
+            cached = (roads, self.contains_points(roads.node_x, roads.node_y))
+            self._nodes_inside[id(roads)] = cached
+        return cached[1]
+
+    def curiosity_region(self, radius: float) -> Polygon:
+        """
+        Returns the area within the given radius of the centre of the evacuation zone, built once per radius
+        """
+        region = self._curiosity_regions.get(radius)
+        if region is None:
+            region = self.centre.buffer(radius)
+            shapely.prepare(region)
+            self._curiosity_regions[radius] = region
+        return region
+
+    def within_curiosity_radius(
+        self, x: np.ndarray, y: np.ndarray, radius: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns a boolean array, True for each point (x[i], y[i]) within radius[i] of the centre of the evacuation zone
+        """
+        inside = np.zeros(len(x), dtype=bool)
+        for r in np.unique(radius):
+            group = np.flatnonzero(radius == r)
+            inside[group] = shapely.contains_xy(
+                self.curiosity_region(float(r)), x[group], y[group]
+            )
+        return inside
+
+    def contains_node(self, roads: RoadNetwork, idx: int) -> bool:
+        """
+        Returns True if the road node with the given index lies inside the evacuation zone
+        """
+        return bool(self.nodes_inside(roads)[idx])
 
     def set_exits(self, edges: GeoDataFrame, walk: bool) -> None:
         exits = edges.unary_union.intersection(self.geometry.boundary)
@@ -1,24 +1,13 @@
 from enum import Enum
 import mesa
 import mesa_geo as mg
-from shapely import Point, buffer, Polygon
+from shapely import Point
 import pyproj
 import numpy as np
-from datetime import time, timedelta
-import pointpats
-import random
-import re
-import pointpats
 
 from src.agent.building import Building
 
-from src.agent.schedule import (
-    FootballMatchSchedule,
-    Schedule,
-    ChildSchedule,
-    RetiredAdultSchedule,
-    WorkingAdultSchedule,
-)
+from src.agent.schedule import SCHEDULES, Schedule
 
 
 class Behaviour(Enum):
@@ -33,8 +22,9 @@ class Evacuee(mg.GeoAgent):
     unique_id: int
     category: int
     model: mesa.Model
-    geometry: Point
     crs: pyproj.CRS
+    # the agent's geometry until it is added to the City, which then keeps its position (see City.move_evacuee)
+    _geometry: Point | None = None
 
     route: list[mesa.space.FloatCoordinate]
     route_index: int
@@ -47,12 +37,13 @@ class Evacuee(mg.GeoAgent):
     work: Building
     school: Building
 
-    evacuation_delay: timedelta
+    evacuation_delay_s: float
 
     schedule: Schedule
-    current_schedule_node: str
-    destination_schedule_node: str
-    leave_time: time
+    # indices of locations in the agent's schedule (see ScheduleTable)
+    current_schedule_node: int
+    destination_schedule_node: int | None
+    leave_time: float | None  # seconds, see EvacuationModel.simulation_time
 
     in_car: bool
 
@@ -63,14 +54,16 @@ class Evacuee(mg.GeoAgent):
     walking_speed: float
     speed_limit: float = 30 * MPH_TO_KPH
 
-    requires_evacuation = False
-    evacuated = False
+    _requires_evacuation = False
+    _evacuated = False
     going_home = False
     on_safe_roads = False
     diverted = False
     status = ""
 
     curiosity_radius_m = 200
+    # kept up to date by City.update_curiosity once the evacuation has started
+    in_curiosity_radius = False
 
     previous_osmid = None
     behaviour: Behaviour | None = None
@@ -84,8 +77,9 @@ class Evacuee(mg.GeoAgent):
         work,
         school,
         category,
-        mean_evacuation_delay_m,
-        car_use_pc,
+        walking_speed,
+        in_car,
+        evacuation_delay_s,
         evacuate_on_foot,
         behaviour,
         curiosity_radius_m
@@ -95,8 +89,8 @@ class Evacuee(mg.GeoAgent):
         self.work = work
         self.school = school
         self.category = category
-        self.walking_speed = self.model.agent_data.iloc[category].walking_speed
-        self.in_car = random.choices([True, False], [car_use_pc, 100 - car_use_pc])[0]
+        self.walking_speed = walking_speed
+        self.in_car = in_car
         self.behaviour = behaviour
         self.curiosity_radius_m = curiosity_radius_m
         self._set_schedule()
@@ -105,15 +99,46 @@ class Evacuee(mg.GeoAgent):
         super().__init__(unique_id, model, geometry, crs)
 
         self.distance_along_edge = 0
+        self.evacuation_delay_s = evacuation_delay_s
+        self.evacuate_on_foot = evacuate_on_foot
 
-        if mean_evacuation_delay_m is None:
-            self.evacuation_delay = timedelta(seconds=0)
-        else:
-            self.evacuation_delay = timedelta(
-                seconds=np.random.rayleigh(scale=mean_evacuation_delay_m * 60)
+    @property
+    def geometry(self) -> Point:
+        if self._geometry is None:
+            return Point(self.model.space.get_evacuee_pos(self))
+        return self._geometry
+
+    @geometry.setter
+    def geometry(self, geometry: Point) -> None:
+        self._geometry = geometry
+
+    @property
+    def position(self) -> mesa.space.FloatCoordinate:
+        if self._geometry is None:
+            return self.model.space.get_evacuee_pos(self)
+        return (self._geometry.x, self._geometry.y)
+
+    @property
+    def requires_evacuation(self) -> bool:
+        return self._requires_evacuation
+
+    @requires_evacuation.setter
+    def requires_evacuation(self, value: bool) -> None:
+        if value != self._requires_evacuation:
+            self._requires_evacuation = value
+            self.model.space.update_evacuation_counters(
+                requires_evacuation=1 if value else -1
             )
 
-        self.evacuate_on_foot = evacuate_on_foot
+    @property
+    def evacuated(self) -> bool:
+        return self._evacuated
+
+    @evacuated.setter
+    def evacuated(self, value: bool) -> None:
+        if value != self._evacuated:
+            self._evacuated = value
+            self.model.space.update_evacuation_counters(evacuated=1 if value else -1)
 
     @property
     def speed(self):
@@ -121,9 +146,7 @@ class Evacuee(mg.GeoAgent):
             self.behaviour is Behaviour.CURIOUS
             and self.model.evacuating
             and not self.in_car
-            and self.model.space.evacuation_zone.centre.buffer(self.curiosity_radius_m).contains(
-                Point(self.geometry.x, self.geometry.y)
-            )
+            and self.in_curiosity_radius
         ):
             return self.walking_speed * 0.25
         return self.speed_limit if self.in_car else self.walking_speed
@@ -151,14 +174,8 @@ class Evacuee(mg.GeoAgent):
         self._move()
 
     def _set_schedule(self) -> None:
-        if self.category == 0:
-            self.schedule = ChildSchedule(self)
-        elif self.category == 1:
-            self.schedule = WorkingAdultSchedule(self)
-        elif self.category == 2:
-            self.schedule = RetiredAdultSchedule(self)
-        elif self.category == 3:
-            self.schedule = FootballMatchSchedule(self)
+        if self.category in SCHEDULES:
+            self.schedule = SCHEDULES[self.category](self)
 
     def _initialise_position(self) -> None:
         (
@@ -169,7 +186,7 @@ class Evacuee(mg.GeoAgent):
             self.destination_building,
             self.route,
             self.route_index,
-        ) = self.schedule.start_position(self.model.simulation_time.time(), self.in_car)
+        ) = self.schedule.start_position(self.model.simulation_time, self.in_car)
 
         if self.destination_schedule_node is not None:
             self.status = "travelling"
@@ -181,7 +198,7 @@ class Evacuee(mg.GeoAgent):
     # identify agents that need to be evacuated
     # agents outside the evacuation zone will not be able to enter the evacuation zone from this point
     def evacuate(self) -> None:
-        if self.model.space.evacuation_zone.geometry.contains(self.geometry):
+        if self.model.space.evacuation_zone.contains_point(self.position):
             self.requires_evacuation = True
 
     def _evacuate(self) -> None:
@@ -197,61 +214,39 @@ class Evacuee(mg.GeoAgent):
             self._path_select((destination.x, destination.y))
         else:
             # current location index
-            source_idx = self.roads.get_nearest_node_idx(
-                (self.geometry.x, self.geometry.y)
-            )
+            source_idx = self.roads.get_nearest_node_idx(self.position)
 
-            # calculate minimum distance to each evacuation point
-            distances = self.roads.i_graph.distances(
-                source=[source_idx],
-                target=(
-                    self.model.space.exit_idx_drive
-                    if self.in_car
-                    else self.model.space.exit_idx_walk
-                ),
-                weights="length",
-            )[0]
-
-            # chose nearest evacuation point
-            exit = (
-                self.model.space.exits_drive[np.argmin(distances)]
-                if self.in_car
-                else self.model.space.exits_walk[np.argmin(distances)]
+            # follow the shortest path to the nearest evacuation point
+            self._follow_route(
+                self.model.space.get_route_to_nearest_exit(source_idx, not self.in_car)
             )
-            self._path_select((exit.geometry.x, exit.geometry.y))
 
     def _update_location(self):
-        origin_node = self.roads.nodes.iloc[self.route[self.route_index]]
-        destination_node = self.roads.nodes.iloc[self.route[self.route_index + 1]]
+        origin_idx = self.route[self.route_index]
+        destination_idx = self.route[self.route_index + 1]
+        node_x = self.roads.node_x
+        node_y = self.roads.node_y
         edge_length = self.distance_along_edge + self._distance_to_next_node()
 
         if edge_length == 0:
             self.model.space.move_evacuee(
-                self, (origin_node.geometry.x, origin_node.geometry.y)
+                self, (float(node_x[origin_idx]), float(node_y[origin_idx]))
             )
         else:
             k = self.distance_along_edge / edge_length
-            x = k * destination_node.geometry.x + (1 - k) * origin_node.geometry.x
-            y = k * destination_node.geometry.y + (1 - k) * origin_node.geometry.y
-            self.model.space.move_evacuee(self, (x, y))
+            x = k * node_x[destination_idx] + (1 - k) * node_x[origin_idx]
+            y = k * node_y[destination_idx] + (1 - k) * node_y[origin_idx]
+            self.model.space.move_evacuee(self, (float(x), float(y)))
 
-        if (
-            self.model.evacuating
-            and not self.requires_evacuation
-            and self.model.space.evacuation_zone.geometry.contains(
-                Point(self.geometry.x, self.geometry.y)
-            )
-        ):
+        if not self.model.evacuating:
+            return
+
+        in_zone = self.model.space.evacuation_zone.contains_point(self.position)
+
+        if not self.requires_evacuation and in_zone:
             self._divert()
 
-        if (
-            self.model.evacuating
-            and self.requires_evacuation
-            and not self.evacuated
-            and not self.model.space.evacuation_zone.geometry.contains(
-                Point(self.geometry.x, self.geometry.y)
-            )
-        ):
+        if self.requires_evacuation and not self.evacuated and not in_zone:
             self.evacuated = True
 
     def _prepare_to_move(self) -> None:
@@ -260,25 +255,25 @@ class Evacuee(mg.GeoAgent):
             self.model.evacuating  # evacuation has started
             and self.status != "evacuating"  # agent has not already begun to evacuate
             and self.model.simulation_time - self.model.evacuation_start_time
-            >= self.evacuation_delay  # agent's assigned evacuation delay has elapsed (to account for time taken to communicate evacuation and exit building)
+            >= self.evacuation_delay_s  # agent's assigned evacuation delay has elapsed (to account for time taken to communicate evacuation and exit building)
             and not self.behaviour is Behaviour.NON_COMPLIANT
-            and self.model.space.evacuation_zone.geometry.contains(
-                self.geometry
+            and self.model.space.evacuation_zone.contains_point(
+                self.position
             )  # agent is currently in evacuation zone
         ):
             self.on_safe_roads = False  # agent will have to traverse roads within the evacuation zone in order to leave
             self._evacuate()
         elif (
             self.status == "parked"
-            and self.model.simulation_time.time() > self.leave_time
+            and self.model.simulation_time > self.leave_time
         ):
             # get agent's next destination
-            self.destination_schedule_node = self.schedule.get_next_destination_name(
+            self.destination_schedule_node = self.schedule.get_next_destination(
                 self.current_schedule_node
             )
 
             if self.destination_schedule_node is not None:
-                self.destination_building = self.schedule.building_from_node_name(
+                self.destination_building = self.schedule.building_from_node(
                     self.destination_schedule_node
                 )
                 self._path_select(
@@ -289,7 +284,7 @@ class Evacuee(mg.GeoAgent):
     def _move(self) -> None:
         # if the agent is currently travelling
         if self.route is not None and self.status != "parked":
-            time_to_travel = self.model.TIMESTEP.seconds
+            time_to_travel = self.model.TIMESTEP
 
             # agent is on the last leg of their journey
             if self.route_index >= len(self.route) - 1:
@@ -301,47 +296,40 @@ class Evacuee(mg.GeoAgent):
 
             # if agent passes through one or more nodes during the step
             while time_to_travel >= self._time_to_next_node():
-                # assume agents cannot overtake.  get agents blocking this agent's path
-                agents_in_path = [
-                    agent
-                    for agent in self.model.space.evacuees
-                    if agent.unique_id != self.unique_id
-                    and agent.in_car == self.in_car
-                    and agent.route
-                    and agent.route[agent.route_index] == self.route[self.route_index]
-                    and agent.distance_along_edge > self.distance_along_edge
-                    and agent.distance_along_edge - self.distance_along_edge
-                    < self.speed / 60 / 60 * time_to_travel * 1000
-                ]
+                # assume agents cannot overtake.  get agents blocking this agent's path, nearest first
+                agents_in_path = self.model.space.get_evacuees_ahead(
+                    self, self.speed / 60 / 60 * time_to_travel * 1000
+                )
 
                 # if the path is clear
                 if len(agents_in_path) == 0:
                     time_to_travel -= self._time_to_next_node()
                     self.route_index += 1
                     self.distance_along_edge = 0
+                    self.model.space.update_evacuee_edge(self)
                     coords = self.roads.get_coords_from_idx(
                         self.route[self.route_index]
                     )
-                    if (
-                        self.status == "evacuating"
-                        and not self.model.space.evacuation_zone.geometry.contains(
-                            Point(coords)
+                    # there is no evacuation zone until the evacuation starts
+                    in_zone = (
+                        self.model.evacuating
+                        and self.model.space.evacuation_zone.contains_node(
+                            self.roads, self.route[self.route_index]
                         )
-                    ):
+                    )
+                    if self.status == "evacuating" and not in_zone:
                         self.evacuated = True
                     # if agent has crossed into evacuation zone
                     if (
                         self.model.evacuating
                         and not self.requires_evacuation
                         and not self.behaviour is Behaviour.NON_COMPLIANT
-                        and self.model.space.evacuation_zone.geometry.contains(
-                            Point(coords)
-                        )
+                        and in_zone
                     ):
                         self._divert()
                         if self.route is None:
                             self.status = "parked"
-                            self.leave_time = self.model.simulation_time.time()
+                            self.leave_time = self.model.simulation_time
                             return
                     else:
                         self.model.space.move_evacuee(
@@ -358,9 +346,7 @@ class Evacuee(mg.GeoAgent):
 
                 # if the agent's path is blocked by other agents
                 else:
-                    nearest_agent_distance = sorted(
-                        [agent.distance_along_edge for agent in agents_in_path]
-                    )[0]
+                    nearest_agent_distance = agents_in_path[0].distance_along_edge
 
                     # travel as far as possible, then queue up behind the nearest agent, leaving the minimum required separation
                     time_to_travel = (
@@ -377,6 +363,7 @@ class Evacuee(mg.GeoAgent):
                     break
 
             self.distance_along_edge += (1000 / 60 / 60) * time_to_travel * self.speed
+            self.model.space.update_evacuee_edge(self)
             self._update_location()
 
     def _divert(self) -> None:
@@ -388,8 +375,8 @@ class Evacuee(mg.GeoAgent):
         except:
             # else go home (if home is outside evacuation zone)
             try:
-                if not self.model.space.evacuation_zone.geometry.contains(
-                    Point(self.home.entrance_pos(not self.in_car))
+                if not self.model.space.evacuation_zone.contains_point(
+                    self.home.entrance_pos(not self.in_car)
                 ):
                     self._path_select(self.home.entrance_pos(not self.in_car))
                 else:
@@ -397,45 +384,48 @@ class Evacuee(mg.GeoAgent):
             except:
                 # else go to someone else's home
                 house = self.model.space.get_random_home()
-                while self.model.space.evacuation_zone.geometry.contains(
-                    Point(house.entrance_pos(not self.in_car))
+                while self.model.space.evacuation_zone.contains_point(
+                    house.entrance_pos(not self.in_car)
                 ):
                     house = self.model.space.get_random_home()
                 self._path_select(house.entrance_pos(not self.in_car))
         finally:
             self.status = "travelling"
+            self.model.space.update_evacuee_edge(self)
 
     def _path_select(self, destination: mesa.space.FloatCoordinate) -> None:
         self.route_index = 0
         self.distance_along_edge = 0
-        self.route = self.roads.get_shortest_path(
-            (self.geometry.x, self.geometry.y), destination
-        )
+        self._follow_route(self.roads.get_shortest_path(self.position, destination))
+
+    def _follow_route(self, route: list[int]) -> None:
+        self.route_index = 0
+        self.distance_along_edge = 0
+        self.route = route
 
         if self.route is None or len(self.route) < 2:
             self.status = "parked"
-            self.leave_time = self.model.simulation_time.time()
+            self.leave_time = self.model.simulation_time
         else:
             self.model.space.move_evacuee(
                 self,
                 self.roads.get_coords_from_idx(self.route[0]),
             )
+        self.model.space.update_evacuee_edge(self)
 
     def _distance_to_next_node(self) -> float:
         edge = self._get_edge()
-        return edge["length"] - self.distance_along_edge
+        return self.roads.edge_length[edge] - self.distance_along_edge
 
     def _time_to_next_node(self) -> float:
         edge = self._get_edge()
-        self.speed_limit = self._get_speed_limit(edge)
-        return 60 * 60 / 1000 * (edge["length"] - self.distance_along_edge) / self.speed
-
-    def _random_point_in_polygon(self, geometry: Polygon):
-        # A buffer is added because the method hangs if the polygon is too small
-        return Point(
-            pointpats.random.poisson(
-                buffer(geometry=geometry, distance=0.000001), size=1
-            )
+        self.speed_limit = self.roads.edge_speed_limit[edge]
+        return (
+            60
+            * 60
+            / 1000
+            * (self.roads.edge_length[edge] - self.distance_along_edge)
+            / self.speed
         )
 
     def _recalculate_route(self) -> None:
@@ -443,51 +433,41 @@ class Evacuee(mg.GeoAgent):
             self._path_select(self.destination_building.entrance_pos(not self.in_car))
 
     def _arrive_at_destination(self) -> None:
-        if self.going_home and self.model.space.evacuation_zone.geometry.contains(
-            Point(self.home.entrance_pos(not self.in_car))
+        if self.going_home and self.model.space.evacuation_zone.contains_point(
+            self.home.entrance_pos(not self.in_car)
         ):
             pass
         # if the agent has just left the evacuation zone, stop and decide where to go next
         elif self.status == "evacuating" or self.destination_building is None:
             self.evacuated = True
             self.status = "parked"
-            self.leave_time = self.model.simulation_time.time()
+            self.leave_time = self.model.simulation_time
             self.destination_schedule_node = None
             self.destination_building = None
             self._divert()
         # otherwise, agent will enter a building
         else:
-            self.model.space.move_evacuee(
-                self,
-                self._random_point_in_polygon(self.destination_building.geometry),
-            )
+            point = self.destination_building.random_point(self.model.rng)
+            self.model.space.move_evacuee(self, (point.x, point.y))
             self.status = "parked"
             self.current_schedule_node = self.destination_schedule_node
             self.destination_schedule_node = None
             self.destination_building = None
             self.leave_time = self.schedule.get_leave_time(
                 self.current_schedule_node,
-                self.model.simulation_time.time(),
-            ).time()
-
-    def _get_speed_limit(self, edge) -> float:
-        try:
-            return int(re.sub(r"\D", "", edge["maxspeed"])) * self.MPH_TO_KPH
-        except:
-            return 30 * self.MPH_TO_KPH
+                self.model.simulation_time,
+            )
+            self.model.space.update_evacuee_edge(self)
 
-    def _get_edge(self):
-        origin_node = self.roads.nodes.iloc[self.route[self.route_index]]
-        destination_node = self.roads.nodes.iloc[self.route[self.route_index + 1]]
-        return self.roads.nx_graph.get_edge_data(
-            origin_node.name,
-            destination_node.name,
-        )[0]
+    def _get_edge(self) -> int:
+        return self.roads.get_edge_idx(
+            self.route[self.route_index], self.route[self.route_index + 1]
+        )
 
     def _report_to_traffic_sensors(self, code_pos) -> None:
         if len(self.route) > 2 and self.route_index < len(self.route) - 1:
             edge = self._get_edge()
-            osmid = edge["osmid"]
+            osmid = self.roads.edge_osmid[edge]
             if (
                 osmid != self.previous_osmid
                 and osmid in self.model.space.traffic_sensor_osmids
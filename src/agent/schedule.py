@@ -1,219 +1,263 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
 
-import networkx as nx
-from datetime import time, timedelta, date
-import datetime
-from shapely import Point, buffer, Polygon
+from datetime import time, timedelta
+from shapely import Point
 import numpy as np
-import random
-import pointpats
 
 if TYPE_CHECKING:
     from src.agent.evacuee import Evacuee
     from src.agent.building import Building
 
 
-class Schedule:
-    schedule: nx.DiGraph
-    agent: Evacuee
+class ScheduleTable:
+    """
+    A schedule compiled into arrays, shared by every agent that follows it.
+    Locations are referred to by their index in names.  Times are in seconds, and nan where they do not apply.
+    The possible next locations from location i are targets[offsets[i]:offsets[i + 1]], chosen with
+    cumulative weights cum_p[offsets[i]:offsets[i + 1]].
+    """
+
+    names: tuple[str]
+    buildings: tuple[str]
+    start: int
+    leave_at_s: np.ndarray
+    duration_s: np.ndarray
+    variation_s: np.ndarray
+    offsets: np.ndarray
+    targets: np.ndarray
+    cum_p: np.ndarray
+
+    BUILDINGS = (
+        "home",
+        "work",
+        "school",
+        "supermarket",
+        "shop",
+        "recreation",
+        "football",
+    )
 
     def __init__(
         self,
-        agent: Evacuee,
         nodes: list[tuple[str, dict]],
         edges: list[tuple[str, str, dict]],
     ) -> None:
-        G = nx.DiGraph()
-        G.add_nodes_from(nodes)
-        G.add_edges_from(edges)
-        self.schedule = G
+        self.names = tuple(name for name, _ in nodes)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.buildings = tuple(
+            next(building for building in self.BUILDINGS if building in name)
+            for name in self.names
+        )
+
+        def seconds(value: time | timedelta | None) -> float:
+            if value is None:
+                return np.nan
+            if isinstance(value, timedelta):
+                return value.total_seconds()
+            return value.hour * 60 * 60 + value.minute * 60 + value.second
+
+        self.leave_at_s = np.array([seconds(d.get("leave_at")) for _, d in nodes])
+        self.duration_s = np.array([seconds(d.get("duration")) for _, d in nodes])
+        self.variation_s = np.array([seconds(d["variation"]) for _, d in nodes])
+
+        # edges grouped by the location they leave from, in the order they were defined
+        edges = sorted(edges, key=lambda edge: index[edge[0]])
+        sources = np.array([index[u] for u, _, _ in edges], dtype=np.int64)
+        self.targets = np.array([index[v] for _, v, _ in edges], dtype=np.int64)
+        self.offsets = np.searchsorted(sources, np.arange(len(self.names) + 1))
+        p = np.array([d["p"] for _, _, d in edges], dtype=float)
+        self.cum_p = np.cumsum(p) - np.repeat(
+            np.concatenate([[0], np.cumsum(p)])[self.offsets[:-1]],
+            np.diff(self.offsets),
+        )
+
+        # the agent is assumed to start the day at the location with no incoming edges
+        self.start = int(np.setdiff1d(np.arange(len(self.names)), self.targets)[0])
+
+    def journeys(self, buildings: tuple[str, ...]) -> set[tuple[str, str]]:
+        """
+        Returns the (from, to) pairs of building types, out of buildings, that the schedule travels directly between
+        """
+        sources = np.repeat(np.arange(len(self.names)), np.diff(self.offsets))
+        return {
+            (self.buildings[u], self.buildings[v])
+            for u, v in zip(sources, self.targets)
+            if self.buildings[u] in buildings and self.buildings[v] in buildings
+        }
+
+
+class Schedule:
+    agent: Evacuee
+    table: ScheduleTable
+
+    _nodes: list[tuple[str, dict]]
+    _edges: list[tuple[str, str, dict]]
+    _table: ScheduleTable | None = None
+
+    def __init__(self, agent: Evacuee) -> None:
         self.agent = agent
+        self.table = self.compiled()
 
-    def start_position(self, t: time, in_car: bool) -> tuple[str, Point, datetime.time]:
+    @classmethod
+    def compiled(cls) -> ScheduleTable:
+        """
+        Returns the transition table for this schedule, compiling it the first time it is needed
         """
+        if cls.__dict__.get("_table") is None:
+            cls._table = ScheduleTable(cls._nodes, cls._edges)
+        return cls._table
+
+    def start_position(self, t: float, in_car: bool) -> tuple[int, Point, float]:
+        """
+        t (float): start time of the simulation, in seconds since midnight
+
         Returns:
-            current_node_name (str)
+            current_node (int)
             current_location (Point)
-            leave_time (time): if the agent is not currently travelling, this is the time they will leave their current location
-            destination_node_name (str): if the agent is travelling, this is their destination
+            leave_time (float): if the agent is not currently travelling, this is the time they will leave their current location
+            destination_node (int): if the agent is travelling, this is their destination
             destination (Building): if the agent is travelling, this is their destination
             route (list[int]): if the agent is travelling, this is their path
             route_index (int): if the agent is travelling, this is their route index
         """
         # assume that the agent will always be in the same location at the start of the day (most likely at home)
-        # this is the start node and it has zero incoming edges
-        current_node_name = [n for n, d in self.schedule.in_degree() if d == 0][0]
-        date_today = date.today()
-        target_time = datetime.datetime.combine(date_today, t)
-        arrival_time = datetime.datetime.combine(date_today, time(hour=0))
+        current_node = self.table.start
+        target_time = t
+        arrival_time = 0.0
         # time the agent will leave their current location
-        leave_time = self.get_leave_time(current_node_name, arrival_time.time())
+        leave_time = self.get_leave_time(current_node, arrival_time)
 
         # traverse the agent's schedule until time t is reached
         while arrival_time < target_time:
-            leave_time = self.get_leave_time(current_node_name, arrival_time.time())
+            leave_time = self.get_leave_time(current_node, arrival_time)
 
             if leave_time > target_time:
                 break
 
             # select the agent's next destination, based on the assigned probabilities
-            next_node_name = self.get_next_destination_name(current_node_name)
+            next_node = self.get_next_destination(current_node)
 
-            if next_node_name == None:
+            if next_node == None:
                 break
 
-            (path, total_distance) = self.get_path(current_node_name, next_node_name)
+            (path, total_distance) = self.get_path(current_node, next_node)
 
-            total_travel_time = (total_distance / 1000) / self.agent.speed
+            total_travel_time = (total_distance / 1000) / self.agent.speed * 60 * 60
 
-            arrival_time_at_next_node = leave_time + timedelta(hours=total_travel_time)
+            arrival_time_at_next_node = leave_time + total_travel_time
 
             # agent will arrive at their next destination
             if arrival_time_at_next_node < target_time:
-                current_node_name = next_node_name
+                current_node = next_node
                 arrival_time = arrival_time_at_next_node
 
             else:
-                i = 0
-                t = leave_time
-                while t < target_time:
-                    distance_to_next_node = self.agent.roads.distance_between_nodes(
-                        path[i], path[i + 1]
-                    )
-                    time_to_next_node = (
-                        distance_to_next_node / 1000
-                    ) / self.agent.speed
-
-                    t += timedelta(hours=time_to_next_node)
-                    i += 1
-
-                node = self.agent.roads.nodes.iloc[path[i - 1]]
+                route_index = self._route_index_at(path, target_time - leave_time)
                 return (
-                    current_node_name,
-                    Point(node.x, node.y),
+                    current_node,
+                    Point(self.agent.roads.get_coords_from_idx(path[route_index])),
                     None,
-                    next_node_name,
-                    self.building_from_node_name(next_node_name),
+                    next_node,
+                    self.building_from_node(next_node),
                     path,
-                    i - 1,
+                    route_index,
                 )
 
-        current_location = self._point_from_node_name(current_node_name)
+        current_location = self._point_from_node(current_node)
         return (
-            current_node_name,
+            current_node,
             current_location,
-            leave_time.time(),
+            leave_time,
             None,
             None,
             None,
             None,
         )
 
-    def get_next_destination_name(
-        self, current_node_name: str
-    ) -> tuple[str, Building, list[int]]:
-        next_location_options = [
-            n for n in self.schedule.out_edges(current_node_name, data="p")
-        ]
+    def _route_index_at(self, path: list[int], elapsed_s: float) -> int:
+        """
+        Returns the index of the node the agent last reached (or is just reaching), elapsed_s seconds after
+        setting off along path
+        """
+        roads = self.agent.roads
+        nodes = np.asarray(path, dtype=np.int64)
+        # distance from the start of the path to the end of each edge
+        cum_length = np.cumsum(
+            roads.edge_length[roads.get_edges_idx(nodes[:-1], nodes[1:])]
+        )
+        distance = elapsed_s / 60 / 60 * self.agent.speed * 1000
+        route_index = int(np.searchsorted(cum_length, distance, side="left"))
+        return max(min(route_index, len(path) - 2), 0)
 
-        if len(next_location_options) == 0:
+    def get_next_destination(self, current_node: int) -> int | None:
+        table = self.table
+        lo, hi = table.offsets[current_node], table.offsets[current_node + 1]
+
+        if lo == hi:
             return None
 
         # select the agent's next destination, based on the assigned probabilities
-        next_node_name = random.choices(
-            [item[1] for item in next_location_options],
-            weights=[item[2] for item in next_location_options],
-        )[0]
-
-        return next_node_name
-
-    def get_path(self, current_node_name, next_node_name) -> tuple[list[int], float]:
-        origin = self._point_from_node_name(current_node_name)
-        destination = self._point_from_node_name(next_node_name)
-        origin_idx = self.agent.roads.get_nearest_node_idx((origin.x, origin.y))
-        destination_idx = self.agent.roads.get_nearest_node_idx(
-            (destination.x, destination.y)
-        )
+        cum_p = table.cum_p[lo:hi]
+        i = np.searchsorted(cum_p, self.agent.model.rng.random() * cum_p[-1], side="right")
+        return int(table.targets[lo + i])
+
+    def get_path(self, current_node: int, next_node: int) -> tuple[list[int], float]:
+        # agents travel between building entrances, so journeys between the same buildings share a path
+        walk = not self.agent.in_car
+        origin = self.building_from_node(current_node).entrance_pos(walk)
+        destination = self.building_from_node(next_node).entrance_pos(walk)
+        origin_idx = self.agent.roads.get_nearest_node_idx(origin)
+        destination_idx = self.agent.roads.get_nearest_node_idx(destination)
         return self.agent.roads.shortest_path_by_index(origin_idx, destination_idx)
 
-    def get_leave_time(self, node_name: str, arrival_time: time) -> datetime:
-        node = self.schedule.nodes[node_name]
-        date_today = date.today()
+    def get_leave_time(self, node: int, arrival_time: float) -> float:
+        """
+        Returns the time, in seconds since midnight, that the agent will leave a location they arrived at arrival_time
+        """
+        table = self.table
         # apply random variation to the time that the agent will leave their current location
-        time_delta = timedelta(
-            seconds=np.random.normal(0, node["variation"].total_seconds())
-        )
-        arrival_time = datetime.datetime.combine(date_today, arrival_time)
-
-        if "leave_at" in node:
-            leave_time = (
-                datetime.datetime.combine(date_today, node["leave_at"]) + time_delta
-            )
-        elif "duration" in node:
-            leave_time = arrival_time + abs(node["duration"] + time_delta)
+        time_delta = self.agent.model.rng.normal(0, table.variation_s[node])
+
+        if not np.isnan(table.leave_at_s[node]):
+            leave_time = table.leave_at_s[node] + time_delta
+        elif not np.isnan(table.duration_s[node]):
+            leave_time = arrival_time + abs(table.duration_s[node] + time_delta)
         else:
             leave_time = arrival_time
 
-        return leave_time
+        return float(leave_time)
+
+    def node_name(self, node: int) -> str:
+        return self.table.names[node]
 
-    def building_from_node_name(self, node: str) -> Building:
-        if "home" in node:
+    def building_from_node(self, node: int) -> Building:
+        building = self.table.buildings[node]
+        if building == "home":
             return self.agent.home
-        elif "work" in node:
+        elif building == "work":
             return self.agent.work
-        elif "school" in node:
+        elif building == "school":
             return self.agent.school
-        elif "supermarket" in node:
+        elif building == "supermarket":
             return self.agent.model.space.get_random_supermarket()
-        elif "shop" in node:
+        elif building == "shop":
             return self.agent.model.space.get_random_shop()
-        elif "recreation" in node:
+        elif building == "recreation":
             return self.agent.model.space.get_random_recreation()
-        elif "football" in node:
+        elif building == "football":
             return self.agent.model.space.get_random_football_stadium()
         else:
-            ValueError("Unknown location: {0}".format(node))
+            ValueError("Unknown location: {0}".format(self.node_name(node)))
 
-    def _point_from_node_name(
+    def _point_from_node(
         self,
-        node: str,
+        node: int,
     ) -> Point:
         """
-        Return the geopgraphic location of the agent based on the name of the node they are at
+        Return the geopgraphic location of the agent based on the node they are at
         """
-        if "home" in node:
-            return self._random_point_in_polygon(self.agent.home.geometry)
-        elif "work" in node:
-            return self._random_point_in_polygon(self.agent.work.geometry)
-        elif "school" in node:
-            return self._random_point_in_polygon(self.agent.school.geometry)
-        elif "supermarket" in node:
-            return self._random_point_in_polygon(
-                self.agent.model.space.get_random_supermarket().geometry
-            )
-        elif "shop" in node:
-            return self._random_point_in_polygon(
-                self.agent.model.space.get_random_shop().geometry
-            )
-        elif "recreation" in node:
-            return self._random_point_in_polygon(
-                self.agent.model.space.get_random_recreation().geometry
-            )
-        elif "football" in node:
-            return self._random_point_in_polygon(
-                self.agent.model.space.get_random_football_stadium().geometry
-            )
-        else:
-            ValueError("Unknown location: {0}".format(node))
-
-    def _random_point_in_polygon(self, geometry: Polygon):
-        # A buffer is added because the method hangs if the polygon is too small
-        return Point(
-            pointpats.random.poisson(
-                buffer(geometry=geometry, distance=0.000001), size=1
-            )
-        )
+        return self.building_from_node(node).random_point(self.agent.model.rng)
 
 
 class ChildSchedule(Schedule):
@@ -255,9 +299,6 @@ class ChildSchedule(Schedule):
         ("recreation", "home 2", {"p": 1}),
     ]
 
-    def __init__(self, agent: Evacuee) -> None:
-        super().__init__(agent, self._nodes, self._edges)
-
 
 class WorkingAdultSchedule(Schedule):
     _nodes = [
@@ -330,9 +371,6 @@ class WorkingAdultSchedule(Schedule):
         ("recreation 2", "home 3", {"p": 1}),
     ]
 
-    def __init__(self, agent: Evacuee) -> None:
-        super().__init__(agent, self._nodes, self._edges)
-
 
 class RetiredAdultSchedule(Schedule):
     _nodes = [
@@ -377,9 +415,6 @@ class RetiredAdultSchedule(Schedule):
         ("recreation 2", "home 3", {"p": 1}),
     ]
 
-    def __init__(self, agent: Evacuee) -> None:
-        super().__init__(agent, self._nodes, self._edges)
-
 
 class FootballMatchSchedule(Schedule):
     _nodes = [
@@ -396,5 +431,11 @@ class FootballMatchSchedule(Schedule):
         ("football", "home 2", {"p": 1}),
     ]
 
-    def __init__(self, agent: Evacuee) -> None:
-        super().__init__(agent, self._nodes, self._edges)
+
+# the schedule followed by each category of agent
+SCHEDULES: dict[int, type[Schedule]] = {
+    0: ChildSchedule,
+    1: WorkingAdultSchedule,
+    2: RetiredAdultSchedule,
+    3: FootballMatchSchedule,
+}
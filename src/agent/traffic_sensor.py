@@ -1,13 +1,12 @@
 import mesa_geo as mg
 import osmnx as ox
-from datetime import datetime
 
 
 class TrafficRecord:
-    time: datetime
+    time: float  # seconds, see EvacuationModel.simulation_time
     type: str
 
-    def __init__(self, time: datetime, type: str) -> None:
+    def __init__(self, time: float, type: str) -> None:
         self.time = time
         self.type = type
 
@@ -1,36 +1,43 @@
 import mesa
 import mesa_geo as mg
 import geopandas as gpd
-from networkx import write_gml, compose
-import osmnx as ox
+from networkx import compose
 from shapely import Polygon, Point
 from geopandas import GeoDataFrame
 import uuid
-import random
+import hashlib
+import os
+import json
 from datetime import datetime, timedelta, time, date
 import numpy as np
 
-from src.agent.building import (
-    Building,
-    FootballStadium,
-    Home,
-    RecreationBuilding,
-    School,
-    Shop,
-    Supermarket,
-    WorkPlace,
-)
+from src.agent.building import Building
 from src.agent.evacuee import Behaviour, Evacuee
+from src.agent.schedule import SCHEDULES
 from src.agent.evacuation_zone import EvacuationZone, EvacuationZoneExit
 from src.agent.traffic_sensor import TrafficSensor
 from src.space.city import City
 from src.space.road_network import RoadNetwork
+from src.space.graph_store import GraphStore
+from src.space.city_bundle import (
+    BUILDING_TYPES,
+    CityBundle,
+    entrance_node_idx,
+    load_osm_buildings,
+)
+from src.model.population import Population
+from src.model.trajectory import (
+    STATE_COLUMNS,
+    TrajectoryCollector,
+    TrajectoryWriter,
+)
+from src.model.vectorised_movement import VectorisedMovement
 import pandas as pd
 import csv
 
 
 def get_time_elapsed(model) -> timedelta:
-    return model.simulation_time - model.simulation_start_time
+    return timedelta(seconds=model.simulation_time - model.simulation_start_time)
 
 
 def get_is_evacuation_started(model) -> bool:
@@ -47,18 +54,31 @@ class EvacuationModel(mesa.Model):
     domain: Polygon
     num_agents: int
 
-    simulation_time = datetime
-    simulation_start_time = datetime
-    evacuation_start_time = datetime
+    # times are in seconds since midnight at the start of the simulation, and are only converted to dates and
+    # times of day for output (see datetime_at)
+    simulation_date: date
+    simulation_time: float
+    simulation_start_time: float
+    evacuation_start_time: float
     evacuation_duration: timedelta
 
     evacuating: bool = False
     agent_data: pd.DataFrame
     agent_behaviour: dict[Behaviour, float] | None
+    rng: np.random.Generator
 
     sensor_locations: list[str]
-
-    TIMESTEP = timedelta(seconds=10)
+    movement: VectorisedMovement | None
+    trajectory: TrajectoryCollector | None
+    # the step number of the model's first step in the output files, which is past the end of the existing output
+    # when appending to it
+    first_step: int = 0
+    # number of steps between writes of the model data and traffic sensor records to the output files
+    flush_interval: int
+    # number of rows of model data already written to the output files
+    _model_rows_written: int = 0
+
+    TIMESTEP = 10  # seconds
 
     def __init__(
         self,
@@ -78,32 +98,76 @@ class EvacuationModel(mesa.Model):
         evacuate_on_foot: bool = True,
         sensor_locations: list[Point] = [],
         agent_behaviour: dict[Behaviour, float] | None = None,
-        curiosity_radius_m: int = 200
+        curiosity_radius_m: int = 200,
+        vectorised_movement: bool = False,
+        city_bundle_path: str | None = None,
+        routing: str = "dijkstra",
+        default_speed_limits: dict[str, float] | None = None,
+        seed: int | None = None,
+        flush_interval: int = TrajectoryCollector.FLUSH_STEPS,
+        append_output: bool = False,
+        agent_interval: int = 1,
+        agent_fields: tuple[str, ...] = STATE_COLUMNS,
+        metrics_only: bool = False,
+        graph_output_path: str | None = None,
     ) -> None:
         super().__init__()
+        # every random draw in the model comes from these generators, so runs with the same seed are identical
+        self.reset_randomizer(seed)
+        self.rng = np.random.default_rng(seed)
         self.city = city
         self.schedule = mesa.time.RandomActivation(self)
         self.space = City(crs="EPSG:27700", model=self)
         self.num_agents = num_agents
         self.agent_behaviour = agent_behaviour
         self.output_path = output_path
+        # append this run to the output files of an earlier run at output_path, continuing their step numbers,
+        # rather than overwriting them.  the model still starts from its initial state, as no state is restored
+        self.append_output = append_output
+        self.flush_interval = flush_interval
+        # only write the model data and traffic sensor records, without the evacuee trajectories, graph or gpkg
+        self.metrics_only = metrics_only
+        # where the road network is stored for the output files, by default a graphs directory beside them.  runs
+        # that share a directory only store the network once.
+        self.graph_output_path = graph_output_path
         self._load_domain_from_file(domain_path)
         self._load_agent_data_from_file(agent_data_path)
-        self._load_buildings()
-        self.roads_drive = RoadNetwork(self.domain, False)
-        self.roads_walk = RoadNetwork(self.domain, True)
-        self._set_building_entrance()
-
-        date_today = date.today()
-        self.simulation_time = datetime.combine(
-            date_today, time(hour=simulation_start_h, minute=simulation_start_m)
-        )
+        # shortest path algorithm used by the road networks, "dijkstra", "landmarks" (A* with landmark lower bounds)
+        # or "contraction" (contraction hierarchies)
+        self.routing = routing
+        # speed limits in km/h by highway type, for roads without a maxspeed tag
+        self.default_speed_limits = default_speed_limits
+        if city_bundle_path is None:
+            self._load_buildings()
+            self.roads_drive = RoadNetwork(
+                self.domain,
+                False,
+                routing=self.routing,
+                default_speed_limits=self.default_speed_limits,
+            )
+            self.roads_walk = RoadNetwork(
+                self.domain,
+                True,
+                routing=self.routing,
+                default_speed_limits=self.default_speed_limits,
+            )
+            self._set_building_entrance()
+        else:
+            # buildings, roads and building entrances have been precompiled (see scripts/compile_city.py)
+            self._load_city_bundle(city_bundle_path)
+
+        self.simulation_date = date.today()
+        self.simulation_time = simulation_start_h * 60 * 60 + simulation_start_m * 60
         self.simulation_start_time = self.simulation_time
-        self.evacuation_start_time = datetime.combine(
-            date_today, time(hour=evacuation_start_h, minute=evacuation_start_m)
-        )
+        self.evacuation_start_time = evacuation_start_h * 60 * 60 + evacuation_start_m * 60
 
         self._create_evacuees(mean_evacuation_delay_m, car_use_pc, evacuate_on_foot, curiosity_radius_m)
+        # if enabled, evacuees are moved in a single batched update each step, rather than by calling each agent's step method
+        self.movement = (
+            VectorisedMovement(self, self.space.evacuees)
+            if vectorised_movement
+            else None
+        )
         self.datacollector = mesa.DataCollector(
             model_reporters={
                 "evacuation_started": get_is_evacuation_started,
@@ -111,18 +175,31 @@ class EvacuationModel(mesa.Model):
                 "number_evacuated": number_evacuated,
                 "number_to_evacuate": number_to_evacuate,
             },
-            agent_reporters={
-                "location": "geometry",
-                "type": "type",
-                "in_car": lambda x: x.in_car if hasattr(x, "in_car") else None,
-                "status": lambda x: x.status if hasattr(x, "status") else None,
-                "diverted": lambda x: x.diverted if hasattr(x, "diverted") else None,
-                "requires_evacuation": lambda x: (
-                    x.requires_evacuation if hasattr(x, "requires_evacuation") else None
-                ),
-                "evacuated": lambda x: x.evacuated if hasattr(x, "evacuated") else None,
-            },
         )
+        # evacuee trajectories are streamed to a columnar store alongside the other output files.  agent_fields are
+        # recorded once every agent_interval steps.
+        if metrics_only or output_path is None:
+            self.trajectory = None
+            if append_output and output_path is not None:
+                self.first_step = self._next_model_step(output_path + ".model.csv")
+        else:
+            writer = TrajectoryWriter(
+                output_path + ".agent",
+                len(self.space.evacuees),
+                append_output,
+                fields=agent_fields,
+                interval=agent_interval,
+            )
+            if append_output:
+                first_step = max(
+                    writer.last_step + 1,
+                    self._next_model_step(output_path + ".model.csv"),
+                )
+                # recorded steps stay a whole number of intervals apart
+                self.first_step = -(-first_step // agent_interval) * agent_interval
+            self.trajectory = TrajectoryCollector(
+                self, writer, flush_steps=flush_interval, first_step=self.first_step
+            )
         self.bomb_location = bomb_location
         self.evacuation_zone_radius = evacuation_zone_radius
         self.evacuating = False
@@ -130,7 +207,7 @@ class EvacuationModel(mesa.Model):
         self.output_path = output_path
         if sensor_locations is not None and len(sensor_locations) > 0:
             self._set_sensor_locations(sensor_locations)
-        self.datacollector.collect(self)
+        self._collect()
 
     def run(self, steps: int = None):
         if steps == None:
@@ -141,12 +218,9 @@ class EvacuationModel(mesa.Model):
                 self.step()
 
         if self.output_path is not None:
-            self.datacollector.get_agent_vars_dataframe().to_csv(
-                self.output_path + ".agent.csv"
-            )
-            self.datacollector.get_model_vars_dataframe().to_csv(
-                self.output_path + ".model.csv"
-            )
+            if self.trajectory is not None:
+                self.trajectory.flush()
+            self._flush_output()
             self._write_output_files()
 
     def step(self) -> None:
@@ -157,8 +231,88 @@ class EvacuationModel(mesa.Model):
             self.evacuating = True
             self._start_evacuation(self.bomb_location, self.evacuation_zone_radius)
 
-        self.schedule.step()
+        if self.movement is None:
+            if self.evacuating:
+                self.space.update_curiosity()
+            self.schedule.step()
+        else:
+            self.movement.step()
+            self.schedule.steps += 1
+            self.schedule.time += 1
+        self._collect()
+
+    def _collect(self) -> None:
         self.datacollector.collect(self)
+        if self.trajectory is not None:
+            self.trajectory.collect()
+        # one row of model data is collected when the model is created, then one each step
+        num_rows = self.schedule.steps + 1
+        if (
+            self.output_path is not None
+            and num_rows - self._model_rows_written >= self.flush_interval
+        ):
+            self._flush_output()
+
+    def _flush_output(self) -> None:
+        """
+        Write the model data and traffic sensor records collected since the last flush to the output files, so
+        that they are not lost if the run is interrupted
+        """
+        model_path = self.output_path + ".model.csv"
+        sensors_path = self.output_path + ".traffic-sensors.csv"
+        # when appending, the files continue those of the earlier run, and so do the steps of the model data
+        first_flush = self._model_rows_written == 0
+        append_model = not first_flush or (
+            self.append_output and os.path.exists(model_path)
+        )
+        append_sensors = not first_flush or (
+            self.append_output and os.path.exists(sensors_path)
+        )
+
+        rows = slice(self._model_rows_written, None)
+        model_vars = {
+            name: values[rows] for name, values in self.datacollector.model_vars.items()
+        }
+        num_rows = len(model_vars["evacuation_started"])
+        first_row = self.first_step + self._model_rows_written
+        model_df = pd.DataFrame(
+            model_vars, index=pd.RangeIndex(first_row, first_row + num_rows)
+        )
+        model_df.to_csv(
+            model_path, mode="a" if append_model else "w", header=not append_model
+        )
+        self._model_rows_written += num_rows
+
+        with open(sensors_path, "a" if append_sensors else "w") as csvfile:
+            writer = csv.writer(csvfile)
+            if not append_sensors:
+                writer.writerow(["osmid", "time", "type"])
+            for sensor in self.space.traffic_sensors:
+                for record in sensor.records:
+                    writer.writerow(
+                        [sensor.osmid, self.datetime_at(record.time), record.type]
+                    )
+        # sensors may share their list of records, so they are only cleared once every sensor has been written
+        for sensor in self.space.traffic_sensors:
+            sensor.records.clear()
+
+    @staticmethod
+    def _next_model_step(model_path: str) -> int:
+        """
+        Returns the step after the last one in the model data at model_path, or 0 if there is none
+        """
+        if not os.path.exists(model_path):
+            return 0
+        steps = pd.read_csv(model_path, index_col=0).index
+        return int(steps.max()) + 1 if len(steps) > 0 else 0
+
+    def datetime_at(self, seconds: float) -> datetime:
+        """
+        Returns the date and time of day a number of seconds after midnight at the start of the simulation
+        """
+        return datetime.combine(self.simulation_date, time(hour=0)) + timedelta(
+            seconds=seconds
+        )
 
     def _load_domain_from_file(self, domain_path: str) -> None:
         df = gpd.read_file(domain_path).set_crs("EPSG:4326", allow_override=True)
@@ -168,66 +322,40 @@ class EvacuationModel(mesa.Model):
         self.agent_data = pd.read_csv(agent_data_path)
 
     def _load_buildings(self) -> None:
-        def polygon(gdf: GeoDataFrame) -> GeoDataFrame:
-            return gdf[gdf.geometry.geom_type == "Polygon"].reset_index()
-
-        def add_building_agents(
-            building_type: type[Building], building_gdf: GeoDataFrame
-        ):
-            buildings = mg.AgentCreator(
-                building_type, model=self, crs="EPSG:27700"
-            ).from_GeoDataFrame(building_gdf)
-            self.space.add_buildings(buildings)
-
-        def load_osm_buildings(tags: dict):
-            buildings_df = polygon(ox.features_from_polygon(self.domain, tags=tags))
-            buildings_df.index.name = "unique_id"
-            buildings_df.geometry = buildings_df.geometry.to_crs("EPSG:27700")
-            buildings_df["centroid"] = list(
-                zip(buildings_df.centroid.x, buildings_df.centroid.y)
-            )
-            return buildings_df
-
-        homes = load_osm_buildings(
-            {
-                "building": [
-                    "apartments",
-                    "bungalow",
-                    "detached",
-                    "dormitory",
-                    "hotel",
-                    "house",
-                    "residential",
-                    "semidetached_house",
-                    "terrace",
-                ]
-            }
+        self._add_buildings(load_osm_buildings(self.domain))
+
+    def _load_city_bundle(self, city_bundle_path: str) -> None:
+        bundle = CityBundle.load(city_bundle_path)
+        self._add_buildings(bundle.buildings)
+        self.roads_drive = RoadNetwork.from_graph(
+            bundle.drive_graph,
+            routing=self.routing,
+            default_speed_limits=self.default_speed_limits,
+            graph_key=bundle.drive_key,
         )
-
-        add_building_agents(Home, homes)
-        add_building_agents(
-            School,
-            load_osm_buildings({"amenity": ["college", "kindergarten", "school"]}),
-        )
-        add_building_agents(
-            Supermarket,
-            load_osm_buildings({"building": "supermarket", "shop": ["convenience"]}),
+        self.roads_walk = RoadNetwork.from_graph(
+            bundle.walk_graph,
+            routing=self.routing,
+            default_speed_limits=self.default_speed_limits,
+            graph_key=bundle.walk_key,
         )
-        add_building_agents(Shop, load_osm_buildings({"building": "retail"}))
-        add_building_agents(
-            RecreationBuilding,
-            load_osm_buildings(
-                {"leisure": True, "amenity": ["bar", "cafe", "pub", "restaurant"]}
-            ),
+
+        buildings = self._all_buildings()
+        self._set_building_entrance_from_idx(
+            buildings,
+            [building.entrance_walk_idx for building in buildings],
+            [building.entrance_drive_idx for building in buildings],
         )
-        add_building_agents(FootballStadium, load_osm_buildings({"leisure": "stadium"}))
 
-        all_buildings_df = load_osm_buildings({"building": True})
-        work_places_df = all_buildings_df.overlay(homes, how="difference")
-        add_building_agents(WorkPlace, work_places_df)
+    def _add_buildings(self, buildings: dict[str, GeoDataFrame]) -> None:
+        for building_type, building_gdf in buildings.items():
+            agents = mg.AgentCreator(
+                BUILDING_TYPES[building_type], model=self, crs="EPSG:27700"
+            ).from_GeoDataFrame(building_gdf)
+            self.space.add_buildings(agents)
 
-    def _set_building_entrance(self) -> None:
-        for building in (
+    def _all_buildings(self) -> list[Building]:
+        return [
             *self.space.homes,
             *self.space.work_buildings,
             *self.space.recreation_buildings,
@@ -235,48 +363,111 @@ class EvacuationModel(mesa.Model):
             *self.space.shops,
             *self.space.schools,
             *self.space.football_stadiums,
-        ):
-            building.entrance_pos_walk = self.roads_walk.get_nearest_node_coords(
-                building.centroid
-            )
-            building.entrance_pos_drive = self.roads_drive.get_nearest_node_coords(
-                building.centroid
-            )
+        ]
+
+    def _set_building_entrance(self) -> None:
+        buildings = self._all_buildings()
+        centroids = [building.centroid for building in buildings]
+        self._set_building_entrance_from_idx(
+            buildings,
+            entrance_node_idx(self.roads_walk, centroids),
+            entrance_node_idx(self.roads_drive, centroids),
+        )
+
+    def _set_building_entrance_from_idx(
+        self,
+        buildings: list[Building],
+        walk_idx: list[int],
+        drive_idx: list[int],
+    ) -> None:
+        for building, walk, drive in zip(buildings, walk_idx, drive_idx):
+            building.entrance_pos_walk = self.roads_walk.get_coords_from_idx(walk)
+            building.entrance_pos_drive = self.roads_drive.get_coords_from_idx(drive)
 
     def _create_evacuees(
         self, mean_evacuation_delay_m: int, car_use_pc: int, evacuate_on_foot: bool, curiosity_radius_m: int
     ) -> None:
-        for _ in range(self.num_agents):
-            random_home = self.space.get_random_home()
-            random_work = self.space.get_random_work()
-            random_school = self.space.get_random_school()
+        population = Population.sample(
+            self.rng,
+            self.num_agents,
+            self.space,
+            self.agent_data,
+            self.agent_behaviour,
+            mean_evacuation_delay_m,
+            car_use_pc,
+        )
+        self._prefetch_commute_paths(population)
 
+        for i in range(len(population)):
             evacuee = Evacuee(
-                unique_id=uuid.uuid4().int,
+                unique_id=self._random_unique_id(),
                 model=self,
                 crs="EPSG:27700",
-                home=random_home,
-                work=random_work,
-                school=random_school,
-                category=random.choices(
-                    population=self.agent_data.code, weights=self.agent_data.proportion
-                )[0],
-                mean_evacuation_delay_m=mean_evacuation_delay_m,
-                car_use_pc=car_use_pc,
+                home=population.homes[i],
+                work=population.works[i],
+                school=population.schools[i],
+                category=int(population.category[i]),
+                walking_speed=float(population.walking_speed[i]),
+                in_car=bool(population.in_car[i]),
+                evacuation_delay_s=float(population.evacuation_delay_s[i]),
                 evacuate_on_foot=evacuate_on_foot,
-                behaviour=random.choices(
-                    list(self.agent_behaviour.keys()),
-                    list(self.agent_behaviour.values()),
-                )[0],
+                behaviour=population.behaviour[i],
                 curiosity_radius_m=curiosity_radius_m
             )
 
             self.space.add_evacuee(evacuee)
+            self.space.update_evacuee_edge(evacuee)
             self.schedule.add(evacuee)
 
+        self.roads_walk.clear_prefetched_paths()
+        self.roads_drive.clear_prefetched_paths()
+
+    def _random_unique_id(self) -> int:
+        # drawn from the model's generator, so that agents have the same ids in runs with the same seed
+        return uuid.UUID(int=self.random.getrandbits(128), version=4).int
+
+    def _prefetch_commute_paths(self, population: Population) -> None:
+        """
+        Find the paths each agent's schedule can take between their home, work and school in one batch per
+        road network, as these are needed to place agents part way through their day
+        """
+        for roads, walk in ((self.roads_walk, True), (self.roads_drive, False)):
+            # agents only travel on the network for their mode of transport
+            agents = np.flatnonzero(population.in_car != walk)
+            if len(agents) == 0:
+                continue
+            entrance_idx = {
+                building_type: roads.get_nearest_nodes_idx(
+                    [buildings[i].entrance_pos(walk) for i in agents]
+                )
+                for building_type, buildings in (
+                    ("home", population.homes),
+                    ("work", population.works),
+                    ("school", population.schools),
+                )
+            }
+            category = population.category[agents]
+
+            origin_idx, destination_idx = [], []
+            for code, schedule in SCHEDULES.items():
+                # only the journeys this category's schedule makes
+                mask = category == code
+                if not mask.any():
+                    continue
+                for origin, destination in schedule.compiled().journeys(
+                    tuple(entrance_idx)
+                ):
+                    origin_idx.append(entrance_idx[origin][mask])
+                    destination_idx.append(entrance_idx[destination][mask])
+
+            if origin_idx:
+                roads.prefetch_shortest_paths(
+                    np.concatenate(origin_idx), np.concatenate(destination_idx)
+                )
+
     def _start_evacuation(self, centre_point: Point, radius: int) -> None:
         evacuation_zone = EvacuationZone(
-            unique_id=uuid.uuid4().int,
+            unique_id=self._random_unique_id(),
             model=self,
             crs="EPSG:27700",
             centre_point=centre_point,
@@ -297,14 +488,35 @@ class EvacuationModel(mesa.Model):
         self.space.add_exits(exits_drive, False)
 
         self.schedule.add(evacuation_zone)
-        self.safe_roads_walk = RoadNetwork(self.domain, True)
-        self.safe_roads_drive = RoadNetwork(self.domain, False)
-        self.safe_roads_walk.remove_nodes_in_polygon(evacuation_zone.geometry)
-        self.safe_roads_drive.remove_nodes_in_polygon(evacuation_zone.geometry)
+        if self.movement is not None:
+            # bring the agents up to date with their progress along their routes, which is copied back below
+            self.movement.push_all()
+        self.safe_roads_walk = self.roads_walk.without_nodes_in_polygon(
+            evacuation_zone.geometry
+        )
+        self.safe_roads_drive = self.roads_drive.without_nodes_in_polygon(
+            evacuation_zone.geometry
+        )
 
         for agent in self.space.evacuees:
             agent.evacuate()
 
+        if self.movement is not None:
+            self.movement.pull_all()
+
+    def _road_network_key(self) -> str | None:
+        """
+        Returns a key for the road networks, with their speed limits, if both came from the graph store, so that they
+        do not need to be hashed
+        """
+        keys = (self.roads_walk.graph_key, self.roads_drive.graph_key)
+        if None in keys:
+            return None
+        h = hashlib.sha256()
+        h.update("|".join(keys).encode())
+        h.update(json.dumps(self.default_speed_limits, sort_keys=True).encode())
+        return h.hexdigest()
+
     def _set_sensor_locations(self, sensor_locations: list[Point]) -> None:
         gdf = gpd.GeoDataFrame(
             [{"geometry": location for location in sensor_locations}], crs="EPSG:27700"
@@ -315,10 +527,32 @@ class EvacuationModel(mesa.Model):
         self.space.add_traffic_sensors(sensors)
 
     def _write_output_files(self):
-        output_gml = self.output_path + ".gml"
-        graph = compose(self.roads_walk.nx_graph, self.roads_drive.nx_graph)
-        cast_graph_attributes_to_builtin_types(graph)
-        write_gml(graph, path=output_gml, stringizer=lambda x: str(x))
+        if self.metrics_only:
+            return
+
+        # the road network is the same for every run in a city, so it is stored once and referenced by its key, with
+        # the store's path relative to the output files so that they can be moved together
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        graph_store = GraphStore(
+            self.graph_output_path
+            if self.graph_output_path is not None
+            else os.path.join(output_dir, "graphs")
+        )
+        key = self._road_network_key()
+        if key is None or not graph_store.has_graph(key):
+            key = graph_store.put_graph(
+                compose(self.roads_walk.nx_graph, self.roads_drive.nx_graph), key
+            )
+        with open(self.output_path + ".graph.json", "w") as f:
+            json.dump(
+                {
+                    "key": key,
+                    "store": os.path.relpath(
+                        os.path.abspath(graph_store.path), output_dir
+                    ),
+                },
+                f,
+            )
 
         output_gpkg = self.output_path + ".gpkg"
 
@@ -334,28 +568,10 @@ class EvacuationModel(mesa.Model):
             output_gpkg, layer="buildings", driver="GPKG"
         )
 
-        with open(self.output_path + ".traffic-sensors.csv", "w") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["osmid", "time", "type"])
-            for sensor in self.space.traffic_sensors:
-                for record in sensor.records:
-                    writer.writerow([sensor.osmid, record.time, record.type])
-
 
 def number_evacuated(model: EvacuationModel):
-    return len([agent for agent in model.space.evacuees if agent.evacuated])
+    return model.space.number_evacuated
 
 
 def number_to_evacuate(model: EvacuationModel):
-    return len([agent for agent in model.space.evacuees if agent.requires_evacuation])
-
-def cast_graph_attributes_to_builtin_types(G):
-    for _, data in G.nodes(data=True):
-        for key, val in data.items():
-            if isinstance(val, (np.generic, np.ndarray)):
-                data[key] = val.item()  # cast to Python float/int
-
-    for _, _, data in G.edges(data=True):
-        for key, val in data.items():
-            if isinstance(val, (np.generic, np.ndarray)):
-                data[key] = val.item()
+    return model.space.number_to_evacuate
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+import numpy as np
+import pandas as pd
+
+from src.agent.building import Building, School
+from src.agent.evacuee import Behaviour
+
+if TYPE_CHECKING:
+    from src.space.city import City
+
+
+class Population:
+    """
+    Attributes of every evacuee, drawn for the whole population at once.
+    Entry i of each array (or list) describes the i-th evacuee to be created.
+    """
+
+    category: np.ndarray
+    walking_speed: np.ndarray
+    behaviour: list[Optional[Behaviour]]
+    in_car: np.ndarray
+    evacuation_delay_s: np.ndarray
+    homes: list[Building]
+    works: list[Building]
+    schools: list[Building]
+
+    def __init__(
+        self,
+        category: np.ndarray,
+        walking_speed: np.ndarray,
+        behaviour: list[Optional[Behaviour]],
+        in_car: np.ndarray,
+        evacuation_delay_s: np.ndarray,
+        homes: list[Building],
+        works: list[Building],
+        schools: list[Building],
+    ) -> None:
+        self.category = category
+        self.walking_speed = walking_speed
+        self.behaviour = behaviour
+        self.in_car = in_car
+        self.evacuation_delay_s = evacuation_delay_s
+        self.homes = homes
+        self.works = works
+        self.schools = schools
+
+    def __len__(self) -> int:
+        return len(self.category)
+
+    @classmethod
+    def sample(
+        cls,
+        rng: np.random.Generator,
+        num_agents: int,
+        space: City,
+        agent_data: pd.DataFrame,
+        agent_behaviour: dict[Behaviour, float] | None,
+        mean_evacuation_delay_m: int | None,
+        car_use_pc: int,
+    ) -> Population:
+        """
+        agent_data (DataFrame): the code, proportion and walking_speed of each category of agent
+        agent_behaviour (dict): the proportion of agents with each behaviour
+        mean_evacuation_delay_m (int): scale of the Rayleigh distribution of evacuation delays, or None for no delay
+        car_use_pc (int): percentage of agents that travel by car
+        """
+        proportion = agent_data.proportion.to_numpy(dtype=float)
+        category = rng.choice(
+            agent_data.code.to_numpy(), size=num_agents, p=proportion / proportion.sum()
+        )
+        # categories are numbered by their position in agent_data
+        walking_speed = agent_data.walking_speed.to_numpy(dtype=float)[category]
+
+        if agent_behaviour is None:
+            behaviour = [None] * num_agents
+        else:
+            behaviours = list(agent_behaviour.keys())
+            weights = np.array(list(agent_behaviour.values()), dtype=float)
+            behaviour = [
+                behaviours[i]
+                for i in rng.choice(
+                    len(behaviours), size=num_agents, p=weights / weights.sum()
+                )
+            ]
+
+        in_car = rng.random(num_agents) * 100 < car_use_pc
+
+        if mean_evacuation_delay_m is None:
+            evacuation_delay_s = np.zeros(num_agents)
+        else:
+            evacuation_delay_s = rng.rayleigh(
+                scale=mean_evacuation_delay_m * 60, size=num_agents
+            )
+
+        homes = [space.homes[i] for i in rng.integers(len(space.homes), size=num_agents)]
+        works = [
+            space.work_buildings[i]
+            for i in rng.integers(len(space.work_buildings), size=num_agents)
+        ]
+        schools = space.get_random_buildings(School.type, num_agents, rng)
+
+        return cls(
+            category,
+            walking_speed,
+            behaviour,
+            in_car,
+            evacuation_delay_s,
+            homes,
+            works,
+            schools,
+        )
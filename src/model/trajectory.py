@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from src.model.model import EvacuationModel
+
+STATUS_CATEGORIES = ("", "parked", "travelling", "evacuating")
+
+# the data recorded for each evacuee at each step
+COLUMNS = {
+    "step": np.int32,
+    "agent": np.int32,
+    "x": np.float32,
+    "y": np.float32,
+    "status": np.int8,
+    "in_car": np.bool_,
+    "diverted": np.bool_,
+    "requires_evacuation": np.bool_,
+    "evacuated": np.bool_,
+}
+
+# the fields compared between steps to find the evacuees whose state has changed
+STATE_COLUMNS = tuple(name for name in COLUMNS if name not in ("step", "agent"))
+
+
+class TrajectoryWriter:
+    """
+    Append-only columnar store of evacuee trajectories.
+    Each column is a raw binary file in the directory at path, described by meta.json, so it can be streamed to
+    during a run and memory mapped when it is read back (see Trajectory).
+    Rows are sorted by step.  At keyframe steps every evacuee has a row, at other steps only the evacuees whose
+    state changed since the previous recorded step.
+    """
+
+    path: str
+    num_agents: int
+    fields: tuple[str, ...]
+    interval: int
+    columns: dict[str, type]
+    rows: int
+    last_step: int
+    keyframes: list[int]
+
+    def __init__(
+        self,
+        path: str,
+        num_agents: int,
+        append: bool = False,
+        fields: tuple[str, ...] = STATE_COLUMNS,
+        interval: int = 1,
+    ) -> None:
+        """
+        append (bool): continue an existing trajectory at path, rather than starting a new one
+        fields (tuple): the columns in STATE_COLUMNS to record
+        interval (int): number of steps between recorded steps
+        """
+        self.path = path
+        self.num_agents = num_agents
+        self.fields = tuple(fields)
+        self.interval = interval
+        self.columns = {
+            name: dtype
+            for name, dtype in COLUMNS.items()
+            if name in ("step", "agent") or name in self.fields
+        }
+        self.rows = 0
+        self.last_step = -1
+        self.keyframes = []
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, "meta.json")
+        if append and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["num_agents"] != num_agents:
+                raise ValueError(
+                    f"Cannot append {num_agents} agents to a trajectory of {meta['num_agents']} agents"
+                )
+            if list(meta["columns"]) != list(self.columns) or meta.get("interval", 1) != interval:
+                raise ValueError(
+                    f"Cannot append to a trajectory with different fields or interval at {path}"
+                )
+            self.rows = meta["rows"]
+            self.last_step = meta["last_step"]
+            self.keyframes = meta["keyframes"]
+            # discard anything written after the last complete row group, e.g. by a run that crashed
+            for name, dtype in self.columns.items():
+                with open(self._column_path(name), "ab") as f:
+                    f.truncate(self.rows * np.dtype(dtype).itemsize)
+        else:
+            for name in self.columns:
+                open(self._column_path(name), "wb").close()
+            self._write_meta()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.path, name + ".bin")
+
+    def write(
+        self, columns: dict[str, np.ndarray], last_step: int, keyframes: list[int]
+    ) -> None:
+        """
+        Append a row group, with one array for every recorded column, covering the steps up to last_step
+        """
+        num_rows = len(columns["step"])
+        for name, dtype in self.columns.items():
+            with open(self._column_path(name), "ab") as f:
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        self.rows += num_rows
+        self.last_step = last_step
+        self.keyframes.extend(keyframes)
+        # the metadata is only updated once the whole row group is on disk, so a crash never leaves a partial row group
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        meta = {
+            "rows": self.rows,
+            "num_agents": self.num_agents,
+            "last_step": self.last_step,
+            "interval": self.interval,
+            "keyframes": self.keyframes,
+            "columns": {
+                name: np.dtype(dtype).str for name, dtype in self.columns.items()
+            },
+            "categories": {"status": list(STATUS_CATEGORIES)},
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+
+def read_trajectory(path: str) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    Returns the metadata and each column of a trajectory written by TrajectoryWriter, with the columns memory mapped
+    rather than read into memory
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    columns = {
+        name: (
+            np.memmap(
+                os.path.join(path, name + ".bin"),
+                dtype=np.dtype(dtype),
+                mode="r",
+                shape=(meta["rows"],),
+            )
+            if meta["rows"] > 0
+            else np.zeros(0, dtype=np.dtype(dtype))
+        )
+        for name, dtype in meta["columns"].items()
+    }
+    return meta, columns
+
+
+def trajectory_to_dataframe(columns: dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Returns a full set of rows as a data frame indexed by Step, with the same columns as mesa's agent data.
+    Only the recorded columns are included.
+    """
+    data = {"Step": columns["step"], "AgentID": columns["agent"]}
+    for name in ("x", "y"):
+        if name in columns:
+            data[name] = columns[name]
+    data["type"] = pd.Categorical.from_codes(
+        np.zeros(len(columns["step"]), dtype=np.int8), ["evacuee"]
+    )
+    for name in STATE_COLUMNS:
+        if name in ("x", "y") or name not in columns:
+            continue
+        if name == "status":
+            data[name] = pd.Categorical.from_codes(columns[name], STATUS_CATEGORIES)
+        else:
+            data[name] = columns[name]
+    return pd.DataFrame(data, copy=False).set_index("Step")
+
+
+class Trajectory:
+    """
+    Reads a trajectory written by TrajectoryWriter, rebuilding the state of every evacuee at any step from the
+    keyframe before it and the changes recorded since
+    """
+
+    num_agents: int
+    last_step: int
+    interval: int
+    fields: tuple[str, ...]
+    keyframes: np.ndarray
+    columns: dict[str, np.ndarray]
+
+    def __init__(self, path: str) -> None:
+        meta, self.columns = read_trajectory(path)
+        self.num_agents = meta["num_agents"]
+        self.last_step = meta["last_step"]
+        self.interval = meta.get("interval", 1)
+        self.fields = tuple(name for name in STATE_COLUMNS if name in self.columns)
+        self.keyframes = np.array(meta["keyframes"], dtype=np.int64)
+
+    def _rows(self, first_step: int, last_step: int) -> tuple[int, int]:
+        step = self.columns["step"]
+        return (
+            int(np.searchsorted(step, first_step, side="left")),
+            int(np.searchsorted(step, last_step, side="right")),
+        )
+
+    def _apply(self, state: dict[str, np.ndarray], lo: int, hi: int) -> None:
+        if lo == hi:
+            return
+        # where an evacuee has several rows, the latest one wins
+        agents = self.columns["agent"][lo:hi]
+        _, last = np.unique(agents[::-1], return_index=True)
+        rows = np.arange(lo, hi)[::-1][last]
+        for name in self.fields:
+            state[name][agents[rows - lo]] = self.columns[name][rows]
+
+    def state_at(self, step: int) -> dict[str, np.ndarray]:
+        """
+        Returns the state of every evacuee at the given step, one array per column indexed by agent.
+        Between recorded steps this is the state at the last recorded step.
+        """
+        if step > self.last_step or len(self.keyframes) == 0 or step < self.keyframes[0]:
+            raise ValueError(f"Step {step} was not recorded")
+        keyframe = int(self.keyframes[np.searchsorted(self.keyframes, step, side="right") - 1])
+        state = {
+            name: np.zeros(self.num_agents, dtype=COLUMNS[name]) for name in self.fields
+        }
+        self._apply(state, *self._rows(keyframe, step))
+        state["step"] = np.full(self.num_agents, step, dtype=np.int32)
+        state["agent"] = np.arange(self.num_agents, dtype=np.int32)
+        return state
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the state of every evacuee at every recorded step
+        """
+        if len(self.keyframes) == 0:
+            return trajectory_to_dataframe(
+                {name: np.zeros(0, dtype=column.dtype) for name, column in self.columns.items()}
+            )
+
+        state = {
+            name: np.zeros(self.num_agents, dtype=COLUMNS[name]) for name in self.fields
+        }
+        steps = range(int(self.keyframes[0]), self.last_step + 1, self.interval)
+        frames = {name: [] for name in self.fields}
+        for step in steps:
+            self._apply(state, *self._rows(step, step))
+            for name in self.fields:
+                frames[name].append(state[name].copy())
+
+        columns = {name: np.concatenate(frames[name]) for name in self.fields}
+        columns["step"] = np.repeat(np.array(steps, dtype=np.int32), self.num_agents)
+        columns["agent"] = np.tile(np.arange(self.num_agents, dtype=np.int32), len(steps))
+        return trajectory_to_dataframe(columns)
+
+
+class TrajectoryCollector:
+    """
+    Records the state of the evacuees at each step: every evacuee at a keyframe, once every KEYFRAME_STEPS steps,
+    and otherwise only the evacuees whose state has changed.  Rows are flushed to the writer every flush_steps
+    steps, so memory use does not grow with the length of the run.  No tail of recent steps is kept in memory, as
+    the live visualisation draws the evacuees from the model itself.
+    Only the writer's fields are recorded, once every interval steps.
+    """
+
+    model: EvacuationModel
+    writer: TrajectoryWriter
+    fields: tuple[str, ...]
+    interval: int
+    flush_steps: int
+    # the step recorded for the model's first step, so that a run appended to the writer continues its steps
+    first_step: int
+    _buffer: list[dict[str, np.ndarray]]
+    _keyframes: list[int]
+    _last_keyframe: int | None
+    # the last step collected, which the next flush covers up to
+    _last_step: int
+    _previous: dict[str, np.ndarray] | None
+
+    FLUSH_STEPS = 10
+    KEYFRAME_STEPS = 60
+
+    def __init__(
+        self,
+        model: EvacuationModel,
+        writer: TrajectoryWriter,
+        flush_steps: int = FLUSH_STEPS,
+        first_step: int = 0,
+    ) -> None:
+        """
+        first_step (int): the step recorded for the model's first step, a multiple of the writer's interval
+        """
+        self.model = model
+        self.writer = writer
+        self.fields = writer.fields
+        self.interval = writer.interval
+        unknown = set(self.fields) - set(STATE_COLUMNS)
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown trajectory fields: {sorted(unknown)}")
+        if self.interval < 1:
+            raise ValueError(f"Trajectory interval must be at least 1, not {self.interval}")
+        self.flush_steps = flush_steps
+        self.first_step = first_step
+        self._buffer = []
+        self._keyframes = []
+        # a new or appended run always starts with a keyframe
+        self._last_keyframe = None
+        self._last_step = -1
+        self._previous = None
+
+    def _snapshot(self) -> dict[str, np.ndarray]:
+        evacuees = self.model.space.evacuees
+        state = {}
+        if "x" in self.fields or "y" in self.fields:
+            xy = self.model.space.get_evacuees_xy(evacuees)
+            if "x" in self.fields:
+                state["x"] = xy[:, 0].astype(np.float32)
+            if "y" in self.fields:
+                state["y"] = xy[:, 1].astype(np.float32)
+        if "status" in self.fields:
+            status_codes = {status: i for i, status in enumerate(STATUS_CATEGORIES)}
+            state["status"] = np.array(
+                [status_codes[evacuee.status] for evacuee in evacuees], dtype=np.int8
+            )
+        for name in ("in_car", "diverted", "requires_evacuation", "evacuated"):
+            if name in self.fields:
+                state[name] = np.array(
+                    [getattr(evacuee, name) for evacuee in evacuees], dtype=bool
+                )
+        return state
+
+    def collect(self) -> None:
+        step = self.first_step + self.model.schedule.steps
+        if step % self.interval != 0:
+            return
+        if step <= self.writer.last_step:
+            raise ValueError(
+                f"Step {step} has already been recorded in {self.writer.path}"
+            )
+
+        state = self._snapshot()
+        num_agents = len(self.model.space.evacuees)
+        if (
+            self._last_keyframe is None
+            or step - self._last_keyframe >= self.KEYFRAME_STEPS
+        ):
+            # evacuees are numbered in the order they were added to the model
+            rows = np.arange(num_agents)
+            self._keyframes.append(step)
+            self._last_keyframe = step
+        else:
+            changed = np.zeros(num_agents, dtype=bool)
+            for name in self.fields:
+                changed |= state[name] != self._previous[name]
+            rows = np.flatnonzero(changed)
+
+        group = {name: state[name][rows] for name in self.fields}
+        group["step"] = np.full(len(rows), step, dtype=np.int32)
+        group["agent"] = rows.astype(np.int32)
+        self._buffer.append(group)
+        self._previous = state
+        self._last_step = step
+
+        if len(self._buffer) >= self.flush_steps:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self._buffer) == 0:
+            return
+        self.writer.write(
+            {
+                name: np.concatenate([group[name] for group in self._buffer])
+                for name in self.writer.columns
+            },
+            self._last_step,
+            self._keyframes,
+        )
+        self._buffer = []
+        self._keyframes = []
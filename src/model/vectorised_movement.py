@@ -0,0 +1,540 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+import numpy as np
+
+from src.agent.evacuee import Behaviour, Evacuee
+
+if TYPE_CHECKING:
+    from src.model.model import EvacuationModel
+    from src.space.road_network import RoadNetwork
+
+
+PARKED = 0
+TRAVELLING = 1
+EVACUATING = 2
+STATUS_CODES = {"parked": PARKED, "travelling": TRAVELLING, "evacuating": EVACUATING}
+
+KPH_TO_MPS = 1000 / 60 / 60
+
+
+class VectorisedMovement:
+    """
+    Array-backed movement engine for the evacuee population.
+
+    Decisions (choosing a destination, starting to evacuate, diverting, arriving) are still made by each Evacuee,
+    but travel along the road network is advanced for every travelling agent in a single batched update per step,
+    following the same rules as Evacuee._move: agents cannot overtake when they reach the end of an edge, and queue
+    behind the nearest agent ahead, leaving the minimum separation.
+
+    Positions are written to the City in bulk.  Progress along the route is only copied back to an agent (see push)
+    before one of its methods is called.
+    """
+
+    model: EvacuationModel
+    agents: list[Evacuee]
+    # row of each agent in the City's position array
+    rows: np.ndarray
+
+    _networks: list[RoadNetwork]
+    _network_ids: dict[int, int]
+    _node_xy: list[tuple[np.ndarray, np.ndarray]]
+    _routes: list[Optional[list[int]]]
+    # agents on the road network at the start of the step, and the edge each was on
+    _occupants: _EdgeOrder
+    _occupant_edge: np.ndarray
+
+    def __init__(self, model: EvacuationModel, evacuees: list[Evacuee]) -> None:
+        self.model = model
+        self.agents = list(evacuees)
+        self.rows = model.space.get_evacuee_rows(self.agents)
+        n = len(self.agents)
+        # agents queue using the arrays in _nearest_agent_ahead, so the City does not need to index them by edge
+        model.space.track_edge_occupancy = False
+
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.status = np.zeros(n, dtype=np.int8)
+        self.has_route = np.zeros(n, dtype=bool)
+        self.network = np.full(n, -1, dtype=np.int64)
+        self.route_offset = np.zeros(n, dtype=np.int64)
+        self.route_length = np.zeros(n, dtype=np.int64)
+        self.route_index = np.zeros(n, dtype=np.int64)
+        self.distance_along_edge = np.zeros(n)
+        self.walking_speed = np.zeros(n)
+        self.curiosity_radius_m = np.zeros(n)
+        self.leave_time_s = np.full(n, np.inf)
+        self.evacuation_delay_s = np.zeros(n)
+        self.in_car = np.zeros(n, dtype=bool)
+        self.curious = np.zeros(n, dtype=bool)
+        self.non_compliant = np.zeros(n, dtype=bool)
+        self.requires_evacuation = np.zeros(n, dtype=bool)
+        self.evacuated = np.zeros(n, dtype=bool)
+
+        # routes of all agents, stored end to end.  leg attributes are stored against the node at the start of the leg
+        self._route_nodes = np.zeros(0, dtype=np.int64)
+        self._route_x = np.zeros(0)
+        self._route_y = np.zeros(0)
+        self._leg_length = np.zeros(0)
+        self._leg_speed_limit = np.zeros(0)
+        self._route_size = 0
+
+        self._networks = []
+        self._network_ids = {}
+        self._node_xy = []
+        self._routes = [None] * n
+
+        self.pull_all()
+
+    def step(self) -> None:
+        self._prepare_to_move()
+        self._move()
+
+    def pull_all(self) -> None:
+        for i in range(len(self.agents)):
+            self.pull(i)
+
+    def push_all(self) -> None:
+        for i in range(len(self.agents)):
+            self.push(i)
+
+    def pull(self, i: int) -> None:
+        """
+        Copy the state of an agent into the arrays, after it has been changed by the agent itself
+        """
+        agent = self.agents[i]
+        self.x[i], self.y[i] = agent.position
+        self.status[i] = STATUS_CODES.get(agent.status, PARKED)
+        self.walking_speed[i] = agent.walking_speed
+        self.curiosity_radius_m[i] = agent.curiosity_radius_m
+        self.leave_time_s[i] = np.inf if agent.leave_time is None else agent.leave_time
+        self.evacuation_delay_s[i] = agent.evacuation_delay_s
+        self.in_car[i] = agent.in_car
+        self.curious[i] = agent.behaviour is Behaviour.CURIOUS
+        self.non_compliant[i] = agent.behaviour is Behaviour.NON_COMPLIANT
+        self.requires_evacuation[i] = agent.requires_evacuation
+        self.evacuated[i] = agent.evacuated
+
+        if agent.route is None:
+            self.has_route[i] = False
+            self.route_length[i] = 0
+            self._routes[i] = None
+        elif agent.route is not self._routes[i]:
+            self.has_route[i] = True
+            self._set_route(i, agent.roads, agent.route)
+
+        self.route_index[i] = agent.route_index if agent.route is not None else 0
+        self.distance_along_edge[i] = agent.distance_along_edge
+
+    def push(
+        self, i: int, position: Optional[tuple[float, float]] = None
+    ) -> None:
+        """
+        Copy the state of an agent from the arrays back to the agent
+        """
+        agent = self.agents[i]
+        agent.route_index = int(self.route_index[i])
+        agent.distance_along_edge = float(self.distance_along_edge[i])
+        agent.evacuated = bool(self.evacuated[i])
+
+        if position is None:
+            position = (float(self.x[i]), float(self.y[i]))
+        if position != agent.position:
+            self.model.space.move_evacuee(agent, position)
+
+    def _call(self, i: int, method: str, *args) -> None:
+        self.push(i)
+        getattr(self.agents[i], method)(*args)
+        self.pull(i)
+
+    def _set_route(self, i: int, roads: RoadNetwork, route: list[int]) -> None:
+        network_id = self._get_network_id(roads)
+        node_x, node_y = self._node_xy[network_id]
+        nodes = np.asarray(route, dtype=np.int64)
+
+        # leg attributes are stored against the node at the start of the leg, so the last entry is unused
+        leg_length = np.zeros(len(nodes))
+        leg_speed_limit = np.zeros(len(nodes))
+        if len(nodes) > 1:
+            edges = roads.get_edges_idx(nodes[:-1], nodes[1:])
+            leg_length[:-1] = roads.edge_length[edges]
+            leg_speed_limit[:-1] = roads.edge_speed_limit[edges]
+
+        offset = self._reserve(len(nodes))
+        end = offset + len(nodes)
+        self._route_nodes[offset:end] = nodes
+        self._route_x[offset:end] = node_x[nodes]
+        self._route_y[offset:end] = node_y[nodes]
+        self._leg_length[offset:end] = leg_length
+        self._leg_speed_limit[offset:end] = leg_speed_limit
+        self._route_size = end
+
+        self.network[i] = network_id
+        self.route_offset[i] = offset
+        self.route_length[i] = len(nodes)
+        self._routes[i] = route
+
+    def _get_network_id(self, roads: RoadNetwork) -> int:
+        if id(roads) not in self._network_ids:
+            self._network_ids[id(roads)] = len(self._networks)
+            self._networks.append(roads)
+            self._node_xy.append((roads.node_x, roads.node_y))
+        return self._network_ids[id(roads)]
+
+    def _reserve(self, size: int) -> int:
+        """
+        Make space for a route of the given size at the end of the route buffers, and return its offset
+        """
+        capacity = len(self._route_nodes)
+        if self._route_size + size <= capacity:
+            return self._route_size
+
+        # discard routes that are no longer in use before growing the buffers
+        self._compact()
+        required = self._route_size + size
+        if required > capacity // 2:
+            capacity = max(2 * capacity, required, 1024)
+            for name in (
+                "_route_nodes",
+                "_route_x",
+                "_route_y",
+                "_leg_length",
+                "_leg_speed_limit",
+            ):
+                buffer = getattr(self, name)
+                grown = np.zeros(capacity, dtype=buffer.dtype)
+                grown[: self._route_size] = buffer[: self._route_size]
+                setattr(self, name, grown)
+        return self._route_size
+
+    def _compact(self) -> None:
+        live = np.flatnonzero(self.has_route & (self.route_length > 0))
+        lengths = self.route_length[live]
+        offsets = np.cumsum(lengths) - lengths
+        source = np.repeat(self.route_offset[live] - offsets, lengths) + np.arange(
+            lengths.sum(), dtype=np.int64
+        )
+        size = len(source)
+        for buffer in (
+            self._route_nodes,
+            self._route_x,
+            self._route_y,
+            self._leg_length,
+            self._leg_speed_limit,
+        ):
+            buffer[:size] = buffer[source]
+        self.route_offset[live] = offsets
+        self._route_size = size
+
+    def _prepare_to_move(self) -> None:
+        model = self.model
+        # agents whose time to leave their current location has passed
+        candidates = (self.status == PARKED) & (model.simulation_time > self.leave_time_s)
+
+        # agents that will begin evacuating this step
+        if model.evacuating:
+            elapsed_s = model.simulation_time - model.evacuation_start_time
+            evacuating = (
+                (self.status != EVACUATING)
+                & (elapsed_s >= self.evacuation_delay_s)
+                & ~self.non_compliant
+            )
+            idx = np.flatnonzero(evacuating)
+            evacuating[idx] = model.space.evacuation_zone.contains_points(
+                self.x[idx], self.y[idx]
+            )
+            candidates |= evacuating
+
+        idx = list(np.flatnonzero(candidates))
+        model.random.shuffle(idx)
+        for i in idx:
+            self._call(i, "_prepare_to_move")
+
+    def _move(self) -> None:
+        model = self.model
+        time_to_travel = np.zeros(len(self.agents))
+        moving = (self.status != PARKED) & self.has_route
+
+        # agents on the last leg of their journey
+        for i in np.flatnonzero(
+            moving & (self.route_index >= self.route_length - 1)
+        ):
+            self._call(i, "_arrive_at_destination")
+            moving[i] = False
+
+        if len(model.space.traffic_sensors) > 0:
+            for i in np.flatnonzero(
+                moving & (self.route_index == 0) & (self.distance_along_edge == 0)
+            ):
+                self._call(i, "_report_to_traffic_sensors", "route index 0")
+
+        time_to_travel[moving] = model.TIMESTEP
+        # agents still travelling this step, and agents whose location must be updated at the end of the step
+        active = moving.copy()
+        moved = moving.copy()
+
+        self._sort_occupants()
+        # each iteration takes every active agent to its next node, or as far as it can get this step
+        while active.any():
+            idx = np.flatnonzero(active)
+            leg = self.route_offset[idx] + self.route_index[idx]
+            speed = self._speed(idx, leg)
+            time_to_next_node = (
+                (self._leg_length[leg] - self.distance_along_edge[idx])
+                / KPH_TO_MPS
+                / speed
+            )
+
+            # agents that will not reach the next node this step
+            stops = time_to_travel[idx] < time_to_next_node
+            short = idx[stops]
+            self.distance_along_edge[short] += (
+                KPH_TO_MPS * time_to_travel[short] * speed[stops]
+            )
+            time_to_travel[short] = 0
+            active[short] = False
+
+            idx = idx[~stops]
+            if len(idx) == 0:
+                break
+            speed = speed[~stops]
+            time_to_next_node = time_to_next_node[~stops]
+
+            # assume agents cannot overtake.  get the nearest agent blocking each agent's path
+            nearest_agent_distance = self._nearest_agent_ahead(idx)
+            blocked = (
+                nearest_agent_distance - self.distance_along_edge[idx]
+                < KPH_TO_MPS * time_to_travel[idx] * speed
+            )
+
+            # travel as far as possible, then queue up behind the nearest agent, leaving the minimum required separation
+            queued = idx[blocked]
+            separation = np.where(
+                self.in_car[queued],
+                Evacuee.CAR_SEPARATION,
+                Evacuee.PEDESTRIAN_SEPARATION,
+            )
+            self.distance_along_edge[queued] = np.maximum(
+                self.distance_along_edge[queued],
+                nearest_agent_distance[blocked] - separation,
+            )
+            time_to_travel[queued] = 0
+            active[queued] = False
+
+            # the path is clear
+            clear = idx[~blocked]
+            time_to_travel[clear] -= time_to_next_node[~blocked]
+            self._pass_node(clear, active, moved)
+
+        self._update_location(np.flatnonzero(moved))
+
+    def _pass_node(self, idx: np.ndarray, active: np.ndarray, moved: np.ndarray):
+        model = self.model
+        previous_x, previous_y = self.x[idx], self.y[idx]
+        self.route_index[idx] += 1
+        self.distance_along_edge[idx] = 0
+        node = self.route_offset[idx] + self.route_index[idx]
+        self.x[idx] = self._route_x[node]
+        self.y[idx] = self._route_y[node]
+
+        if model.evacuating:
+            in_zone = self._nodes_in_zone(self.network[idx], self._route_nodes[node])
+            self._set_evacuated(idx[(self.status[idx] == EVACUATING) & ~in_zone])
+
+            # agents that have crossed into the evacuation zone
+            divert = (
+                in_zone & ~self.requires_evacuation[idx] & ~self.non_compliant[idx]
+            )
+            for i, x, y in zip(
+                idx[divert], previous_x[divert], previous_y[divert]
+            ):
+                agent = self.agents[i]
+                self.push(i, (float(x), float(y)))
+                agent._divert()
+                if agent.route is None:
+                    agent.status = "parked"
+                    agent.leave_time = model.simulation_time
+                    active[i] = False
+                    moved[i] = False
+                self.pull(i)
+            idx = idx[active[idx]]
+
+        if len(model.space.traffic_sensors) > 0:
+            for i in idx:
+                self._call(i, "_report_to_traffic_sensors", "just incremented")
+
+        # agents that have reached their target
+        for i in idx[self.route_index[idx] >= self.route_length[idx] - 1]:
+            self._call(i, "_arrive_at_destination")
+            active[i] = False
+            moved[i] = False
+
+    def _update_location(self, idx: np.ndarray) -> None:
+        model = self.model
+        leg = self.route_offset[idx] + self.route_index[idx]
+        edge_length = self._leg_length[leg]
+        k = np.divide(
+            self.distance_along_edge[idx],
+            edge_length,
+            out=np.zeros(len(idx)),
+            where=edge_length != 0,
+        )
+        self.x[idx] = k * self._route_x[leg + 1] + (1 - k) * self._route_x[leg]
+        self.y[idx] = k * self._route_y[leg + 1] + (1 - k) * self._route_y[leg]
+
+        divert = np.zeros(len(idx), dtype=bool)
+        if model.evacuating:
+            in_zone = model.space.evacuation_zone.contains_points(
+                self.x[idx], self.y[idx]
+            )
+            divert = ~self.requires_evacuation[idx] & in_zone
+            self._set_evacuated(idx[self.requires_evacuation[idx] & ~in_zone])
+
+        moved = idx[~divert]
+        model.space.move_evacuees(
+            self.rows[moved], np.column_stack([self.x[moved], self.y[moved]])
+        )
+        for i in idx[divert]:
+            self._call(i, "_divert")
+
+    def _set_evacuated(self, idx: np.ndarray) -> None:
+        """
+        Mark agents as evacuated, copying the flag back to those that have only just been evacuated, so the City's
+        counters stay up to date
+        """
+        idx = idx[~self.evacuated[idx]]
+        self.evacuated[idx] = True
+        for i in idx:
+            self.agents[i].evacuated = True
+
+    def _nodes_in_zone(self, network: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """
+        Look up whether each road node lies inside the evacuation zone, using the zone's per-node bitmap
+        """
+        zone = self.model.space.evacuation_zone
+        in_zone = np.zeros(len(nodes), dtype=bool)
+        for network_id in np.unique(network):
+            group = network == network_id
+            inside = zone.nodes_inside(self._networks[network_id])
+            in_zone[group] = inside[nodes[group]]
+        return in_zone
+
+    def _speed(self, idx: np.ndarray, leg: np.ndarray) -> np.ndarray:
+        speed = np.where(
+            self.in_car[idx], self._leg_speed_limit[leg], self.walking_speed[idx]
+        )
+        if not self.model.evacuating:
+            return speed
+
+        # curious pedestrians slow down near the centre of the evacuation zone
+        group = np.flatnonzero(self.curious[idx] & ~self.in_car[idx])
+        inside = self.model.space.evacuation_zone.within_curiosity_radius(
+            self.x[idx[group]], self.y[idx[group]], self.curiosity_radius_m[idx[group]]
+        )
+        speed[group[inside]] = self.walking_speed[idx[group[inside]]] * 0.25
+        return speed
+
+    def _occupying(self) -> np.ndarray:
+        """
+        Returns the agents currently on an edge of the road network
+        """
+        return np.flatnonzero(
+            (self.status != PARKED)
+            & self.has_route
+            & (self.route_index < self.route_length - 1)
+        )
+
+    def _edge_key(self, idx: np.ndarray) -> np.ndarray:
+        """
+        Returns an integer that identifies the edge each agent is on, across all of the road networks
+        """
+        size = max((roads.i_graph.vcount() for roads in self._networks), default=0)
+        leg = self.route_offset[idx] + self.route_index[idx]
+        start, end = self._route_nodes[leg], self._route_nodes[leg + 1]
+        return (self.network[idx] * size + start) * size + end
+
+    def _sort_by_edge(self, idx: np.ndarray) -> _EdgeOrder:
+        """
+        Sort agents by the edge they are on, then their distance along the edge
+        """
+        # no agent is further along an edge than its length
+        span = self._leg_length[: self._route_size].max(initial=0) + 1
+        return _EdgeOrder(idx, self._edge_key(idx), self.distance_along_edge[idx], span)
+
+    def _sort_occupants(self) -> None:
+        """
+        Sort the agents on the road network once per step, so that _nearest_agent_ahead can find the agent ahead of
+        each agent with a binary search
+        """
+        self._occupants = self._sort_by_edge(self._occupying())
+        self._occupant_edge = np.full(len(self.agents), -1, dtype=np.int64)
+        self._occupant_edge[self._occupants.idx] = self._occupants.edge
+
+    def _nearest_agent_ahead(self, idx: np.ndarray) -> np.ndarray:
+        """
+        Returns the distance along the edge of the nearest agent ahead of each agent on the same edge, or inf if there is none
+        """
+        edge = self._edge_key(idx)
+        distance = self.distance_along_edge[idx]
+        nearest = np.full(len(idx), np.inf)
+        occupying = self._occupying()
+        on_road = np.zeros(len(self.agents), dtype=bool)
+        on_road[occupying] = True
+
+        # agents that were ahead on the same edge at the start of the step, skipping any that have since left it
+        occupants = self._occupants
+        ahead = occupants.ahead(edge, distance)
+        pending = np.arange(len(idx))
+        while len(pending) > 0:
+            pending = pending[ahead[pending] < len(occupants.idx)]
+            pending = pending[occupants.edge[ahead[pending]] == edge[pending]]
+            j = occupants.idx[ahead[pending]]
+            still_there = on_road[j]
+            still_there[still_there] = (
+                self._edge_key(j[still_there]) == edge[pending[still_there]]
+            )
+            nearest[pending[still_there]] = self.distance_along_edge[j[still_there]]
+            pending = pending[~still_there]
+            ahead[pending] += 1
+
+        # agents that have joined an edge since the start of the step
+        joined = occupying[self._edge_key(occupying) != self._occupant_edge[occupying]]
+        if len(joined) > 0:
+            joined = self._sort_by_edge(joined)
+            ahead = joined.ahead(edge, distance)
+            found = ahead < len(joined.idx)
+            found[found] = joined.edge[ahead[found]] == edge[found]
+            nearest[found] = np.minimum(nearest[found], joined.distance[ahead[found]])
+        return nearest
+
+
+class _EdgeOrder:
+    """
+    Agents sorted by the edge they are on, then their distance along the edge
+    """
+
+    idx: np.ndarray
+    edge: np.ndarray
+    distance: np.ndarray
+    key: np.ndarray
+    span: float
+
+    def __init__(
+        self, idx: np.ndarray, edge: np.ndarray, distance: np.ndarray, span: float
+    ) -> None:
+        order = np.lexsort((distance, edge))
+        self.idx, self.edge, self.distance = idx[order], edge[order], distance[order]
+        # number each edge by the position of its first agent, so that (edge, distance) sorts as a single key
+        first = np.searchsorted(self.edge, self.edge, side="left")
+        self.key = first * span + self.distance
+        self.span = span
+
+    def ahead(self, edge: np.ndarray, distance: np.ndarray) -> np.ndarray:
+        """
+        Returns the position of the first agent further along each edge than distance, or the position after the
+        edge's last agent if there is none
+        """
+        start = np.searchsorted(self.edge, edge, side="left")
+        end = np.searchsorted(self.edge, edge, side="right")
+        ahead = np.searchsorted(self.key, start * self.span + distance, side="right")
+        return np.minimum(ahead, end)
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, DefaultDict, Dict, Optional, Set, Tuple
 from collections import defaultdict
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
 import mesa
 import mesa_geo as mg
-import random
+import numpy as np
 from shapely import Point
 
 from src.agent.building import (
@@ -18,11 +20,15 @@ from src.agent.building import (
     WorkPlace,
 )
 from src.agent.evacuation_zone import EvacuationZone, EvacuationZoneExit
-from src.agent.evacuee import Evacuee
+from src.agent.evacuee import Behaviour, Evacuee
 from src.agent.traffic_sensor import TrafficSensor
 
 if TYPE_CHECKING:
     from src.model.model import EvacuationModel
+    from src.space.road_network import RoadNetwork
+
+# (road network, origin node index, destination node index)
+EdgeKey = Tuple["RoadNetwork", int, int]
 
 
 class City(mg.GeoSpace):
@@ -32,6 +38,9 @@ class City(mg.GeoSpace):
     exit_idx_walk: list[int]
     exits_drive: Tuple[EvacuationZoneExit]
     exit_idx_drive: list[int]
+    # shortest path trees rooted at the exits (see RoadNetwork.shortest_path_tree)
+    exit_tree_walk: tuple
+    exit_tree_drive: tuple
     homes: Tuple[Building]
     work_buildings: Tuple[Building]
     recreation_buildings: Tuple[Building]
@@ -41,10 +50,31 @@ class City(mg.GeoSpace):
     schools = Tuple[Building]
     home_counter: DefaultDict[mesa.space.FloatCoordinate, int]
     traffic_sensors: list[TrafficSensor]
+    # running totals, kept up to date by Evacuee as its flags change
+    number_evacuated: int
+    number_to_evacuate: int
 
     _buildings: Dict[int, Building]
+    # buildings of each weighted type, with their cumulative floor areas, so they can be picked in proportion to size
+    _weighted_buildings: Dict[str, tuple[Tuple[Building], list[float]]]
     _evacuee_pos_map: DefaultDict[mesa.space.FloatCoordinate, Set[Evacuee]]
     _evacuee_id_map: Dict[int, Evacuee]
+    # current position of every evacuee, one row per evacuee (see _evacuee_row)
+    _evacuee_xy: np.ndarray
+    _evacuee_row: Dict[int, int]
+    _evacuee_by_row: list[Evacuee]
+    # position each evacuee was last registered with in the GeoSpace, and whether it has moved since
+    _registered_xy: np.ndarray
+    _evacuee_moved: np.ndarray
+    # curiosity radius of each curious evacuee (nan for the others), and whether they are currently within it
+    _curiosity_radius: np.ndarray
+    _in_curiosity_radius: np.ndarray
+    _evacuee_pos_map_stale: bool
+    # evacuees on each edge as (distance_along_edge, unique_id), sorted by distance
+    _edge_occupancy: DefaultDict[EdgeKey, list[tuple[float, int]]]
+    _evacuee_edge_map: Dict[int, tuple[EdgeKey, float]]
+    # the index is only needed by Evacuee._move, so the vectorised movement engine turns it off
+    track_edge_occupancy: bool
 
     @property
     def evacuees(self) -> list[Evacuee]:
@@ -72,40 +102,77 @@ class City(mg.GeoSpace):
         self.schools = ()
         self.home_counter = defaultdict(int)
         self._buildings = {}
+        self._weighted_buildings = {}
         self._evacuee_pos_map = defaultdict(set)
         self._evacuee_id_map = {}
+        self._evacuee_xy = np.zeros((0, 2))
+        self._evacuee_row = {}
+        self._evacuee_by_row = []
+        self._registered_xy = np.zeros((0, 2))
+        self._evacuee_moved = np.zeros(0, dtype=bool)
+        self._curiosity_radius = np.zeros(0)
+        self._in_curiosity_radius = np.zeros(0, dtype=bool)
+        self._evacuee_pos_map_stale = False
+        self._edge_occupancy = defaultdict(list)
+        self._evacuee_edge_map = {}
+        self.track_edge_occupancy = True
         self.traffic_sensors = []
+        self.number_evacuated = 0
+        self.number_to_evacuate = 0
 
     def get_random_home(self) -> Building:
-        return random.choice(self.homes)
+        return self.homes[self.model.rng.integers(len(self.homes))]
 
     def get_random_work(self) -> Building:
-        return random.choice(self.work_buildings)
+        return self.work_buildings[self.model.rng.integers(len(self.work_buildings))]
 
     def get_random_recreation(self) -> Building:
-        return self._get_random_building(self.recreation_buildings)
+        return self.get_random_buildings(RecreationBuilding.type)[0]
 
     def get_random_supermarket(self) -> Building:
-        return self._get_random_building(self.supermarkets)
+        return self.get_random_buildings(Supermarket.type)[0]
 
     def get_random_shop(self) -> Building:
-        return self._get_random_building(self.shops)
+        return self.get_random_buildings(Shop.type)[0]
 
     def get_random_school(self) -> Building:
-        return self._get_random_building(self.schools)
+        return self.get_random_buildings(School.type)[0]
 
     def get_random_football_stadium(self) -> Building:
-        return self._get_random_building(self.football_stadiums)
-
-    def _get_random_building(self, buildings: tuple[Building]) -> Building:
-        if len(buildings) == 0:
-            buildings = self.work_buildings
+        return self.get_random_buildings(FootballStadium.type)[0]
 
-        return random.choices(
-            [building for building in buildings],
-            weights=[building.geometry.area for building in buildings],
-            k=1,
-        )[0]
+    def get_random_buildings(
+        self,
+        building_type: str,
+        k: int = 1,
+        rng: Optional[np.random.Generator] = None,
+    ) -> list[Building]:
+        """
+        Pick k buildings of the given type, with replacement, in proportion to their floor area.
+        Workplaces are used if there are no buildings of that type.
+
+        rng (Generator): draw from this generator instead of the model's
+        """
+        buildings, cum_area = self._weighted_buildings[building_type]
+        if rng is None:
+            rng = self.model.rng
+        idx = np.searchsorted(cum_area, rng.random(k) * cum_area[-1], side="right")
+        return [buildings[i] for i in idx]
+
+    def _update_weighted_buildings(self) -> None:
+        for building_type, buildings in (
+            (RecreationBuilding.type, self.recreation_buildings),
+            (Supermarket.type, self.supermarkets),
+            (Shop.type, self.shops),
+            (School.type, self.schools),
+            (FootballStadium.type, self.football_stadiums),
+        ):
+            if len(buildings) == 0:
+                buildings = self.work_buildings
+            self._weighted_buildings[building_type] = (
+                buildings,
+                list(accumulate(building.geometry.area for building in buildings)),
+            )
 
     def get_building_by_id(self, unique_id: int) -> Building:
         return self._buildings[unique_id]
@@ -148,20 +215,70 @@ class City(mg.GeoSpace):
         self.supermarkets = self.supermarkets = tuple(supermarkets)
         self.schools = self.schools + tuple(schools)
         self.football_stadiums = self.football_stadiums + tuple(football_stadiums)
+        self._update_weighted_buildings()
 
     def get_evacuees_by_pos(
         self, float_pos: mesa.space.FloatCoordinate
     ) -> Set[Evacuee]:
+        if self._evacuee_pos_map_stale:
+            self._evacuee_pos_map = defaultdict(set)
+            for evacuee in self._evacuee_id_map.values():
+                self._evacuee_pos_map[self.get_evacuee_pos(evacuee)].add(evacuee)
+            self._evacuee_pos_map_stale = False
         return self._evacuee_pos_map[float_pos]
 
     def get_evacuees_by_id(self, evacuee_id: int) -> Evacuee:
         return self._evacuee_id_map[evacuee_id]
 
+    def get_evacuee_pos(self, evacuee: Evacuee) -> mesa.space.FloatCoordinate:
+        x, y = self._evacuee_xy[self._evacuee_row[evacuee.unique_id]]
+        return (float(x), float(y))
+
+    def get_evacuee_rows(self, evacuees: list[Evacuee]) -> np.ndarray:
+        """
+        Returns the row of each evacuee in the position array, for use with move_evacuees
+        """
+        return np.array(
+            [self._evacuee_row[evacuee.unique_id] for evacuee in evacuees],
+            dtype=np.int64,
+        )
+
+    def get_evacuees_xy(self, evacuees: list[Evacuee]) -> np.ndarray:
+        """
+        Returns the positions of the given evacuees as an (n, 2) array
+        """
+        return self._evacuee_xy[self.get_evacuee_rows(evacuees)]
+
     def add_evacuee(self, agent: Evacuee) -> None:
         super().add_agents([agent])
-        self._evacuee_pos_map[(agent.geometry.x, agent.geometry.y)].add(agent)
         self._evacuee_id_map[agent.unique_id] = agent
 
+        row = len(self._evacuee_by_row)
+        if row == len(self._evacuee_xy):
+            capacity = max(2 * row, 1024)
+            for name in (
+                "_evacuee_xy",
+                "_registered_xy",
+                "_evacuee_moved",
+                "_curiosity_radius",
+                "_in_curiosity_radius",
+            ):
+                array = getattr(self, name)
+                grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+                grown[:row] = array
+                setattr(self, name, grown)
+        self._evacuee_row[agent.unique_id] = row
+        self._evacuee_by_row.append(agent)
+        self._evacuee_xy[row] = (agent.geometry.x, agent.geometry.y)
+        self._registered_xy[row] = self._evacuee_xy[row]
+        self._curiosity_radius[row] = (
+            agent.curiosity_radius_m if agent.behaviour is Behaviour.CURIOUS else np.nan
+        )
+        self._in_curiosity_radius[row] = agent.in_curiosity_radius
+        # from now on the evacuee's position is kept in _evacuee_xy
+        agent._geometry = None
+        self._evacuee_pos_map_stale = True
+
     def add_evacuation_zone(self, agent: EvacuationZone) -> None:
         super().add_agents([agent])
         self.evacuation_zone = agent
@@ -184,9 +301,42 @@ class City(mg.GeoSpace):
         if walk:
             self.exits_walk = tuple(exits)
             self.exit_idx_walk = exit_idx
+            self.exit_tree_walk = roads.shortest_path_tree(exit_idx)
         else:
             self.exits_drive = tuple(exits)
             self.exit_idx_drive = exit_idx
+            self.exit_tree_drive = roads.shortest_path_tree(exit_idx)
+
+    def get_route_to_nearest_exit(self, source_idx: int, walk: bool) -> list[int]:
+        roads = self.model.roads_walk if walk else self.model.roads_drive
+        return roads.path_to_tree_root(
+            self.exit_tree_walk if walk else self.exit_tree_drive, source_idx
+        )
+
+    def update_curiosity(self) -> None:
+        """
+        Flag the curious evacuees that are within their curiosity radius of the centre of the evacuation zone.
+        Only evacuees on foot slow down (see Evacuee.speed), so whether they are in a car is not checked here.
+        """
+        rows = np.flatnonzero(~np.isnan(self._curiosity_radius[: len(self._evacuee_by_row)]))
+        if len(rows) == 0:
+            return
+
+        xy = self._evacuee_xy[rows]
+        inside = self.evacuation_zone.within_curiosity_radius(
+            xy[:, 0], xy[:, 1], self._curiosity_radius[rows]
+        )
+        # only the evacuees that have crossed the edge of their radius need to be told
+        changed = inside != self._in_curiosity_radius[rows]
+        self._in_curiosity_radius[rows[changed]] = inside[changed]
+        for row, flag in zip(rows[changed], inside[changed]):
+            self._evacuee_by_row[row].in_curiosity_radius = bool(flag)
+
+    def update_evacuation_counters(
+        self, evacuated: int = 0, requires_evacuation: int = 0
+    ) -> None:
+        self.number_evacuated += evacuated
+        self.number_to_evacuate += requires_evacuation
 
     def update_home_counter(
         self,
@@ -198,14 +348,122 @@ class City(mg.GeoSpace):
         self.home_counter[new_home_pos] += 1
 
     def move_evacuee(self, evacuee: Evacuee, pos: mesa.space.FloatCoordinate) -> None:
-        self._remove_evacuee(evacuee)
-        evacuee.geometry = Point(pos)
-        self.add_evacuee(evacuee)
-
-    def _remove_evacuee(self, evacuee: Evacuee) -> None:
-        super().remove_agent(evacuee)
-        del self._evacuee_id_map[evacuee.unique_id]
-        self._evacuee_pos_map[(evacuee.geometry.x, evacuee.geometry.y)].remove(evacuee)
+        """
+        Update an evacuee's position.  The position map and the GeoSpace are only brought up to date when they are
+        next read.
+        """
+        row = self._evacuee_row[evacuee.unique_id]
+        self._evacuee_xy[row] = pos
+        self._evacuee_moved[row] = True
+        self._evacuee_pos_map_stale = True
+
+    def move_evacuees(self, rows: np.ndarray, xy: np.ndarray) -> None:
+        """
+        Vectorised move_evacuee, for the evacuees in the given rows (see get_evacuee_rows)
+        """
+        self._evacuee_xy[rows] = xy
+        self._evacuee_moved[rows] = True
+        self._evacuee_pos_map_stale = True
+
+    def _sync_geospace(self) -> None:
+        """
+        Re-register the evacuees that have moved since the last sync, so the GeoSpace's index and bounds are correct
+        """
+        rows = np.flatnonzero(self._evacuee_moved)
+        if len(rows) == 0:
+            return
+        moved = [self._evacuee_by_row[row] for row in rows]
+        for evacuee, (x, y) in zip(moved, self._registered_xy[rows]):
+            # the GeoSpace must remove the agent using the geometry it was added with
+            evacuee._geometry = Point(x, y)
+            super().remove_agent(evacuee)
+            evacuee._geometry = None
+        self._registered_xy[rows] = self._evacuee_xy[rows]
+        self._evacuee_moved[rows] = False
+        super().add_agents(moved)
+
+    @property
+    def total_bounds(self):
+        self._sync_geospace()
+        return super().total_bounds
+
+    @property
+    def __geo_interface__(self):
+        self._sync_geospace()
+        return super().__geo_interface__
+
+    def get_relation(self, *args, **kwargs):
+        self._sync_geospace()
+        return super().get_relation(*args, **kwargs)
+
+    def get_intersecting_agents(self, *args, **kwargs):
+        self._sync_geospace()
+        return super().get_intersecting_agents(*args, **kwargs)
+
+    def get_neighbors_within_distance(self, *args, **kwargs):
+        self._sync_geospace()
+        return super().get_neighbors_within_distance(*args, **kwargs)
+
+    def agents_at(self, *args, **kwargs):
+        self._sync_geospace()
+        return super().agents_at(*args, **kwargs)
+
+    def get_neighbors(self, *args, **kwargs):
+        self._sync_geospace()
+        return super().get_neighbors(*args, **kwargs)
+
+    def update_evacuee_edge(self, evacuee: Evacuee) -> None:
+        """
+        Record the edge an evacuee is currently travelling along, and how far along it they are.
+        Must be called whenever an evacuee's route, route index or distance along edge changes.
+        """
+        if not self.track_edge_occupancy:
+            return
+        previous = self._evacuee_edge_map.pop(evacuee.unique_id, None)
+        if previous is not None:
+            previous_key, previous_distance = previous
+            entries = self._edge_occupancy[previous_key]
+            del entries[bisect_left(entries, (previous_distance, evacuee.unique_id))]
+            if len(entries) == 0:
+                del self._edge_occupancy[previous_key]
+
+        key = self._get_edge_key(evacuee)
+        if key is not None:
+            insort(
+                self._edge_occupancy[key],
+                (evacuee.distance_along_edge, evacuee.unique_id),
+            )
+            self._evacuee_edge_map[evacuee.unique_id] = (
+                key,
+                evacuee.distance_along_edge,
+            )
+
+    def get_evacuees_ahead(self, evacuee: Evacuee, max_distance: float) -> list[Evacuee]:
+        """
+        Returns the evacuees on the same edge that are less than max_distance ahead of the evacuee, nearest first
+        """
+        key = self._get_edge_key(evacuee)
+        if key is None or key not in self._edge_occupancy:
+            return []
+
+        entries = self._edge_occupancy[key]
+        distance = evacuee.distance_along_edge
+        lo = bisect_right(entries, (distance, float("inf")))
+        hi = bisect_left(entries, (distance + max_distance, float("-inf")), lo=lo)
+        return [self._evacuee_id_map[unique_id] for _, unique_id in entries[lo:hi]]
+
+    def _get_edge_key(self, evacuee: Evacuee) -> Optional[EdgeKey]:
+        if (
+            evacuee.route is None
+            or evacuee.status == "parked"
+            or evacuee.route_index >= len(evacuee.route) - 1
+        ):
+            return None
+        return (
+            evacuee.roads,
+            evacuee.route[evacuee.route_index],
+            evacuee.route[evacuee.route_index + 1],
+        )
 
     def add_traffic_sensors(self, agents: list[TrafficSensor]) -> None:
         super().add_agents(agents)
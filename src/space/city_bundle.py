@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import pickle
+import tempfile
+import networkx as nx
+import osmnx as ox
+from geopandas import GeoDataFrame
+from shapely import Polygon
+
+from src.agent.building import (
+    Building,
+    FootballStadium,
+    Home,
+    RecreationBuilding,
+    School,
+    Shop,
+    Supermarket,
+    WorkPlace,
+)
+from src.space.graph_store import GraphStore
+from src.space.road_network import RoadNetwork
+
+BUILDING_TYPES: dict[str, type[Building]] = {
+    building_type.type: building_type
+    for building_type in (
+        Home,
+        School,
+        Supermarket,
+        Shop,
+        RecreationBuilding,
+        FootballStadium,
+        WorkPlace,
+    )
+}
+
+
+def load_osm_buildings(domain: Polygon) -> dict[str, GeoDataFrame]:
+    """
+    Download building footprints from OpenStreetMap, grouped by building type
+
+    domain (Polygon): domain area in EPSG:4326
+    """
+
+    def polygon(gdf: GeoDataFrame) -> GeoDataFrame:
+        return gdf[gdf.geometry.geom_type == "Polygon"].reset_index()
+
+    def load(tags: dict) -> GeoDataFrame:
+        buildings_df = polygon(ox.features_from_polygon(domain, tags=tags))
+        buildings_df.index.name = "unique_id"
+        buildings_df.geometry = buildings_df.geometry.to_crs("EPSG:27700")
+        buildings_df["centroid"] = list(
+            zip(buildings_df.centroid.x, buildings_df.centroid.y)
+        )
+        return buildings_df
+
+    homes = load(
+        {
+            "building": [
+                "apartments",
+                "bungalow",
+                "detached",
+                "dormitory",
+                "hotel",
+                "house",
+                "residential",
+                "semidetached_house",
+                "terrace",
+            ]
+        }
+    )
+
+    all_buildings_df = load({"building": True})
+
+    return {
+        Home.type: homes,
+        School.type: load({"amenity": ["college", "kindergarten", "school"]}),
+        Supermarket.type: load({"building": "supermarket", "shop": ["convenience"]}),
+        Shop.type: load({"building": "retail"}),
+        RecreationBuilding.type: load(
+            {"leisure": True, "amenity": ["bar", "cafe", "pub", "restaurant"]}
+        ),
+        FootballStadium.type: load({"leisure": "stadium"}),
+        WorkPlace.type: all_buildings_df.overlay(homes, how="difference"),
+    }
+
+
+def entrance_node_idx(roads: RoadNetwork, centroids: list[tuple[float, float]]) -> list[int]:
+    """
+    Returns the index of the road node nearest to each building centroid
+    """
+    if len(centroids) == 0:
+        return []
+    return list(roads.get_nearest_nodes_idx(centroids))
+
+
+class CityBundle:
+    """
+    Everything the model needs to know about a city, compiled once so that the model can be set up without
+    accessing OpenStreetMap or processing any geometry.
+    """
+
+    buildings: dict[str, GeoDataFrame]
+    walk_graph: nx.Graph
+    drive_graph: nx.Graph
+    # keys of the graphs in the graph store (see RoadNetwork.graph_key), None for bundles saved without them
+    walk_key: str | None = None
+    drive_key: str | None = None
+
+    def __init__(
+        self,
+        buildings: dict[str, GeoDataFrame],
+        walk_graph: nx.Graph,
+        drive_graph: nx.Graph,
+        walk_key: str | None = None,
+        drive_key: str | None = None,
+    ) -> None:
+        self.buildings = buildings
+        self.walk_graph = walk_graph
+        self.drive_graph = drive_graph
+        self.walk_key = walk_key
+        self.drive_key = drive_key
+
+    @classmethod
+    def compile(
+        cls, domain: Polygon, graph_store: GraphStore | None = None
+    ) -> CityBundle:
+        """
+        domain (Polygon): domain area in EPSG:4326
+        """
+        roads_walk = RoadNetwork(domain, True, graph_store)
+        roads_drive = RoadNetwork(domain, False, graph_store)
+        buildings = load_osm_buildings(domain)
+
+        for buildings_df in buildings.values():
+            centroids = list(buildings_df["centroid"])
+            buildings_df["entrance_walk_idx"] = entrance_node_idx(roads_walk, centroids)
+            buildings_df["entrance_drive_idx"] = entrance_node_idx(
+                roads_drive, centroids
+            )
+
+        return cls(
+            buildings,
+            roads_walk.nx_graph,
+            roads_drive.nx_graph,
+            roads_walk.graph_key,
+            roads_drive.graph_key,
+        )
+
+    @staticmethod
+    def load(path: str) -> CityBundle:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import networkx as nx
+import numpy as np
+import osmnx as ox
+import shapely
+from shapely import Polygon
+
+GRAPH_CRS = "EPSG:27700"
+GRAPH_STORE_PATH = os.getenv("MESA_EVAC_GRAPH_STORE", "cache/graphs")
+
+
+def download_graph(domain: Polygon, network_type: str, simplify: bool) -> nx.Graph:
+    """
+    Download a road network from OpenStreetMap, project it and return its largest connected component
+
+    domain (Polygon): domain area in EPSG:4326
+    """
+    G = ox.graph_from_polygon(domain, simplify=simplify, network_type=network_type)
+    G = ox.project_graph(G, to_crs=GRAPH_CRS)
+    G = G.to_undirected()
+    return G.subgraph(max(nx.connected_components(G), key=len)).copy()
+
+
+class GraphStore:
+    """
+    Local, content-addressed store of projected road networks, so that the same network is only downloaded once.
+    Graphs are keyed by their domain polygon, network type and simplify flag.
+    """
+
+    path: str
+
+    def __init__(self, path: str = GRAPH_STORE_PATH) -> None:
+        self.path = path
+
+    @staticmethod
+    def key(domain: Polygon, network_type: str, simplify: bool) -> str:
+        h = hashlib.sha256()
+        h.update(shapely.to_wkb(shapely.normalize(domain)))
+        h.update(f"{network_type}|{simplify}|{GRAPH_CRS}".encode())
+        return h.hexdigest()
+
+    def file_path(self, key: str) -> str:
+        return os.path.join(self.path, key + ".pickle")
+
+    def get(self, domain: Polygon, network_type: str, simplify: bool) -> nx.Graph | None:
+        file_path = self.file_path(self.key(domain, network_type, simplify))
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return pickle.load(f)
+
+    def put(
+        self, domain: Polygon, network_type: str, simplify: bool, G: nx.Graph
+    ) -> str:
+        os.makedirs(self.path, exist_ok=True)
+        key = self.key(domain, network_type, simplify)
+        # write to a temporary file first, so that concurrent runs never read a partially written graph
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(G, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.file_path(key))
+        return key
+
+    def has_graph(self, key: str) -> bool:
+        return os.path.exists(self.file_path(key))
+
+    def put_graph(self, G: nx.Graph, key: str | None = None) -> str:
+        """
+        Store a graph under the given key, or by default the hash of its contents, such as the road network
+        written with a model's output, and return the key.  A graph that is already stored is not written again.
+        """
+        if key is not None and self.has_graph(key):
+            return key
+        data = pickle.dumps(G, protocol=pickle.HIGHEST_PROTOCOL)
+        if key is None:
+            key = hashlib.sha256(data).hexdigest()
+        if not self.has_graph(key):
+            os.makedirs(self.path, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.file_path(key))
+        return key
+
+    def get_graph(self, key: str) -> nx.Graph | None:
+        file_path = self.file_path(key)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return pickle.load(f)
+
+    def get_array(self, key: str, name: str) -> np.ndarray | None:
+        """
+        Returns an array derived from the graph with the given key, such as precomputed routing data
+        """
+        file_path = os.path.join(self.path, f"{key}.{name}.npy")
+        if not os.path.exists(file_path):
+            return None
+        return np.load(file_path)
+
+    def put_array(self, key: str, name: str, array: np.ndarray) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(self.path, f"{key}.{name}.npy"))
+
+    def load(
+        self, domain: Polygon, network_type: str, simplify: bool = False
+    ) -> nx.Graph:
+        """
+        Returns the graph from the store, downloading it from OpenStreetMap if it has not been stored yet
+        """
+        G = self.get(domain, network_type, simplify)
+        if G is None:
+            G = download_graph(domain, network_type, simplify)
+            self.put(domain, network_type, simplify, G)
+        return G
@@ -2,12 +2,72 @@ import networkx as nx
 from scipy.spatial import cKDTree
 import pyproj
 from geopandas import GeoDataFrame
+import shapely
 from shapely import Polygon
-from shapely.ops import transform
 import osmnx as ox
 import mesa
 import numpy as np
 import igraph
+from collections import OrderedDict
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+import re
+import hashlib
+
+from src.space.graph_store import GraphStore
+from src.space.routing import (
+    ContractionRouting,
+    DijkstraRouting,
+    LandmarkRouting,
+    ROUTING_BACKENDS,
+)
+
+MPH_TO_KPH = 1.609
+# speed limit in km/h of roads without a maxspeed tag, unless their highway type is in DEFAULT_SPEED_LIMITS
+DEFAULT_SPEED_LIMIT = 30 * MPH_TO_KPH
+# speed limits in km/h of roads without a maxspeed tag, by highway type
+DEFAULT_SPEED_LIMITS: dict[str, float] = {
+    "motorway": 70 * MPH_TO_KPH,
+    "motorway_link": 70 * MPH_TO_KPH,
+}
+
+
+def parse_maxspeed(maxspeed) -> float | None:
+    """
+    Speed limit in km/h from an OpenStreetMap maxspeed tag, such as "30 mph", "50 km/h" or "30", or None if it has
+    no speed.  Where the tag is a list of values, the lowest is used.
+    """
+    if isinstance(maxspeed, list):
+        speeds = [speed for speed in map(parse_maxspeed, maxspeed) if speed is not None]
+        return min(speeds) if len(speeds) > 0 else None
+
+    if maxspeed is None:
+        return None
+    match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(km/h|kmh|kph)?", str(maxspeed))
+    if match is None:
+        return None
+    speed = float(match.group(1))
+    # values without units are in mph, as on UK roads
+    return speed if match.group(2) is not None else speed * MPH_TO_KPH
+
+
+def normalise_speed_limits(
+    G: nx.Graph, default_speed_limits: dict[str, float] | None = None
+) -> None:
+    """
+    Set the speed_limit attribute (km/h) of every edge, from its maxspeed tag or the default for its highway type
+    """
+    if default_speed_limits is None:
+        default_speed_limits = DEFAULT_SPEED_LIMITS
+
+    for _, _, data in G.edges(data=True):
+        speed_limit = parse_maxspeed(data.get("maxspeed"))
+        if speed_limit is None:
+            highway = data.get("highway")
+            if isinstance(highway, list):
+                highway = highway[0]
+            speed_limit = default_speed_limits.get(highway, DEFAULT_SPEED_LIMIT)
+        data["speed_limit"] = speed_limit
 
 
 class RoadNetwork:
@@ -17,33 +77,107 @@ class RoadNetwork:
     _nodes: GeoDataFrame
     _edges: GeoDataFrame
     _i_graph: igraph.Graph
+    _graph_store: GraphStore
+    # identifies the graph in the graph store, if it was loaded from there
+    _graph_key: str | None = None
+    _routing_name: str = DijkstraRouting.name
+    _routing: DijkstraRouting | None
+    _default_speed_limits: dict[str, float] | None = None
+    _length_matrix: csr_matrix | None
+    # the ends and length of each igraph edge, as plain lists so that paths can be read from them cheaply
+    _i_graph_edges: list[tuple[int, int]] | None
+    _i_graph_lengths: list[float] | None
+    # node coordinates, indexed by igraph vertex id
+    _node_x: np.ndarray
+    _node_y: np.ndarray
+    # adjacency in compressed sparse row form, indexed by igraph vertex id, and attributes of each edge
+    _adjacency_indptr: np.ndarray | None
+    _adjacency_indices: np.ndarray | None
+    _adjacency_edge: np.ndarray | None
+    _adjacency_keys: np.ndarray | None
+    _edge_length: np.ndarray | None
+    _edge_speed_limit: np.ndarray | None
+    _edge_osmid: np.ndarray | None
+    _path_cache: OrderedDict[tuple[int, int], tuple[list[int], float]]
+    _prefetched_paths: tuple[np.ndarray, np.ndarray, np.ndarray] | None
+    _prefetched_rows: dict[tuple[int, int], int]
+    path_cache_hits: int
+    path_cache_misses: int
+
+    # maximum number of (origin, destination) pairs whose shortest path is remembered
+    PATH_CACHE_SIZE = 20000
 
-    def __init__(self, domain: Polygon, pedestrian: bool = False):
+    def __init__(
+        self,
+        domain: Polygon,
+        pedestrian: bool = False,
+        graph_store: GraphStore | None = None,
+        routing: str = DijkstraRouting.name,
+        default_speed_limits: dict[str, float] | None = None,
+    ):
         """
         domain (Polygon): domain area in EPSG:4326
+        graph_store (GraphStore): local store of road networks, only falling back to OpenStreetMap if the network is not stored
+        routing (str): shortest path algorithm, one of "dijkstra", "landmarks" or "contraction"
+        default_speed_limits (dict): speed limits in km/h by highway type, for roads without a maxspeed tag
         """
-        G = ox.graph_from_polygon(
-            domain,
-            simplify=False,
-            network_type="walk" if pedestrian else "drive_service",
-        )
-        G = ox.project_graph(G, to_crs="EPSG:27700")
-        G = G.to_undirected()
-        self.nx_graph = G.subgraph(max(nx.connected_components(G), key=len))
+        network_type = "walk" if pedestrian else "drive_service"
+        self._graph_store = graph_store if graph_store is not None else GraphStore()
+        self._graph_key = GraphStore.key(domain, network_type, False)
+        self._routing_name = routing
+        self._default_speed_limits = default_speed_limits
+        self.nx_graph = self._graph_store.load(domain, network_type)
         self.crs = "EPSG:27700"
 
+    @classmethod
+    def from_graph(
+        cls,
+        nx_graph: nx.Graph,
+        graph_store: GraphStore | None = None,
+        routing: str = DijkstraRouting.name,
+        default_speed_limits: dict[str, float] | None = None,
+        graph_key: str | None = None,
+    ) -> "RoadNetwork":
+        """
+        Create a road network from a graph that has already been projected to EPSG:27700
+
+        graph_key (str): key of the graph in the graph store, if it came from there, so that data derived from it can be stored
+        """
+        roads = cls.__new__(cls)
+        roads._graph_store = graph_store if graph_store is not None else GraphStore()
+        roads._graph_key = graph_key
+        roads._routing_name = routing
+        roads._default_speed_limits = default_speed_limits
+        roads.nx_graph = nx_graph
+        roads.crs = "EPSG:27700"
+        return roads
+
     @property
     def nx_graph(self) -> nx.Graph:
         return self._nx_graph
 
     @nx_graph.setter
     def nx_graph(self, nx_graph) -> None:
+        normalise_speed_limits(nx_graph, self._default_speed_limits)
         self._nx_graph = nx_graph
         self._nodes, self._edges = ox.convert.graph_to_gdfs(nx_graph)
-        self._kd_tree = cKDTree(
-            np.transpose([self._nodes.geometry.x, self._nodes.geometry.y])
-        )
+        self._node_x = self._nodes.geometry.x.to_numpy()
+        self._node_y = self._nodes.geometry.y.to_numpy()
+        self._kd_tree = cKDTree(np.transpose([self._node_x, self._node_y]))
         self._i_graph = igraph.Graph.from_networkx(nx_graph)
+        self._reset_caches()
+
+    @property
+    def routing(self) -> str:
+        return self._routing_name
+
+    @routing.setter
+    def routing(self, routing: str) -> None:
+        # paths already found may not be the ones the new algorithm finds, where there are ties
+        self._routing_name = routing
+        self._routing = None
+        self._path_cache = OrderedDict()
+        self.clear_prefetched_paths()
 
     @property
     def crs(self) -> pyproj.CRS:
@@ -61,10 +195,76 @@ class RoadNetwork:
     def nodes(self) -> GeoDataFrame:
         return self._nodes
 
+    @property
+    def graph_key(self) -> str | None:
+        return self._graph_key
+
     @property
     def i_graph(self) -> igraph.Graph:
         return self._i_graph
 
+    @property
+    def node_x(self) -> np.ndarray:
+        return self._node_x
+
+    @property
+    def node_y(self) -> np.ndarray:
+        return self._node_y
+
+    @property
+    def adjacency(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (indptr, indices, edge): the neighbours of node i are indices[indptr[i]:indptr[i + 1]], in ascending order,
+        joined by the edges edge[indptr[i]:indptr[i + 1]]
+        """
+        self._build_edge_table()
+        return self._adjacency_indptr, self._adjacency_indices, self._adjacency_edge
+
+    @property
+    def edge_length(self) -> np.ndarray:
+        self._build_edge_table()
+        return self._edge_length
+
+    @property
+    def edge_speed_limit(self) -> np.ndarray:
+        """
+        Speed limit of each edge in km/h
+        """
+        self._build_edge_table()
+        return self._edge_speed_limit
+
+    @property
+    def edge_osmid(self) -> np.ndarray:
+        self._build_edge_table()
+        return self._edge_osmid
+
+    def get_edge_idx(self, origin_idx: int, destination_idx: int) -> int:
+        """
+        Returns the index of the edge between two adjacent nodes, into the edge attribute arrays
+        """
+        self._build_edge_table()
+        start = self._adjacency_indptr[origin_idx]
+        end = self._adjacency_indptr[origin_idx + 1]
+        position = start + np.searchsorted(
+            self._adjacency_indices[start:end], destination_idx
+        )
+        return self._adjacency_edge[position]
+
+    def get_edges_idx(
+        self, origin_idx: np.ndarray, destination_idx: np.ndarray
+    ) -> np.ndarray:
+        """
+        Vectorised get_edge_idx
+        """
+        self._build_edge_table()
+        origin_idx = np.asarray(origin_idx, dtype=np.int64)
+        destination_idx = np.asarray(destination_idx, dtype=np.int64)
+        n = len(self._node_x)
+        position = np.searchsorted(
+            self._adjacency_keys, origin_idx * n + destination_idx
+        )
+        return self._adjacency_edge[position]
+
     def get_nearest_node_idx(self, float_pos: mesa.space.FloatCoordinate) -> int:
         _, [node_idx] = self._kd_tree.query([list(float_pos)])
         return node_idx
@@ -82,8 +282,7 @@ class RoadNetwork:
         return self.get_coords_from_idx(idx)
 
     def get_coords_from_idx(self, idx: int) -> mesa.space.FloatCoordinate:
-        point = self._nodes.iloc[idx].geometry
-        return (point.x, point.y)
+        return (float(self._node_x[idx]), float(self._node_y[idx]))
 
     def get_node_pos(self, node_idx: int) -> mesa.space.FloatCoordinate:
         return self._nodes.iloc[node_idx].geometry
@@ -93,37 +292,343 @@ class RoadNetwork:
     ) -> list[mesa.space.FloatCoordinate]:
         from_node_pos = self.get_nearest_node_idx(source)
         to_node_pos = self.get_nearest_node_idx(target)
-        return self._i_graph.get_shortest_paths(
-            from_node_pos,
-            to_node_pos,
-            weights="length",
-        )[0]
+        return self.shortest_path_by_index(from_node_pos, to_node_pos)[0]
 
     def shortest_path_by_index(
         self, origin_idx: int, destination_idx: int
     ) -> tuple[list[int], float]:
-        path = self._i_graph.get_shortest_paths(
-            origin_idx,
-            destination_idx,
-            weights="length",
-        )[0]
-        distance = self.distance_between_nodes(origin_idx, destination_idx)
-        return (path, distance)
+        """
+        Returns the shortest path between two nodes and its length.
+        Recently used paths are cached, so the returned path must not be modified.
+        """
+        key = (int(origin_idx), int(destination_idx))
+        if key in self._path_cache:
+            self.path_cache_hits += 1
+            self._path_cache.move_to_end(key)
+            return self._path_cache[key]
+
+        row = self._prefetched_rows.get(key)
+        if row is not None:
+            self.path_cache_hits += 1
+            nodes, offsets, lengths = self._prefetched_paths
+            result = (
+                nodes[offsets[row] : offsets[row + 1]].tolist(),
+                float(lengths[row]),
+            )
+        else:
+            self.path_cache_misses += 1
+            result = self._search_shortest_path(*key)
+        self._path_cache[key] = result
+        if len(self._path_cache) > self.PATH_CACHE_SIZE:
+            self._path_cache.popitem(last=False)
+        return result
+
+    def shortest_paths_by_index(
+        self, origin_idx: np.ndarray, destination_idx: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Shortest paths between many (origin, destination) pairs, with a single one-to-many search per distinct origin
+
+        Returns:
+            nodes (np.ndarray): all of the paths, end to end
+            offsets (np.ndarray): path i is nodes[offsets[i]:offsets[i + 1]].  unreachable destinations have an empty path
+            lengths (np.ndarray): length of each path (inf if the destination cannot be reached)
+        """
+        origin_idx = np.asarray(origin_idx, dtype=np.int64)
+        destination_idx = np.asarray(destination_idx, dtype=np.int64)
+        path_length = np.zeros(len(origin_idx), dtype=np.int64)
+        lengths = np.full(len(origin_idx), np.inf)
+        # paths are found from destination to origin, padded with the origin
+        reversed_paths = []
+
+        order = np.argsort(origin_idx, kind="stable")
+        origins, first, count = np.unique(
+            origin_idx[order], return_index=True, return_counts=True
+        )
+
+        for origin, start, n in zip(origins, first, count):
+            pairs = order[start : start + n]
+            distance, predecessor = dijkstra(
+                self._get_length_matrix(),
+                directed=False,
+                indices=origin,
+                return_predecessors=True,
+            )
+            targets = destination_idx[pairs]
+            reachable = np.isfinite(distance[targets])
+            lengths[pairs] = distance[targets]
+
+            node = np.where(reachable, targets, origin)
+            steps = [node]
+            while (node != origin).any():
+                node = np.where(node != origin, predecessor[node], node)
+                steps.append(node)
+            steps = np.stack(steps)
+            path_length[pairs] = np.where(
+                reachable, (steps != origin).sum(axis=0) + 1, 0
+            )
+            reversed_paths.append((pairs, steps))
+
+        offsets = np.concatenate(([0], np.cumsum(path_length)))
+        nodes = np.zeros(offsets[-1], dtype=np.int64)
+        for pairs, steps in reversed_paths:
+            counts = path_length[pairs]
+            position = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            column = np.repeat(np.arange(len(pairs)), counts)
+            row = np.repeat(counts, counts) - 1 - position
+            nodes[np.repeat(offsets[pairs], counts) + position] = steps[row, column]
+
+        return nodes, offsets, lengths
+
+    def prefetch_shortest_paths(
+        self, origin_idx: np.ndarray, destination_idx: np.ndarray
+    ) -> None:
+        """
+        Find the shortest paths between many (origin, destination) pairs in one batch, so that later calls to
+        shortest_path_by_index for these pairs do not need to search the graph.
+        """
+        pairs = np.unique(
+            np.stack(
+                [
+                    np.asarray(origin_idx, dtype=np.int64),
+                    np.asarray(destination_idx, dtype=np.int64),
+                ],
+                axis=1,
+            ).reshape(-1, 2),
+            axis=0,
+        )
+        self._prefetched_paths = self.shortest_paths_by_index(pairs[:, 0], pairs[:, 1])
+        self._prefetched_rows = {
+            (int(origin), int(destination)): row
+            for row, (origin, destination) in enumerate(pairs)
+        }
+
+    def clear_prefetched_paths(self) -> None:
+        self._prefetched_paths = None
+        self._prefetched_rows = {}
 
     def distance_between_nodes(self, origin_idx: int, destination_idx: int) -> float:
-        return self._i_graph.distances(origin_idx, destination_idx, weights="length")[
-            0
-        ][0]
-
-    def remove_nodes_in_polygon(self, polygon: Polygon) -> None:
-        project = pyproj.Transformer.from_crs(
-            pyproj.CRS("EPSG:27700"), pyproj.CRS("EPSG:4326"), always_xy=True
-        ).transform
-        polygon_4326 = transform(project, polygon)
-        G = ox.graph_from_polygon(polygon_4326, simplify=False)
-        G = ox.project_graph(G, to_crs="EPSG:27700")
-        G = G.to_undirected()
-        G = G.subgraph(max(nx.connected_components(G), key=len))
-        H = self.nx_graph.copy()
-        H.remove_nodes_from(list(G.nodes))
-        self.nx_graph = H
+        return self.shortest_path_by_index(origin_idx, destination_idx)[1]
+
+    def _search_shortest_path(
+        self, origin_idx: int, destination_idx: int
+    ) -> tuple[list[int], float]:
+        if origin_idx == destination_idx:
+            return ([origin_idx], 0.0)
+
+        edge_path = self._get_routing().shortest_path(origin_idx, destination_idx)
+        if len(edge_path) == 0:
+            return ([], float("inf"))
+
+        if self._i_graph_edges is None:
+            self._i_graph_edges = self._i_graph.get_edgelist()
+            self._i_graph_lengths = self._i_graph.es["length"]
+        edges = self._i_graph_edges
+        lengths = self._i_graph_lengths
+
+        # recover the nodes along the path from the edges
+        path = [origin_idx]
+        for edge in edge_path:
+            source, target = edges[edge]
+            path.append(target if source == path[-1] else source)
+        return (path, float(sum(lengths[edge] for edge in edge_path)))
+
+    def _get_routing(self) -> DijkstraRouting:
+        if self._routing is None:
+            if self._routing_name == LandmarkRouting.name:
+                self._routing = LandmarkRouting(
+                    self._i_graph, self._get_landmark_distances()
+                )
+            elif self._routing_name == ContractionRouting.name:
+                self._routing = ContractionRouting(
+                    self._i_graph, self._get_contraction_hierarchy()
+                )
+            else:
+                self._routing = ROUTING_BACKENDS[self._routing_name](self._i_graph)
+        return self._routing
+
+    def _get_landmark_distances(self) -> np.ndarray:
+        """
+        Landmark distances are kept in the graph store alongside the graph, so they are only computed once per network
+        """
+        name = f"landmarks-{LandmarkRouting.NUM_LANDMARKS}"
+        if self._graph_key is not None:
+            landmark_distances = self._graph_store.get_array(self._graph_key, name)
+            if landmark_distances is not None:
+                return landmark_distances
+
+        landmark_distances = LandmarkRouting.compute_landmark_distances(
+            self._get_length_matrix()
+        )
+        if self._graph_key is not None:
+            self._graph_store.put_array(self._graph_key, name, landmark_distances)
+        return landmark_distances
+
+    def _get_contraction_hierarchy(self) -> dict[str, np.ndarray]:
+        """
+        The contraction hierarchy is kept in the graph store alongside the graph, as contracting a large network takes
+        some time
+        """
+        names = [f"contraction-{field}" for field in ContractionRouting.FIELDS]
+        if self._graph_key is not None:
+            arrays = [self._graph_store.get_array(self._graph_key, name) for name in names]
+            if all(array is not None for array in arrays):
+                return dict(zip(ContractionRouting.FIELDS, arrays))
+
+        hierarchy = ContractionRouting.contract(self._i_graph)
+        if self._graph_key is not None:
+            for name, field in zip(names, ContractionRouting.FIELDS):
+                self._graph_store.put_array(self._graph_key, name, hierarchy[field])
+        return hierarchy
+
+    def _build_edge_table(self) -> None:
+        if self._adjacency_indptr is not None:
+            return
+
+        n = len(self._node_x)
+        node_idx = {name: idx for idx, name in enumerate(self._nodes.index)}
+        # where there are parallel edges, use the first, as networkx does when looking up an edge
+        first_edges = {}
+        for u, v, key, data in self._nx_graph.edges(keys=True, data=True):
+            pair = (u, v) if node_idx[u] <= node_idx[v] else (v, u)
+            if pair not in first_edges or key < first_edges[pair][0]:
+                first_edges[pair] = (key, data)
+
+        m = len(first_edges)
+        origin = np.zeros(m, dtype=np.int64)
+        destination = np.zeros(m, dtype=np.int64)
+        self._edge_length = np.zeros(m)
+        self._edge_speed_limit = np.zeros(m)
+        self._edge_osmid = np.empty(m, dtype=object)
+        for edge, ((u, v), (_, data)) in enumerate(first_edges.items()):
+            origin[edge] = node_idx[u]
+            destination[edge] = node_idx[v]
+            self._edge_length[edge] = data["length"]
+            self._edge_speed_limit[edge] = data["speed_limit"]
+            self._edge_osmid[edge] = data.get("osmid")
+
+        # the graph is undirected, so each edge appears in the rows of both of its nodes
+        rows = np.concatenate([origin, destination])
+        columns = np.concatenate([destination, origin])
+        edges = np.concatenate([np.arange(m), np.arange(m)])
+        order = np.lexsort((columns, rows))
+        self._adjacency_indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(rows, minlength=n)))
+        )
+        self._adjacency_indices = columns[order]
+        self._adjacency_edge = edges[order]
+        # rows are stored in order and neighbours are sorted within each row, so these keys are sorted
+        self._adjacency_keys = rows[order] * n + self._adjacency_indices
+
+    def _reset_caches(self) -> None:
+        self._length_matrix = None
+        self._i_graph_edges = None
+        self._i_graph_lengths = None
+        self._adjacency_indptr = None
+        self._adjacency_indices = None
+        self._adjacency_edge = None
+        self._adjacency_keys = None
+        self._edge_length = None
+        self._edge_speed_limit = None
+        self._edge_osmid = None
+        self._routing = None
+        self._path_cache = OrderedDict()
+        self.clear_prefetched_paths()
+        self.path_cache_hits = 0
+        self.path_cache_misses = 0
+
+    def without_nodes_in_polygon(self, polygon: Polygon) -> "RoadNetwork":
+        """
+        Returns a copy of this road network without the nodes inside the polygon, or the edges connected to them.
+        The existing graph is reused, so nothing is downloaded.
+
+        polygon (Polygon): in EPSG:27700
+        """
+        node_x = self._node_x
+        node_y = self._node_y
+        keep = np.flatnonzero(~shapely.contains_xy(polygon, node_x, node_y))
+        names = self._nodes.index[keep]
+
+        roads = RoadNetwork.__new__(RoadNetwork)
+        roads._graph_store = self._graph_store
+        if self._graph_key is not None:
+            # the subset is a different graph, so data derived from it is stored under its own key
+            h = hashlib.sha256(self._graph_key.encode())
+            h.update(shapely.to_wkb(shapely.normalize(polygon)))
+            roads._graph_key = h.hexdigest()
+        roads._routing_name = self._routing_name
+        roads._default_speed_limits = self._default_speed_limits
+        roads.crs = self.crs
+        roads._nx_graph = self._nx_graph.subgraph(names)
+        roads._nodes = self._nodes.iloc[keep]
+        roads._node_x = node_x[keep]
+        roads._node_y = node_y[keep]
+        roads._edges = self._edges[
+            self._edges.index.get_level_values("u").isin(names)
+            & self._edges.index.get_level_values("v").isin(names)
+        ]
+        roads._kd_tree = cKDTree(np.transpose([node_x[keep], node_y[keep]]))
+        # keeps the remaining vertices in their original order, so they match the rows of the node table
+        roads._i_graph = self._i_graph.induced_subgraph(
+            keep, implementation="copy_and_delete"
+        )
+        roads._reset_caches()
+        roads._routing = self._get_routing().subset(roads._i_graph, keep)
+        return roads
+
+    def shortest_path_tree(
+        self, targets: list[int]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Runs a single shortest path search outwards from all of the targets at once
+
+        Returns:
+            distance (np.ndarray): for each node, the distance to the nearest target (inf if no target can be reached)
+            nearest (np.ndarray): for each node, the index of the nearest target node (-9999 if no target can be reached)
+            next_node (np.ndarray): for each node, the index of the next node on the shortest path to the nearest target
+        """
+        distance, next_node, nearest = dijkstra(
+            self._get_length_matrix(),
+            directed=False,
+            indices=targets,
+            return_predecessors=True,
+            min_only=True,
+        )
+        return distance, nearest, next_node
+
+    def path_to_tree_root(
+        self, tree: tuple[np.ndarray, np.ndarray, np.ndarray], source_idx: int
+    ) -> list[int]:
+        """
+        Returns the shortest path from the source to its nearest target in a tree from shortest_path_tree
+        """
+        distance, nearest, next_node = tree
+        if not np.isfinite(distance[source_idx]):
+            return []
+
+        path = [int(source_idx)]
+        while path[-1] != nearest[source_idx]:
+            path.append(int(next_node[path[-1]]))
+        return path
+
+    def _get_length_matrix(self) -> csr_matrix:
+        """
+        Sparse adjacency matrix of edge lengths.  Where there are parallel edges, only the shortest is kept.
+        """
+        if self._length_matrix is None:
+            n = self._i_graph.vcount()
+            edges = np.array(self._i_graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+            length = np.array(self._i_graph.es["length"] if len(edges) > 0 else [])
+            u = edges.min(axis=1)
+            v = edges.max(axis=1)
+            order = np.lexsort((length, v, u))
+            u, v, length = u[order], v[order], length[order]
+            first = np.ones(len(u), dtype=bool)
+            first[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+            # explicit zeros are kept, so zero length edges can still be traversed
+            self._length_matrix = csr_matrix(
+                (length[first], (u[first], v[first])), shape=(n, n)
+            )
+        return self._length_matrix
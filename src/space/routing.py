@@ -0,0 +1,278 @@
+import heapq
+from operator import sub
+import igraph
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+
+class DijkstraRouting:
+    """
+    Point-to-point shortest paths using igraph's Dijkstra search
+    """
+
+    name = "dijkstra"
+    i_graph: igraph.Graph
+
+    def __init__(self, i_graph: igraph.Graph) -> None:
+        self.i_graph = i_graph
+
+    def shortest_path(self, origin_idx: int, destination_idx: int) -> list[int]:
+        """
+        Returns the ids of the edges along the shortest path, or an empty list if there is no path
+        """
+        return self.i_graph.get_shortest_paths(
+            origin_idx,
+            destination_idx,
+            weights="length",
+            output="epath",
+        )[0]
+
+    def subset(
+        self, i_graph: igraph.Graph, keep: np.ndarray
+    ) -> "DijkstraRouting | None":
+        """
+        Returns the routing for a subgraph containing only the nodes in keep, or None if it has to be prepared again
+        for the subgraph
+        """
+        return DijkstraRouting(i_graph)
+
+
+class LandmarkRouting(DijkstraRouting):
+    """
+    Point-to-point shortest paths using A* search, with lower bounds on the remaining distance taken from the
+    precomputed distances between every node and a small set of landmarks (ALT).
+    """
+
+    name = "landmarks"
+    landmark_distances: np.ndarray
+    # the distances from each node to every landmark, as plain lists so that the heuristic can index them cheaply
+    _node_distances: list[list[float]]
+
+    NUM_LANDMARKS = 8
+
+    def __init__(self, i_graph: igraph.Graph, landmark_distances: np.ndarray) -> None:
+        super().__init__(i_graph)
+        self.landmark_distances = landmark_distances
+        self._node_distances = landmark_distances.T.tolist()
+
+    @classmethod
+    def compute_landmark_distances(
+        cls, length_matrix: csr_matrix, num_landmarks: int = NUM_LANDMARKS
+    ) -> np.ndarray:
+        """
+        Choose landmarks spread around the edge of the network, each as far as possible from those already chosen,
+        and return the distance from each landmark to every node
+        """
+        n = length_matrix.shape[0]
+        num_landmarks = min(num_landmarks, n)
+        distances = np.zeros((num_landmarks, n))
+        nearest_landmark = dijkstra(length_matrix, directed=False, indices=0)
+
+        for i in range(num_landmarks):
+            landmark = np.argmax(np.where(np.isfinite(nearest_landmark), nearest_landmark, -1))
+            distances[i] = dijkstra(length_matrix, directed=False, indices=landmark)
+            nearest_landmark = np.minimum(
+                nearest_landmark if i > 0 else np.inf, distances[i]
+            )
+        return distances
+
+    def shortest_path(self, origin_idx: int, destination_idx: int) -> list[int]:
+        node_distances = self._node_distances
+        to_destination = node_distances[destination_idx]
+
+        def heuristic(graph, node, target) -> float:
+            # by the triangle inequality, no path can be shorter than this
+            return max(map(abs, map(sub, to_destination, node_distances[node])))
+
+        try:
+            return self.i_graph.get_shortest_path_astar(
+                origin_idx,
+                destination_idx,
+                heuristics=heuristic,
+                weights="length",
+                output="epath",
+            )
+        except igraph.InternalError:
+            return []
+
+    def subset(self, i_graph: igraph.Graph, keep: np.ndarray) -> "LandmarkRouting":
+        # removing nodes can only make paths longer, so distances in the full graph are still lower bounds
+        return LandmarkRouting(i_graph, self.landmark_distances[:, keep])
+
+
+class ContractionRouting(DijkstraRouting):
+    """
+    Point-to-point shortest paths using contraction hierarchies.  Nodes are contracted one at a time, least important
+    first, adding shortcuts between their neighbours wherever the shortest path between them ran through the node.
+    A query then only has to search upwards from each end of the path, along edges leading to more important nodes,
+    which reaches few nodes whatever the size of the network, and this search is run by scipy's Dijkstra.
+    """
+
+    name = "contraction"
+    # edges from each node to the more important nodes it was connected to when it was contracted
+    upward: csr_matrix
+    # for each edge of upward, the node that a shortcut bypasses, or -1 if it is an edge of the road network
+    via: np.ndarray
+    # for each edge of upward, the id of the road network edge, or -1 if it is a shortcut
+    edge: np.ndarray
+    _edge_index: dict[tuple[int, int], int] | None
+
+    # arrays that make up the hierarchy, as returned by contract
+    FIELDS = ("indptr", "indices", "length", "via", "edge")
+    # number of nodes a search for a path that makes a shortcut unnecessary may settle, before the shortcut is added.
+    # searching further gives fewer shortcuts, but takes longer to contract the network
+    WITNESS_SEARCH_SIZE = 60
+
+    def __init__(self, i_graph: igraph.Graph, hierarchy: dict[str, np.ndarray]) -> None:
+        super().__init__(i_graph)
+        n = i_graph.vcount()
+        self.upward = csr_matrix(
+            (hierarchy["length"], hierarchy["indices"], hierarchy["indptr"]),
+            shape=(n, n),
+        )
+        self.via = hierarchy["via"]
+        self.edge = hierarchy["edge"]
+        self._edge_index = None
+
+    @classmethod
+    def contract(cls, i_graph: igraph.Graph) -> dict[str, np.ndarray]:
+        """
+        Contract every node of the graph, and return the upward edges as the arrays in FIELDS.  This runs once per
+        network, so the result should be stored (see RoadNetwork._get_contraction_hierarchy).
+        """
+        n = i_graph.vcount()
+        # the edges between the nodes that have not been contracted yet, as {neighbour: (length, via, edge)}, keeping
+        # the shortest of any parallel edges
+        adjacency = [{} for _ in range(n)]
+        for edge, ((u, v), length) in enumerate(
+            zip(i_graph.get_edgelist(), i_graph.es["length"])
+        ):
+            if u != v and (v not in adjacency[u] or length < adjacency[u][v][0]):
+                adjacency[u][v] = adjacency[v][u] = (length, -1, edge)
+
+        def shortcuts(node: int) -> list[tuple[int, int, float]]:
+            """
+            The shortcuts needed to contract node, as (u, w, length)
+            """
+            neighbours = list(adjacency[node].items())
+            needed = []
+            for i, (u, (to_u, _, _)) in enumerate(neighbours[:-1]):
+                via_node = {w: to_u + to_w for w, (to_w, _, _) in neighbours[i + 1 :]}
+                # look for paths from u to the other neighbours that do not pass through node
+                limit = max(via_node.values())
+                distance = {u: 0.0}
+                queue = [(0.0, u)]
+                remaining = len(via_node)
+                for _ in range(cls.WITNESS_SEARCH_SIZE):
+                    while queue and queue[0][0] > distance[queue[0][1]]:
+                        heapq.heappop(queue)
+                    if not queue or queue[0][0] > limit or remaining == 0:
+                        break
+                    d, x = heapq.heappop(queue)
+                    remaining -= x in via_node
+                    for y, (length, _, _) in adjacency[x].items():
+                        if y != node and d + length < distance.get(y, np.inf):
+                            distance[y] = d + length
+                            heapq.heappush(queue, (d + length, y))
+                needed.extend(
+                    (u, w, length)
+                    for w, length in via_node.items()
+                    if distance.get(w, np.inf) > length
+                )
+            return needed
+
+        # contract the nodes that add the fewest shortcuts first, spreading out the contracted nodes.  priorities
+        # are only brought up to date when a node reaches the front of the queue
+        contracted_neighbours = np.zeros(n, dtype=np.int64)
+        queue = [(len(shortcuts(v)) - len(adjacency[v]), v) for v in range(n)]
+        heapq.heapify(queue)
+        tails, heads, lengths, vias, edges = [], [], [], [], []
+        while queue:
+            _, v = heapq.heappop(queue)
+            needed = shortcuts(v)
+            priority = len(needed) - len(adjacency[v]) + contracted_neighbours[v]
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, v))
+                continue
+
+            for u, (length, via, edge) in adjacency[v].items():
+                tails.append(v)
+                heads.append(u)
+                lengths.append(length)
+                vias.append(via)
+                edges.append(edge)
+                del adjacency[u][v]
+                contracted_neighbours[u] += 1
+            for u, w, length in needed:
+                if w not in adjacency[u] or length < adjacency[u][w][0]:
+                    adjacency[u][w] = adjacency[w][u] = (length, v, -1)
+            adjacency[v] = {}
+
+        tails, heads = np.array(tails, dtype=np.int64), np.array(heads, dtype=np.int64)
+        order = np.lexsort((heads, tails))
+        return {
+            "indptr": np.concatenate(([0], np.cumsum(np.bincount(tails, minlength=n)))),
+            "indices": heads[order],
+            "length": np.array(lengths, dtype=float)[order],
+            "via": np.array(vias, dtype=np.int64)[order],
+            "edge": np.array(edges, dtype=np.int64)[order],
+        }
+
+    def shortest_path(self, origin_idx: int, destination_idx: int) -> list[int]:
+        distance, predecessor = dijkstra(
+            self.upward,
+            directed=True,
+            indices=[origin_idx, destination_idx],
+            return_predecessors=True,
+        )
+        # the most important node on the path, which both searches reach
+        total = distance[0] + distance[1]
+        top = int(np.argmin(total))
+        if not np.isfinite(total[top]):
+            return []
+
+        up = [top]
+        while up[-1] != origin_idx:
+            up.append(int(predecessor[0, up[-1]]))
+        down = [top]
+        while down[-1] != destination_idx:
+            down.append(int(predecessor[1, down[-1]]))
+        nodes = up[::-1] + down[1:]
+
+        # replace each shortcut with the two edges it bypasses, until only road network edges are left
+        if self._edge_index is None:
+            self._build_edge_index()
+        edge_index = self._edge_index
+        path = []
+        stack = list(zip(nodes[-2::-1], nodes[:0:-1]))
+        while stack:
+            u, w = stack.pop()
+            i = edge_index[u, w]
+            via = int(self.via[i])
+            if via < 0:
+                path.append(int(self.edge[i]))
+            else:
+                stack.append((via, w))
+                stack.append((u, via))
+        return path
+
+    def _build_edge_index(self) -> None:
+        """
+        Index the upward edges by the nodes at either end, in either order
+        """
+        tails = np.repeat(np.arange(self.upward.shape[0]), np.diff(self.upward.indptr))
+        heads = self.upward.indices
+        self._edge_index = dict(zip(zip(tails.tolist(), heads.tolist()), range(len(heads))))
+        self._edge_index.update(zip(zip(heads.tolist(), tails.tolist()), range(len(heads))))
+
+    def subset(self, i_graph: igraph.Graph, keep: np.ndarray) -> None:
+        # shortcuts may bypass the removed nodes, so the subgraph is contracted again
+        return None
+
+
+ROUTING_BACKENDS = {
+    DijkstraRouting.name: DijkstraRouting,
+    LandmarkRouting.name: LandmarkRouting,
+    ContractionRouting.name: ContractionRouting,
+}
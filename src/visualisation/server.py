@@ -11,7 +11,8 @@ class ClockElement(mesa.visualization.TextElement):
         super().__init__()
 
     def render(self, model):
-        return f"Simulation time: {model.simulation_time.time().hour:02d}:{model.simulation_time.time().minute:02d}:{model.simulation_time.time().second:02d}"
+        t = model.datetime_at(model.simulation_time).time()
+        return f"Simulation time: {t.hour:02d}:{t.minute:02d}:{t.second:02d}"
 
 
 class NumberEvacuatedElement(mesa.visualization.TextElement):
@@ -0,0 +1,64 @@
+from unittest import TestCase, main
+
+import numpy as np
+from shapely import Point
+
+from src.agent.evacuation_zone import EvacuationZone
+from src.space.road_network import RoadNetwork
+from tests.synthetic_city import CENTRE, ORIGIN, SIZE, SPACING, grid_graph
+
+
+class EvacuationZoneTest(TestCase):
+    def setUp(self):
+        self.zone = EvacuationZone(
+            unique_id=0, model=None, crs="EPSG:27700", centre_point=CENTRE, radius=200
+        )
+
+    def test_contains_points(self):
+        rng = np.random.default_rng(0)
+        x = rng.uniform(ORIGIN[0], ORIGIN[0] + SPACING * SIZE, 1000)
+        y = rng.uniform(ORIGIN[1], ORIGIN[1] + SPACING * SIZE, 1000)
+        inside = self.zone.contains_points(x, y)
+
+        expected = [self.zone.geometry.contains(Point(px, py)) for px, py in zip(x, y)]
+        self.assertEqual(list(inside), expected)
+        self.assertTrue(inside.any() and not inside.all())
+        self.assertEqual(
+            [self.zone.contains_point((px, py)) for px, py in zip(x, y)], expected
+        )
+        self.assertEqual(len(self.zone.contains_points(np.zeros(0), np.zeros(0))), 0)
+
+    def test_nodes_inside(self):
+        roads = RoadNetwork.from_graph(grid_graph())
+        inside = self.zone.nodes_inside(roads)
+
+        expected = [
+            self.zone.geometry.contains(Point(roads.get_coords_from_idx(idx)))
+            for idx in range(len(roads.nodes))
+        ]
+        self.assertEqual(list(inside), expected)
+        self.assertEqual(
+            [self.zone.contains_node(roads, idx) for idx in range(len(roads.nodes))],
+            expected,
+        )
+        # worked out once per road network
+        self.assertIs(self.zone.nodes_inside(roads), inside)
+        other = RoadNetwork.from_graph(grid_graph(size=SIZE + 2))
+        self.assertEqual(len(self.zone.nodes_inside(other)), len(other.nodes))
+
+    def test_within_curiosity_radius(self):
+        rng = np.random.default_rng(1)
+        x = CENTRE.x + rng.uniform(-300, 300, 500)
+        y = CENTRE.y + rng.uniform(-300, 300, 500)
+        radius = rng.choice([50.0, 150.0, 250.0], 500)
+        inside = self.zone.within_curiosity_radius(x, y, radius)
+
+        expected = [
+            CENTRE.buffer(r).contains(Point(px, py)) for px, py, r in zip(x, y, radius)
+        ]
+        self.assertEqual(list(inside), expected)
+        self.assertIs(self.zone.curiosity_region(150.0), self.zone.curiosity_region(150.0))
+
+
+if __name__ == "__main__":
+    main()
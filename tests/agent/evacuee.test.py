@@ -0,0 +1,54 @@
+import tempfile
+from unittest import TestCase, main
+
+from shapely import Point
+
+from tests.synthetic_city import synthetic_model
+
+
+class EvacueeTest(TestCase):
+    def _send_to_building(self, model, agent):
+        # a building away from the agent's current position
+        building = max(
+            model.space.work_buildings,
+            key=lambda building: building.geometry.distance(Point(agent.position)),
+        )
+        agent.destination_building = building
+        agent.destination_schedule_node = agent.current_schedule_node
+        agent._path_select(building.entrance_pos(not agent.in_car))
+        agent.status = "travelling"
+        return building
+
+    def test_arrive_at_building(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(path, num_agents=1)
+            agent = model.space.evacuees[0]
+            building = self._send_to_building(model, agent)
+
+            for _ in range(100):
+                if agent.status == "parked":
+                    break
+                agent._move()
+
+            self.assertEqual(agent.status, "parked")
+            self.assertTrue(building.geometry.buffer(1e-3).contains(agent.geometry))
+            self.assertEqual(model.space.get_evacuee_pos(agent), agent.position)
+
+    def test_arrive_at_building_vectorised(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(path, num_agents=1, vectorised_movement=True)
+            agent = model.space.evacuees[0]
+            building = self._send_to_building(model, agent)
+            model.movement.pull(0)
+
+            for _ in range(100):
+                if agent.status == "parked":
+                    break
+                model.movement._move()
+
+            self.assertEqual(agent.status, "parked")
+            self.assertTrue(building.geometry.buffer(1e-3).contains(agent.geometry))
+
+
+if __name__ == "__main__":
+    main()
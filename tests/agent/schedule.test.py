@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+from unittest import TestCase, main
+
+import numpy as np
+
+from src.space.road_network import RoadNetwork
+from tests.synthetic_city import grid_graph
+
+from src.agent.schedule import (
+    ChildSchedule,
+    RetiredAdultSchedule,
+    Schedule,
+    WorkingAdultSchedule,
+)
+
+
+def fake_agent(seed: int = 0, **kwargs) -> SimpleNamespace:
+    return SimpleNamespace(model=SimpleNamespace(rng=np.random.default_rng(seed)), **kwargs)
+
+
+class ScheduleTableTest(TestCase):
+    def test_table(self):
+        table = WorkingAdultSchedule.compiled()
+        names = [name for name, _ in WorkingAdultSchedule._nodes]
+        self.assertEqual(list(table.names), names)
+        self.assertEqual(table.names[table.start], "home")
+        self.assertEqual(table.buildings[names.index("supermarket 2")], "supermarket")
+
+        for i, name in enumerate(names):
+            edges = [(v, d["p"]) for u, v, d in WorkingAdultSchedule._edges if u == name]
+            lo, hi = table.offsets[i], table.offsets[i + 1]
+            self.assertEqual([table.names[v] for v in table.targets[lo:hi]], [v for v, _ in edges])
+            self.assertTrue(np.allclose(table.cum_p[lo:hi], np.cumsum([p for _, p in edges])))
+
+    def test_compiled_once_per_schedule(self):
+        self.assertIs(ChildSchedule.compiled(), ChildSchedule.compiled())
+        self.assertIsNot(ChildSchedule.compiled(), RetiredAdultSchedule.compiled())
+        # every agent following a schedule shares its table
+        self.assertIs(ChildSchedule(fake_agent()).table, ChildSchedule(fake_agent()).table)
+        self.assertIsNone(Schedule._table)
+
+    def test_journeys(self):
+        buildings = ("home", "work", "school")
+        self.assertEqual(
+            ChildSchedule.compiled().journeys(buildings),
+            {("home", "school"), ("school", "home"), ("school", "school")},
+        )
+        self.assertEqual(RetiredAdultSchedule.compiled().journeys(buildings), set())
+
+    def test_get_next_destination(self):
+        schedule = WorkingAdultSchedule(fake_agent())
+        table = schedule.table
+        work = table.names.index("work")
+        counts = np.bincount(
+            [schedule.get_next_destination(work) for _ in range(20000)],
+            minlength=len(table.names),
+        )
+        expected = {"supermarket": 0.25, "recreation": 0.25, "work 2": 0.5}
+        for name, p in expected.items():
+            self.assertAlmostEqual(counts[table.names.index(name)] / 20000, p, delta=0.02)
+        self.assertEqual(counts.sum(), 20000)
+        self.assertIsNone(schedule.get_next_destination(table.names.index("home 3")))
+
+    def test_same_seed(self):
+        def day(seed):
+            schedule = WorkingAdultSchedule(fake_agent(seed))
+            node, days = schedule.table.start, []
+            while node is not None:
+                days.append((node, schedule.get_leave_time(node, 0.0)))
+                node = schedule.get_next_destination(node)
+            return days
+
+        self.assertEqual(day(1), day(1))
+        self.assertNotEqual(day(1), day(2))
+
+
+class RouteIndexTest(TestCase):
+    def setUp(self):
+        G = grid_graph()
+        rng = np.random.default_rng(0)
+        for _, _, data in G.edges(data=True):
+            data["length"] = float(rng.uniform(50, 150))
+        self.roads = RoadNetwork.from_graph(G)
+        # 3.6 km/h, so the agent covers a metre a second
+        self.schedule = WorkingAdultSchedule(fake_agent(roads=self.roads, speed=3.6))
+        self.path, _ = self.roads.shortest_path_by_index(0, len(G) - 1)
+
+    def route_index_by_walking(self, elapsed_s: float) -> int:
+        # walk the path an edge at a time, as the agent does once the model is running
+        t, i = 0.0, 0
+        while t < elapsed_s and i < len(self.path) - 1:
+            edge = self.roads.get_edge_idx(self.path[i], self.path[i + 1])
+            t += self.roads.edge_length[edge] / 1000 / 3.6 * 60 * 60
+            i += 1
+        return max(i - 1, 0)
+
+    def test_route_index_at(self):
+        edges = self.roads.get_edges_idx(
+            np.array(self.path[:-1]), np.array(self.path[1:])
+        )
+        ends = np.cumsum(self.roads.edge_length[edges])
+        # either side of the end of each edge, as exactly at the end is down to rounding
+        times = np.concatenate(
+            [[0.0, 1.0], ends - 0.5, ends + 0.5, np.linspace(0, ends[-1] - 0.5, 50)]
+        )
+        for elapsed_s in times:
+            self.assertEqual(
+                self.schedule._route_index_at(self.path, elapsed_s),
+                self.route_index_by_walking(elapsed_s),
+                elapsed_s,
+            )
+        self.assertEqual(self.schedule._route_index_at(self.path, ends[0] + 1), 1)
+        # an agent past the end of the path is on its last edge
+        self.assertEqual(
+            self.schedule._route_index_at(self.path, ends[-1] * 10), len(self.path) - 2
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import TestCase, main
+
+import numpy as np
+import pandas as pd
+from shapely import Point
+
+from scripts.load_data_from_file import load_graph
+from src.model.model import get_time_elapsed
+from tests.synthetic_city import ORIGIN, synthetic_model
+
+
+class EvacuationModelTest(TestCase):
+    def _initial_state(self, path, seed):
+        model = synthetic_model(os.path.join(path, str(seed)), num_agents=40, seed=seed)
+        evacuees = model.space.evacuees
+        return (
+            model.space.get_evacuees_xy(evacuees),
+            [evacuee.unique_id for evacuee in evacuees],
+            [evacuee.status for evacuee in evacuees],
+            [evacuee.leave_time for evacuee in evacuees],
+        )
+
+    def test_same_seed(self):
+        with tempfile.TemporaryDirectory() as path:
+            xy, *state = self._initial_state(os.path.join(path, "a"), 1)
+            same_xy, *same_state = self._initial_state(os.path.join(path, "b"), 1)
+            other_xy, *_ = self._initial_state(os.path.join(path, "c"), 2)
+
+            self.assertTrue(np.array_equal(xy, same_xy))
+            self.assertEqual(state, same_state)
+            self.assertFalse(np.array_equal(xy, other_xy))
+
+    def test_clock(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(
+                path, num_agents=5, evacuation_start_h=7, evacuation_start_m=56
+            )
+            start = 7 * 60 * 60 + 55 * 60
+            self.assertEqual(model.simulation_time, start)
+            self.assertEqual(
+                model.datetime_at(model.simulation_time),
+                datetime.combine(model.simulation_date, datetime.min.time())
+                + timedelta(hours=7, minutes=55),
+            )
+            # the agents leave at seconds since midnight, mostly after the start of the simulation
+            leave_times = [
+                evacuee.leave_time
+                for evacuee in model.space.evacuees
+                if evacuee.leave_time is not None
+            ]
+            self.assertTrue(all(isinstance(t, float) for t in leave_times))
+            self.assertTrue(all(0 <= t < 24 * 60 * 60 for t in leave_times))
+
+            for step in range(1, 7):
+                model.step()
+                self.assertEqual(model.simulation_time, start + step * model.TIMESTEP)
+                self.assertEqual(
+                    get_time_elapsed(model), timedelta(seconds=step * model.TIMESTEP)
+                )
+                # the evacuation starts on the first step at or after 7:56
+                self.assertEqual(model.evacuating, step >= 6)
+
+    def test_flush_output(self):
+        with tempfile.TemporaryDirectory() as path:
+            output_path = os.path.join(path, "run")
+            model = synthetic_model(
+                path,
+                num_agents=5,
+                evacuation_start_h=7,
+                evacuation_start_m=56,
+                output_path=output_path,
+                flush_interval=5,
+                sensor_locations=[Point(ORIGIN[0] + 50, ORIGIN[1])],
+            )
+            sensor = model.space.traffic_sensors[0]
+            sensor.add_record(pedestrian=True)
+            for _ in range(12):
+                model.step()
+
+            # the model data and sensor records are on disk before the run finishes
+            model_df = pd.read_csv(output_path + ".model.csv", index_col=0)
+            self.assertEqual(list(model_df.index), list(range(10)))
+            sensors_df = pd.read_csv(output_path + ".traffic-sensors.csv")
+            self.assertEqual(list(sensors_df["type"]), ["pedestrian"])
+            self.assertEqual(len(sensor.records), 0)
+
+            model.run(0)
+            model_df = pd.read_csv(output_path + ".model.csv", index_col=0)
+            self.assertEqual(list(model_df.index), list(range(13)))
+            self.assertEqual(len(pd.read_csv(output_path + ".traffic-sensors.csv")), 1)
+
+    def test_metrics_only(self):
+        with tempfile.TemporaryDirectory() as path:
+            output_dir = os.path.join(path, "output")
+            os.makedirs(output_dir)
+            output_path = os.path.join(output_dir, "run")
+            model = synthetic_model(
+                os.path.join(path, "city"),
+                num_agents=5,
+                evacuation_start_h=7,
+                evacuation_start_m=56,
+                output_path=output_path,
+                metrics_only=True,
+            )
+            model.run(10)
+
+            # only the model data and traffic sensor records are written
+            self.assertEqual(
+                sorted(os.listdir(output_dir)),
+                ["run.model.csv", "run.traffic-sensors.csv"],
+            )
+            model_df = pd.read_csv(output_path + ".model.csv", index_col=0)
+            self.assertEqual(list(model_df.index), list(range(11)))
+
+    def test_graph_output(self):
+        with tempfile.TemporaryDirectory() as path:
+            run_path = os.path.join(path, "a", "run")
+            model = synthetic_model(
+                os.path.join(path, "city"),
+                num_agents=5,
+                evacuation_start_h=7,
+                evacuation_start_m=56,
+                output_path=run_path,
+            )
+            model.run(10)
+            with open(run_path + ".graph.json") as f:
+                self.assertEqual(json.load(f)["store"], "graphs")
+
+            # the outputs can be moved together with their graph store
+            os.rename(os.path.join(path, "a"), os.path.join(path, "b"))
+            G = load_graph(os.path.join(path, "b", "run"))
+            self.assertEqual(
+                set(G.nodes),
+                set(model.roads_walk.nx_graph.nodes) | set(model.roads_drive.nx_graph.nodes),
+            )
+
+
+if __name__ == "__main__":
+    main()
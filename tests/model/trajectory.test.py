@@ -0,0 +1,135 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+import numpy as np
+import pandas as pd
+
+from src.model.trajectory import (
+    COLUMNS,
+    Trajectory,
+    TrajectoryCollector,
+    TrajectoryWriter,
+    read_trajectory,
+)
+from tests.synthetic_city import synthetic_model
+
+
+def row_group(step: int, agents: list[int], x: list[float]) -> dict[str, np.ndarray]:
+    group = {name: np.zeros(len(agents), dtype=dtype) for name, dtype in COLUMNS.items()}
+    group["step"][:] = step
+    group["agent"][:] = agents
+    group["x"][:] = x
+    return group
+
+
+class TrajectoryWriterTest(TestCase):
+    def test_append(self):
+        with tempfile.TemporaryDirectory() as path:
+            writer = TrajectoryWriter(path, 3)
+            writer.write(row_group(0, [0, 1, 2], [1.0, 2.0, 3.0]), 0, [0])
+            # a run that crashed part way through writing a row group
+            with open(os.path.join(path, "x.bin"), "ab") as f:
+                f.write(np.zeros(2, dtype=np.float32).tobytes())
+
+            writer = TrajectoryWriter(path, 3, append=True)
+            self.assertEqual(writer.last_step, 0)
+            writer.write(row_group(1, [1], [5.0]), 1, [])
+
+            meta, columns = read_trajectory(path)
+            self.assertEqual(meta["rows"], 4)
+            self.assertEqual(meta["keyframes"], [0])
+            self.assertEqual(list(columns["step"]), [0, 0, 0, 1])
+            self.assertEqual(list(columns["x"]), [1.0, 2.0, 3.0, 5.0])
+            self.assertEqual(
+                list(Trajectory(path).state_at(1)["x"]), [1.0, 5.0, 3.0]
+            )
+
+    def test_append_mismatch(self):
+        with tempfile.TemporaryDirectory() as path:
+            TrajectoryWriter(path, 3)
+            with self.assertRaises(ValueError):
+                TrajectoryWriter(path, 4, append=True)
+            with self.assertRaises(ValueError):
+                TrajectoryWriter(path, 3, append=True, fields=("x", "y"))
+            with self.assertRaises(ValueError):
+                TrajectoryWriter(path, 3, append=True, interval=2)
+
+    def test_overwrite(self):
+        with tempfile.TemporaryDirectory() as path:
+            TrajectoryWriter(path, 3).write(row_group(0, [0, 1, 2], [1.0, 2.0, 3.0]), 0, [0])
+            writer = TrajectoryWriter(path, 3)
+            self.assertEqual(writer.last_step, -1)
+            self.assertEqual(read_trajectory(path)[0]["rows"], 0)
+
+
+class TrajectoryCollectorTest(TestCase):
+    def test_keyframes(self):
+        with tempfile.TemporaryDirectory() as path:
+            output_path = os.path.join(path, "output")
+            model = synthetic_model(
+                path,
+                num_agents=20,
+                simulation_start_h=7,
+                simulation_start_m=30,
+                output_path=output_path,
+                # row groups that do not line up with the keyframes
+                flush_interval=7,
+            )
+            states = [model.trajectory._snapshot()]
+            steps = 2 * TrajectoryCollector.KEYFRAME_STEPS + 10
+            for _ in range(steps):
+                model.step()
+                states.append(model.trajectory._snapshot())
+            model.trajectory.flush()
+
+            trajectory = Trajectory(output_path + ".agent")
+            self.assertEqual(
+                list(trajectory.keyframes),
+                [0, TrajectoryCollector.KEYFRAME_STEPS, 2 * TrajectoryCollector.KEYFRAME_STEPS],
+            )
+            # between keyframes only the evacuees that changed are recorded
+            self.assertLess(len(trajectory.columns["step"]), (steps + 1) * 20)
+            for step, state in enumerate(states):
+                reconstructed = trajectory.state_at(step)
+                for name, column in state.items():
+                    self.assertTrue(np.array_equal(reconstructed[name], column), (step, name))
+
+            df = trajectory.to_dataframe()
+            self.assertEqual(len(df), (steps + 1) * 20)
+            self.assertTrue(np.array_equal(df.loc[steps, "x"].to_numpy(), states[-1]["x"]))
+
+    def test_append_run(self):
+        for interval in (1, 4):
+            with self.subTest(interval=interval), tempfile.TemporaryDirectory() as path:
+                output_path = os.path.join(path, "output")
+                params = {
+                    "num_agents": 10,
+                    "evacuation_start_h": 7,
+                    "evacuation_start_m": 56,
+                    "output_path": output_path,
+                    "agent_interval": interval,
+                }
+                synthetic_model(path, **params).run(10)
+                model = synthetic_model(path, append_output=True, **params)
+                model.run(10)
+
+                # the appended run continues the step numbers of the first
+                first_step = -(-11 // interval) * interval
+                self.assertEqual(model.first_step, first_step)
+                model_df = pd.read_csv(output_path + ".model.csv", index_col=0)
+                self.assertEqual(
+                    list(model_df.index),
+                    list(range(11)) + list(range(first_step, first_step + 11)),
+                )
+                trajectory = Trajectory(output_path + ".agent")
+                self.assertEqual(list(trajectory.keyframes), [0, first_step])
+                self.assertEqual(trajectory.last_step, first_step + 10 // interval * interval)
+                self.assertEqual(
+                    len(trajectory.to_dataframe()),
+                    len(range(0, trajectory.last_step + 1, interval)) * 10,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import numpy as np
+
+from src.model.vectorised_movement import VectorisedMovement
+from tests.synthetic_city import synthetic_model
+
+
+class VectorisedMovementTest(TestCase):
+    def test_nearest_agent_ahead(self):
+        nearest_agent_ahead = VectorisedMovement._nearest_agent_ahead
+        checked = []
+
+        def check(movement, idx):
+            nearest = nearest_agent_ahead(movement, idx)
+            occupants = movement._occupying()
+            edge = movement._edge_key(occupants)
+            # where each agent was at the start of the step, if it was on the same edge
+            start_distance = dict(
+                zip(movement._occupants.idx, movement._occupants.distance)
+            )
+            for i, distance in zip(idx, nearest):
+                d = movement.distance_along_edge[i]
+                on_edge = occupants[edge == movement._edge_key(np.array([i]))[0]]
+                ahead = [
+                    movement.distance_along_edge[j]
+                    for j in on_edge
+                    if movement.distance_along_edge[j] > d
+                    # agents that were behind at the start of the step never block the agent
+                    and (
+                        movement._occupant_edge[j] != movement._occupant_edge[i]
+                        or start_distance[j] > d
+                    )
+                ]
+                self.assertEqual(distance, min(ahead, default=np.inf))
+            checked.append(len(idx))
+            return nearest
+
+        with tempfile.TemporaryDirectory() as path, patch.object(
+            VectorisedMovement, "_nearest_agent_ahead", check
+        ):
+            model = synthetic_model(
+                path,
+                num_agents=1000,
+                vectorised_movement=True,
+                evacuation_start_h=7,
+                evacuation_start_m=58,
+            )
+            for _ in range(40):
+                model.step()
+        self.assertGreater(sum(checked), 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import tempfile
+from collections import defaultdict
+from unittest import TestCase, main
+
+import numpy as np
+from shapely import Point, box
+
+from src.agent.building import School, Shop, WorkPlace
+from src.agent.evacuee import Behaviour
+from src.space.city import City
+from tests.synthetic_city import synthetic_model
+
+
+class CityTest(TestCase):
+    def assertOccupancyConsistent(self, space):
+        # every evacuee on an edge is indexed under that edge once, at its current distance along it
+        expected = defaultdict(list)
+        for evacuee in space.evacuees:
+            key = space._get_edge_key(evacuee)
+            if key is not None:
+                expected[key].append((evacuee.distance_along_edge, evacuee.unique_id))
+        self.assertEqual(
+            {key: sorted(entries) for key, entries in expected.items()},
+            dict(space._edge_occupancy),
+        )
+        self.assertEqual(
+            {
+                unique_id: key
+                for key, entries in expected.items()
+                for _, unique_id in entries
+            },
+            {unique_id: key for unique_id, (key, _) in space._evacuee_edge_map.items()},
+        )
+
+    def test_edge_occupancy_after_moving(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(
+                path, num_agents=60, simulation_start_h=7, simulation_start_m=30
+            )
+            self.assertOccupancyConsistent(model.space)
+            moved_between_edges = False
+            for _ in range(120):
+                edges = {
+                    evacuee.unique_id: model.space._get_edge_key(evacuee)
+                    for evacuee in model.space.evacuees
+                }
+                model.step()
+                self.assertOccupancyConsistent(model.space)
+                moved_between_edges |= any(
+                    edges[evacuee.unique_id] is not None
+                    and model.space._get_edge_key(evacuee) is not None
+                    and edges[evacuee.unique_id] != model.space._get_edge_key(evacuee)
+                    for evacuee in model.space.evacuees
+                )
+            self.assertTrue(moved_between_edges)
+
+    def test_vectorised_positions(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(
+                path,
+                num_agents=40,
+                simulation_start_h=7,
+                simulation_start_m=30,
+                vectorised_movement=True,
+            )
+            for _ in range(60):
+                model.step()
+                # positions are written back in bulk, straight into the City's array
+                xy = model.space.get_evacuees_xy(model.movement.agents)
+                self.assertTrue(
+                    np.array_equal(xy, np.column_stack([model.movement.x, model.movement.y]))
+                )
+            for evacuee in model.space.evacuees:
+                self.assertEqual(evacuee.geometry, Point(evacuee.position))
+
+    def test_evacuation_counts(self):
+        for vectorised_movement in (False, True):
+            with self.subTest(vectorised_movement=vectorised_movement), tempfile.TemporaryDirectory() as path:
+                model = synthetic_model(
+                    path,
+                    num_agents=60,
+                    evacuation_start_h=7,
+                    evacuation_start_m=57,
+                    vectorised_movement=vectorised_movement,
+                )
+                for _ in range(90):
+                    model.step()
+                    # the running counts match a scan of every evacuee
+                    evacuees = model.space.evacuees
+                    self.assertEqual(
+                        model.space.number_to_evacuate,
+                        sum(evacuee.requires_evacuation for evacuee in evacuees),
+                    )
+                    self.assertEqual(
+                        model.space.number_evacuated,
+                        sum(evacuee.evacuated for evacuee in evacuees),
+                    )
+                self.assertGreater(model.space.number_to_evacuate, 0)
+                self.assertGreater(model.space.number_evacuated, 0)
+
+    def test_update_curiosity(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(
+                path,
+                num_agents=60,
+                evacuation_start_h=7,
+                evacuation_start_m=56,
+                agent_behaviour={Behaviour.CURIOUS: 0.5, Behaviour.COMPLIANT: 0.5},
+                curiosity_radius_m=150,
+            )
+            flagged = 0
+            for _ in range(60):
+                model.step()
+                if not model.evacuating:
+                    continue
+                # the flags are set at the start of each step, before the evacuees move
+                model.space.update_curiosity()
+                centre = model.space.evacuation_zone.centre
+                for evacuee in model.space.evacuees:
+                    expected = (
+                        evacuee.behaviour is Behaviour.CURIOUS
+                        and centre.distance(evacuee.geometry) < 150
+                    )
+                    self.assertEqual(evacuee.in_curiosity_radius, expected)
+                    flagged += expected
+            self.assertGreater(flagged, 0)
+
+    def test_get_random_buildings(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(path, num_agents=1)
+            city = City(crs="EPSG:27700", model=model)
+            # shops with floor areas of 100, 300 and 600
+            shops = [
+                Shop(i, model, box(0, 0, 10, size), "EPSG:27700")
+                for i, size in enumerate((10, 30, 60))
+            ]
+            works = [WorkPlace(3 + i, model, box(0, 0, 10, 10), "EPSG:27700") for i in range(2)]
+            city.add_buildings(shops + works)
+
+            rng = np.random.default_rng(0)
+            picked = city.get_random_buildings(Shop.type, 20000, rng)
+            counts = [sum(building is shop for building in picked) for shop in shops]
+            self.assertTrue(np.allclose(np.array(counts) / 20000, [0.1, 0.3, 0.6], atol=0.02))
+            self.assertIn(city.get_random_shop(), shops)
+
+            # workplaces are used for types with no buildings
+            self.assertTrue(
+                all(building in works for building in city.get_random_buildings(School.type, 100, rng))
+            )
+            self.assertIn(city.get_random_football_stadium(), works)
+
+    def test_get_evacuees_ahead(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = synthetic_model(path, num_agents=3)
+            space = model.space
+            evacuees = space.evacuees
+            route = evacuees[0].all_roads.get_shortest_path(
+                evacuees[0].all_roads.get_coords_from_idx(0),
+                evacuees[0].all_roads.get_coords_from_idx(7),
+            )
+            for evacuee, distance in zip(evacuees, (10.0, 50.0, 30.0)):
+                evacuee.in_car = evacuees[0].in_car
+                evacuee.route = route
+                evacuee.route_index = 0
+                evacuee.distance_along_edge = distance
+                evacuee.status = "travelling"
+                space.update_evacuee_edge(evacuee)
+
+            ahead = space.get_evacuees_ahead(evacuees[0], 100)
+            self.assertEqual(ahead, [evacuees[2], evacuees[1]])
+            self.assertEqual(space.get_evacuees_ahead(evacuees[0], 30), [evacuees[2]])
+            self.assertEqual(space.get_evacuees_ahead(evacuees[1], 100), [])
+
+
+if __name__ == "__main__":
+    main()
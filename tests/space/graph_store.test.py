@@ -0,0 +1,78 @@
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import numpy as np
+from shapely import Polygon, box
+
+from src.space.graph_store import GraphStore
+from tests.synthetic_city import grid_graph
+
+
+class GraphStoreTest(TestCase):
+    domain = box(-1.62, 54.96, -1.6, 54.98)
+
+    def assertGraphEqual(self, G, H):
+        self.assertEqual(list(G.nodes(data=True)), list(H.nodes(data=True)))
+        self.assertEqual(list(G.edges(keys=True, data=True)), list(H.edges(keys=True, data=True)))
+        self.assertEqual(G.graph, H.graph)
+
+    def test_key(self):
+        key = GraphStore.key(self.domain, "walk", False)
+        self.assertEqual(key, GraphStore.key(self.domain, "walk", False))
+        # the same polygon, starting from a different vertex
+        coords = list(self.domain.exterior.coords)[:-1]
+        self.assertEqual(key, GraphStore.key(Polygon(coords[2:] + coords[:2]), "walk", False))
+
+        self.assertNotEqual(key, GraphStore.key(box(-1.62, 54.96, -1.6, 54.99), "walk", False))
+        self.assertNotEqual(key, GraphStore.key(self.domain, "drive_service", False))
+        self.assertNotEqual(key, GraphStore.key(self.domain, "walk", True))
+        with patch("src.space.graph_store.GRAPH_CRS", "EPSG:4326"):
+            self.assertNotEqual(key, GraphStore.key(self.domain, "walk", False))
+
+    def test_put_get(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = GraphStore(path)
+            G = grid_graph(size=3)
+            self.assertIsNone(store.get(self.domain, "walk", False))
+            self.assertEqual(
+                store.put(self.domain, "walk", False, G),
+                GraphStore.key(self.domain, "walk", False),
+            )
+            self.assertGraphEqual(store.get(self.domain, "walk", False), G)
+            self.assertIsNone(store.get(self.domain, "walk", True))
+
+            # a stored graph is not downloaded again
+            with patch("src.space.graph_store.download_graph", side_effect=AssertionError):
+                self.assertGraphEqual(store.load(self.domain, "walk"), G)
+
+    def test_put_graph(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = GraphStore(path)
+            G = grid_graph(size=3)
+            key = store.put_graph(G)
+            self.assertTrue(store.has_graph(key))
+            self.assertGraphEqual(store.get_graph(key), G)
+            # keyed by content
+            self.assertEqual(store.put_graph(grid_graph(size=3)), key)
+            self.assertNotEqual(store.put_graph(grid_graph(size=4)), key)
+
+            self.assertEqual(store.put_graph(G, "named"), "named")
+            self.assertGraphEqual(store.get_graph("named"), G)
+            # a graph that is already stored under a key is not replaced
+            store.put_graph(grid_graph(size=4), "named")
+            self.assertGraphEqual(store.get_graph("named"), G)
+            self.assertIsNone(store.get_graph("missing"))
+
+    def test_array(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = GraphStore(path)
+            array = np.arange(12, dtype=float).reshape(3, 4)
+            self.assertIsNone(store.get_array("key", "landmarks-8"))
+            store.put_array("key", "landmarks-8", array)
+            self.assertTrue(np.array_equal(store.get_array("key", "landmarks-8"), array))
+            self.assertIsNone(store.get_array("key", "landmarks-4"))
+
+
+if __name__ == "__main__":
+    main()
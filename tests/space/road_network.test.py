@@ -0,0 +1,228 @@
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import networkx as nx
+import numpy as np
+from shapely import Point
+
+from src.space.graph_store import GraphStore
+from src.space.road_network import MPH_TO_KPH, RoadNetwork, parse_maxspeed
+from src.space.routing import ContractionRouting, LandmarkRouting
+from tests.synthetic_city import CENTRE, ORIGIN, grid_graph
+
+
+class RoadNetworkTest(TestCase):
+    def setUp(self):
+        G = grid_graph()
+        # distinct lengths, so that every shortest path is unique
+        rng = np.random.default_rng(0)
+        for _, _, data in G.edges(data=True):
+            data["length"] = float(rng.uniform(50, 150))
+        # a node that cannot be reached from the rest of the network
+        G.add_node(len(G), x=ORIGIN[0] - 500, y=ORIGIN[1] - 500)
+        self.roads = RoadNetwork.from_graph(G)
+
+    def test_shortest_paths_by_index(self):
+        n = self.roads.i_graph.vcount()
+        rng = np.random.default_rng(1)
+        origins = np.concatenate([rng.integers(n - 1, size=50), [0, 5, n - 1]])
+        destinations = np.concatenate([rng.integers(n - 1, size=50), [n - 1, 5, 0]])
+
+        nodes, offsets, lengths = self.roads.shortest_paths_by_index(
+            origins, destinations
+        )
+
+        for i, (origin, destination) in enumerate(zip(origins, destinations)):
+            path = self.roads.i_graph.get_shortest_paths(
+                int(origin), int(destination), weights="length", output="vpath"
+            )[0]
+            self.assertEqual(list(nodes[offsets[i] : offsets[i + 1]]), path)
+            if path:
+                self.assertAlmostEqual(
+                    lengths[i],
+                    self.roads.i_graph.distances(
+                        int(origin), int(destination), weights="length"
+                    )[0][0],
+                )
+            else:
+                self.assertEqual(lengths[i], np.inf)
+
+    def test_routing(self):
+        G = self.roads.nx_graph
+        # the unreachable node is not part of a network loaded from the graph store
+        G.remove_node(len(G) - 1)
+        dijkstra = RoadNetwork.from_graph(G)
+        zone = CENTRE.buffer(150)
+        safe_dijkstra = dijkstra.without_nodes_in_polygon(zone)
+        rng = np.random.default_rng(2)
+        pairs = rng.integers(len(G), size=(50, 2))
+        for routing in (LandmarkRouting.name, ContractionRouting.name):
+            with self.subTest(routing=routing):
+                roads = RoadNetwork.from_graph(G, routing=routing)
+                safe_roads = roads.without_nodes_in_polygon(zone)
+                for origin, destination in pairs:
+                    path, length = roads.shortest_path_by_index(
+                        int(origin), int(destination)
+                    )
+                    expected_path, expected_length = dijkstra.shortest_path_by_index(
+                        int(origin), int(destination)
+                    )
+                    self.assertEqual(path, expected_path)
+                    self.assertAlmostEqual(length, expected_length)
+
+                n = safe_roads.i_graph.vcount()
+                for origin, destination in pairs % n:
+                    path, length = safe_roads.shortest_path_by_index(
+                        int(origin), int(destination)
+                    )
+                    expected_path, expected_length = safe_dijkstra.shortest_path_by_index(
+                        int(origin), int(destination)
+                    )
+                    self.assertEqual(path, expected_path)
+                    self.assertAlmostEqual(length, expected_length)
+
+    def test_contraction_hierarchy_stored(self):
+        G = self.roads.nx_graph
+        with tempfile.TemporaryDirectory() as path:
+            store = GraphStore(path)
+            roads = RoadNetwork.from_graph(
+                G, graph_store=store, routing=ContractionRouting.name, graph_key="key"
+            )
+            expected = roads.shortest_path_by_index(0, 40)
+            self.assertIsNotNone(store.get_array("key", "contraction-indptr"))
+
+            # the hierarchy is loaded from the store rather than contracted again
+            roads = RoadNetwork.from_graph(
+                G, graph_store=store, routing=ContractionRouting.name, graph_key="key"
+            )
+            with patch.object(ContractionRouting, "contract", side_effect=AssertionError):
+                self.assertEqual(roads.shortest_path_by_index(0, 40), expected)
+
+    def test_parse_maxspeed(self):
+        self.assertAlmostEqual(parse_maxspeed("30"), 30 * MPH_TO_KPH)
+        self.assertAlmostEqual(parse_maxspeed("30 mph"), 30 * MPH_TO_KPH)
+        self.assertAlmostEqual(parse_maxspeed("50 km/h"), 50)
+        self.assertAlmostEqual(parse_maxspeed(["30 mph", "50 km/h"]), 30 * MPH_TO_KPH)
+        self.assertIsNone(parse_maxspeed("signals"))
+        self.assertIsNone(parse_maxspeed(None))
+
+    def test_without_nodes_in_polygon(self):
+        G = self.roads.nx_graph
+        G.remove_node(len(G) - 1)
+        with tempfile.TemporaryDirectory() as path:
+            roads = RoadNetwork.from_graph(
+                G,
+                graph_store=GraphStore(path),
+                routing=LandmarkRouting.name,
+                default_speed_limits={"residential": 20},
+                graph_key="key",
+            )
+            polygon = CENTRE.buffer(120)
+            subset = roads.without_nodes_in_polygon(polygon)
+            subset.shortest_path_by_index(0, 1)
+
+        kept = [
+            node for node, data in G.nodes(data=True)
+            if not polygon.contains(Point(data["x"], data["y"]))
+        ]
+        self.assertLess(len(kept), len(G))
+        self.assertEqual(list(subset.nodes.index), kept)
+        self.assertEqual(list(subset.nx_graph.nodes), kept)
+        self.assertEqual(subset.i_graph.vcount(), len(kept))
+        self.assertEqual(subset._default_speed_limits, {"residential": 20})
+        self.assertIsNotNone(subset.graph_key)
+        self.assertNotEqual(subset.graph_key, roads.graph_key)
+
+        fresh = RoadNetwork.from_graph(
+            G.subgraph(kept).copy(), default_speed_limits={"residential": 20}
+        )
+        self.assertTrue(np.array_equal(subset.node_x, fresh.node_x))
+        self.assertTrue(np.array_equal(subset.node_y, fresh.node_y))
+        self.assertEqual(len(subset.edges), len(fresh.edges))
+        self.assertTrue(np.array_equal(subset.edge_length, fresh.edge_length))
+        points = [roads.get_coords_from_idx(i) for i in range(len(G))]
+        self.assertTrue(
+            np.array_equal(subset.get_nearest_nodes_idx(points), fresh.get_nearest_nodes_idx(points))
+        )
+        rng = np.random.default_rng(3)
+        for origin, destination in rng.integers(len(kept), size=(30, 2)):
+            self.assertEqual(
+                subset.shortest_path_by_index(int(origin), int(destination)),
+                fresh.shortest_path_by_index(int(origin), int(destination)),
+            )
+
+    def test_shortest_path_tree(self):
+        n = self.roads.i_graph.vcount()
+        exits = [0, 7, 60]
+        tree = self.roads.shortest_path_tree(exits)
+        for node in range(n - 1):
+            lengths = [self.roads.distance_between_nodes(node, exit) for exit in exits]
+            nearest = exits[int(np.argmin(lengths))]
+            path, length = self.roads.shortest_path_by_index(node, nearest)
+            self.assertEqual(self.roads.path_to_tree_root(tree, node), path)
+            self.assertAlmostEqual(tree[0][node], length)
+        # the unreachable node has no route to an exit
+        self.assertEqual(self.roads.path_to_tree_root(tree, n - 1), [])
+
+    def test_path_cache(self):
+        roads = self.roads
+        roads.PATH_CACHE_SIZE = 3
+        path = roads.shortest_path_by_index(0, 10)
+        self.assertIs(roads.shortest_path_by_index(0, 10), path)
+        self.assertEqual((roads.path_cache_hits, roads.path_cache_misses), (1, 1))
+
+        roads.shortest_path_by_index(0, 11)
+        roads.shortest_path_by_index(0, 12)
+        # (0, 10) was used most recently before (0, 11), so (0, 11) is evicted
+        roads.shortest_path_by_index(0, 10)
+        roads.shortest_path_by_index(0, 13)
+        self.assertEqual(list(roads._path_cache), [(0, 12), (0, 10), (0, 13)])
+        roads.shortest_path_by_index(0, 11)
+        self.assertEqual((roads.path_cache_hits, roads.path_cache_misses), (2, 5))
+
+        # changing the graph invalidates the cached paths
+        G = roads.nx_graph.copy()
+        for _, _, data in G.edges(data=True):
+            data["length"] *= 2
+        roads.nx_graph = G
+        self.assertEqual(len(roads._path_cache), 0)
+        self.assertAlmostEqual(roads.shortest_path_by_index(0, 10)[1], 2 * path[1])
+        self.assertEqual((roads.path_cache_hits, roads.path_cache_misses), (0, 1))
+
+        # as does changing the routing
+        roads.routing = LandmarkRouting.name
+        self.assertEqual(len(roads._path_cache), 0)
+        self.assertAlmostEqual(roads.shortest_path_by_index(0, 10)[1], 2 * path[1])
+        self.assertIsInstance(roads._routing, LandmarkRouting)
+
+    def test_parallel_edges(self):
+        G = nx.MultiDiGraph(crs="EPSG:27700")
+        for i, name in enumerate((300, 100, 200, 400)):
+            G.add_node(name, x=ORIGIN[0] + 100 * i, y=ORIGIN[1])
+        # parallel edges, added out of key order, with the first key not the first added
+        G.add_edge(300, 100, key=1, length=50.0, osmid=2, highway="residential")
+        G.add_edge(300, 100, key=0, length=80.0, osmid=1, highway="residential")
+        G.add_edge(100, 300, key=0, length=80.0, osmid=1, highway="residential")
+        # one way edges, between nodes in either order
+        G.add_edge(200, 100, key=0, length=120.0, osmid=3, highway="residential")
+        G.add_edge(200, 400, key=0, length=90.0, osmid=4, highway="residential")
+        G.add_edge(200, 400, key=1, length=70.0, osmid=5, highway="residential")
+        roads = RoadNetwork.from_graph(G)
+
+        idx = {name: i for i, name in enumerate(roads.nodes.index)}
+        for u, v in G.edges():
+            # the edge networkx returned for the pair, in the lookup this replaced
+            data = G.get_edge_data(u, v)[0]
+            for origin, destination in ((u, v), (v, u)):
+                edge = roads.get_edge_idx(idx[origin], idx[destination])
+                self.assertEqual(roads.edge_length[edge], data["length"])
+                self.assertEqual(roads.edge_osmid[edge], data["osmid"])
+                self.assertEqual(
+                    roads.get_edges_idx([idx[origin]], [idx[destination]])[0], edge
+                )
+        self.assertEqual(len(roads.edge_length), 3)
+
+
+if __name__ == "__main__":
+    main()
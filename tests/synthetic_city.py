@@ -0,0 +1,149 @@
+import os
+import geopandas as gpd
+import networkx as nx
+import pandas as pd
+from shapely import Point, box
+
+from src.agent.building import (
+    FootballStadium,
+    Home,
+    RecreationBuilding,
+    School,
+    Shop,
+    Supermarket,
+    WorkPlace,
+)
+from src.model.model import EvacuationModel
+from src.space.city_bundle import CityBundle
+
+# south west corner of the grid, in EPSG:27700
+ORIGIN = (424000.0, 564000.0)
+SPACING = 100.0
+SIZE = 8
+# centre of the grid, so an evacuation zone here covers part of the city
+CENTRE = Point(ORIGIN[0] + SPACING * (SIZE - 1) / 2, ORIGIN[1] + SPACING * (SIZE - 1) / 2)
+
+
+def grid_graph(size: int = SIZE, spacing: float = SPACING) -> nx.MultiGraph:
+    """
+    A square grid of roads, in the form returned by osmnx
+    """
+    G = nx.MultiGraph(crs="EPSG:27700")
+    for i in range(size):
+        for j in range(size):
+            G.add_node(
+                i * size + j, x=ORIGIN[0] + i * spacing, y=ORIGIN[1] + j * spacing
+            )
+    osmid = 0
+    for i in range(size):
+        for j in range(size):
+            for di, dj in ((1, 0), (0, 1)):
+                if i + di < size and j + dj < size:
+                    osmid += 1
+                    G.add_edge(
+                        i * size + j,
+                        (i + di) * size + j + dj,
+                        length=spacing,
+                        osmid=osmid,
+                        highway="residential",
+                    )
+    return G
+
+
+def buildings(G: nx.MultiGraph) -> dict[str, gpd.GeoDataFrame]:
+    """
+    A small building beside every road node, with the building types taking turns
+    """
+    types = [
+        Home.type,
+        WorkPlace.type,
+        Home.type,
+        School.type,
+        Supermarket.type,
+        Shop.type,
+        RecreationBuilding.type,
+        FootballStadium.type,
+    ]
+    rows = {building_type: [] for building_type in types}
+    for idx, (_, data) in enumerate(G.nodes(data=True)):
+        x, y = data["x"] + 10, data["y"] + 10
+        rows[types[idx % len(types)]].append(
+            {
+                "unique_id": idx,
+                "geometry": box(x, y, x + 20, y + 20),
+                "centroid": (x + 10, y + 10),
+                "entrance_walk_idx": idx,
+                "entrance_drive_idx": idx,
+            }
+        )
+    # in the same order as load_osm_buildings, as City.add_buildings expects workplaces last
+    order = [
+        Home.type,
+        School.type,
+        Supermarket.type,
+        Shop.type,
+        RecreationBuilding.type,
+        FootballStadium.type,
+        WorkPlace.type,
+    ]
+    return {
+        building_type: gpd.GeoDataFrame(
+            pd.DataFrame(rows[building_type]).set_index("unique_id"), crs="EPSG:27700"
+        )
+        for building_type in order
+    }
+
+
+def write_synthetic_city(path: str) -> dict[str, str]:
+    """
+    Write the inputs for a model of a small synthetic city to the directory at path, so that the model can be
+    run without accessing OpenStreetMap.  Returns the paths to pass to EvacuationModel.
+    """
+    os.makedirs(path, exist_ok=True)
+    G = grid_graph()
+    bundle_path = os.path.join(path, "city.pickle")
+    CityBundle(buildings(G), G, G.copy()).save(bundle_path)
+
+    domain_path = os.path.join(path, "domain.gpkg")
+    domain = gpd.GeoDataFrame(
+        {"geometry": [box(*ORIGIN, ORIGIN[0] + SPACING * SIZE, ORIGIN[1] + SPACING * SIZE)]},
+        crs="EPSG:27700",
+    ).to_crs("EPSG:4326")
+    domain.to_file(domain_path, driver="GPKG")
+
+    agent_data_path = os.path.join(path, "agent_data.csv")
+    pd.DataFrame(
+        {
+            "code": [0, 1, 2],
+            "category": ["child", "working adult", "retired adult"],
+            "proportion": [0.2, 0.6, 0.2],
+            "walking_speed": [2.88, 4.428, 2.772],
+        }
+    ).to_csv(agent_data_path, index=False)
+
+    return {
+        "domain_path": domain_path,
+        "agent_data_path": agent_data_path,
+        "city_bundle_path": bundle_path,
+    }
+
+
+def synthetic_model(path: str, **kwargs) -> EvacuationModel:
+    """
+    A model of the synthetic city written to path, with any of its parameters overridden
+    """
+    params = {
+        "city": "synthetic",
+        "num_agents": 20,
+        "bomb_location": CENTRE,
+        "evacuation_zone_radius": 200,
+        "evacuation_start_h": 8,
+        "evacuation_start_m": 10,
+        "simulation_start_h": 7,
+        "simulation_start_m": 55,
+        "mean_evacuation_delay_m": 1,
+        "seed": 0,
+        **write_synthetic_city(path),
+    }
+    params.update(kwargs)
+    return EvacuationModel(**params)